@@ -1,12 +1,16 @@
+import logging
 from database import SessionLocal
 import models
-from datetime import datetime
-from auth import get_password_hash
+from auth import hash_password
+from ingestion import bulk_ingest
+from log_config import configure_logging
+
+logger = logging.getLogger(__name__)
 
 def add_test_data():
     db = SessionLocal()
     try:
-        print("🔄 Добавление тестовых данных...")
+        logger.info("Добавление тестовых данных")
         
         # Проверяем, нет ли уже пользователя
         existing_user = db.query(models.User).filter(models.User.email == "test@example.com").first()
@@ -15,10 +19,10 @@ def add_test_data():
             test_user = models.User(
                 email="test@example.com",
                 username="testuser", 
-                hashed_password=get_password_hash("password123")  # ✅ Теперь хешированный
+                hashed_password=hash_password("password123")  # ✅ Теперь хешированный
             )
             db.add(test_user)
-            print("✅ Добавлен тестовый пользователь")
+            logger.info("Добавлен тестовый пользователь", extra={"username": test_user.username})
         
         # Добавляем тестовые новости
         test_news = [
@@ -52,29 +56,17 @@ def add_test_data():
             }
         ]
         
-        added_count = 0
-        for news_data in test_news:
-            if not db.query(models.NewsArticle).filter(models.NewsArticle.url == news_data["url"]).first():
-                news = models.NewsArticle(
-                    title=news_data["title"],
-                    summary=news_data["summary"],
-                    source=news_data["source"],
-                    category=news_data["category"],
-                    url=news_data["url"],
-                    published_at=datetime.now()
-                )
-                db.add(news)
-                added_count += 1
-                print(f"✅ Добавлена новость: {news_data['title']}")
-        
         db.commit()
-        print(f"🎉 Тестовые данные успешно добавлены! Добавлено {added_count} новостей")
         
-    except Exception as e:
-        print(f"❌ Ошибка: {e}")
+        result = bulk_ingest(db, test_news)
+        logger.info("Тестовые данные добавлены", extra={"inserted": result.inserted, "skipped": result.skipped})
+        
+    except Exception:
+        logger.exception("Ошибка добавления тестовых данных")
         db.rollback()
     finally:
         db.close()
 
 if __name__ == "__main__":
+    configure_logging()
     add_test_data()
\ No newline at end of file
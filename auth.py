@@ -1,5 +1,12 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import or_, select
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Optional
 import bcrypt
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
@@ -7,8 +14,11 @@ from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
 
 import models
+import profiling
 import schemas
-from database import get_db
+from database import get_async_db
+from metrics import Counter, Gauge, registry
+from user_cache import user_cache
 
 SECRET_KEY = "your-secret-key-here-change-in-production"
 ALGORITHM = "HS256"
@@ -16,17 +26,44 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+logger = logging.getLogger(__name__)
+
+# bcrypt cost factor; existing hashes are upgraded on the next successful login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Password work runs in its own process pool so it neither holds the GIL nor
+# occupies the threadpool shared with other sync endpoints
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+# Hash operations allowed in flight (running + queued) before requests are rejected
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", str(PASSWORD_WORKERS * 4)))
+PASSWORD_RETRY_AFTER = 1
+
+_password_executor: Optional[Executor] = None
+_password_in_flight = 0
+
+PASSWORD_POOL = registry.register(Gauge(
+    "password_pool_tasks", "bcrypt operations in flight and the admission limit", ("state",)))
+PASSWORD_REJECTED = registry.register(Counter(
+    "password_pool_rejected_total", "Password operations rejected with 503 because the queue was full"))
+
+
+def _collect_password_pool():
+    PASSWORD_POOL.labels("in_flight").set(_password_in_flight)
+    PASSWORD_POOL.labels("limit").set(PASSWORD_QUEUE_LIMIT)
+
+
+registry.on_collect(_collect_password_pool)
+
 
 # ---------------------------------------------------------
 #              BCRYPT FUNCTIONS (only bcrypt)
 # ---------------------------------------------------------
 
-def hash_password(password: str) -> str:
+def hash_password(password: str, rounds: int = BCRYPT_ROUNDS) -> str:
     """Hash password using bcrypt."""
     # bcrypt has limit of 72 bytes → truncate to avoid ValueError
     password_bytes = password.encode("utf-8")[:72]
 
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=rounds)
     hashed = bcrypt.hashpw(password_bytes, salt)
     return hashed.decode("utf-8")
 
@@ -38,6 +75,71 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(password_bytes, hashed_bytes)
 
 
+def password_needs_rehash(hashed_password: str, rounds: int = BCRYPT_ROUNDS) -> bool:
+    """True if the hash was made with a different cost factor ($2b$<cost>$...)."""
+    try:
+        return int(hashed_password.split("$")[2]) != rounds
+    except (IndexError, ValueError):
+        return True
+
+
+def get_password_executor() -> Executor:
+    global _password_executor
+    if _password_executor is None:
+        _password_executor = ProcessPoolExecutor(max_workers=PASSWORD_WORKERS)
+    return _password_executor
+
+
+def shutdown_password_executor():
+    """Stop the password pool (called on application shutdown)."""
+    global _password_executor
+    if _password_executor is not None:
+        _password_executor.shutdown(wait=False, cancel_futures=True)
+        _password_executor = None
+
+
+def password_pool_stats() -> dict:
+    return {
+        "workers": PASSWORD_WORKERS,
+        "in_flight": _password_in_flight,
+        "queue_limit": PASSWORD_QUEUE_LIMIT,
+        "rounds": BCRYPT_ROUNDS,
+    }
+
+
+async def run_password_task(func, *args):
+    """Run bcrypt work in the process pool with admission control.
+
+    When PASSWORD_QUEUE_LIMIT operations are already running or queued the
+    request is rejected with 503 and Retry-After instead of waiting, so a
+    login storm cannot build an unbounded backlog.
+    """
+    global _password_in_flight
+    if _password_in_flight >= PASSWORD_QUEUE_LIMIT:
+        PASSWORD_REJECTED.inc()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication service is busy, retry later",
+            headers={"Retry-After": str(PASSWORD_RETRY_AFTER)},
+        )
+    _password_in_flight += 1
+    started = time.perf_counter()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_password_executor(), func, *args)
+    finally:
+        _password_in_flight -= 1
+        profiling.add_time("password", time.perf_counter() - started)
+
+
+async def hash_password_async(password: str) -> str:
+    return await run_password_task(hash_password, password, BCRYPT_ROUNDS)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await run_password_task(verify_password, plain_password, hashed_password)
+
+
 # ---------------------------------------------------------
 #                    USER FUNCTIONS
 # ---------------------------------------------------------
@@ -50,6 +152,16 @@ def get_user_by_username(db: Session, username: str):
     return db.query(models.User).filter(models.User.username == username).first()
 
 
+async def get_user_by_username_async(db: AsyncSession, username: str):
+    result = await db.execute(select(models.User).where(models.User.username == username))
+    return result.scalars().first()
+
+
+async def get_user_by_email_async(db: AsyncSession, email: str):
+    result = await db.execute(select(models.User).where(models.User.email == email))
+    return result.scalars().first()
+
+
 def authenticate_user(db: Session, username_or_email: str, password: str):
     """Authenticate by username OR email."""
     user = (
@@ -72,6 +184,42 @@ def authenticate_user(db: Session, username_or_email: str, password: str):
     return user
 
 
+async def authenticate_user_async(db: AsyncSession, username_or_email: str, password: str):
+    """Authenticate by username OR email; bcrypt runs in the password pool.
+
+    A hash made with an outdated cost factor is replaced after a successful
+    check. The rehash is best effort: if the pool is saturated it waits for
+    the next login.
+    """
+    result = await db.execute(
+        select(models.User).where(
+            or_(
+                models.User.username == username_or_email,
+                models.User.email == username_or_email,
+            )
+        )
+    )
+    user = result.scalars().first()
+
+    if not user:
+        return False
+
+    if not await verify_password_async(password, user.hashed_password):
+        return False
+
+    if password_needs_rehash(user.hashed_password):
+        try:
+            user.hashed_password = await hash_password_async(password)
+            await db.commit()
+        except HTTPException:
+            pass
+        except Exception:
+            await db.rollback()
+            logger.exception("Password rehash failed")
+
+    return user
+
+
 def create_user(db: Session, user: schemas.UserCreate):
     """Create a new user with bcrypt hashing."""
 
@@ -90,6 +238,22 @@ def create_user(db: Session, user: schemas.UserCreate):
     return db_user
 
 
+async def create_user_async(db: AsyncSession, user: schemas.UserCreate):
+    """Create a new user; the password is hashed in the password pool."""
+
+    db_user = models.User(
+        email=user.email,
+        username=user.username,
+        hashed_password=await hash_password_async(user.password),
+        is_active=True
+    )
+
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+
 # ---------------------------------------------------------
 #                    JWT TOKEN FUNCTIONS
 # ---------------------------------------------------------
@@ -113,7 +277,7 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get user from JWT token."""
     credentials_exception = HTTPException(
@@ -122,20 +286,31 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
+    cached = user_cache.get_token(token)
+    if cached is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            raise credentials_exception
 
+        username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
 
-    except JWTError:
-        raise credentials_exception
-
-    user = get_user_by_username(db, username)
+        expires_at = payload.get("exp")
+        if expires_at is not None:
+            user_cache.put_token(token, username, expires_at)
+    else:
+        username, expires_at = cached
 
+    user = user_cache.get_user(username)
     if user is None:
-        raise credentials_exception
+        db_user = await get_user_by_username_async(db, username)
+        if db_user is None:
+            raise credentials_exception
+
+        user = schemas.User.model_validate(db_user)
+        user_cache.put_user(username, user, expires_at)
 
     return user
 
@@ -0,0 +1,171 @@
+"""Нагрузочный тест аутентифицированных запросов.
+
+Запускает приложение в отдельном процессе uvicorn на временной базе и
+нагружает его параллельными запросами с JWT токеном. Режимы:
+
+    sync     прежняя зависимость get_current_user: синхронный запрос к БД
+             прямо в цикле событий;
+    nocache  AsyncSession, кеш пользователей выключен (USER_CACHE_ENABLED=0);
+    async    текущая версия: AsyncSession и кеш пользователей.
+
+Для каждого режима выводятся пропускная способность и p50/p99 задержки.
+
+В режиме sync каждый запрос держит два соединения синхронного пула (зависимость
+и обработчик), поэтому при concurrency больше размера пула (5 + 10) запросы
+ждут соединение до таймаута и учитываются как ошибки.
+
+    python benchmarks/bench_auth_load.py --concurrency 64 --duration 10
+    python benchmarks/bench_auth_load.py --modes nocache,async --paths /api/auth/cache-stats
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+REQUEST_TIMEOUT = 10.0
+PATHS = ["/api/personalized-news/?limit=20", "/api/preferences/", "/news"]
+
+
+MODE_ENV = {"nocache": {"USER_CACHE_ENABLED": "0"}}
+
+
+def serve(mode: str, port: int):
+    """Запуск приложения (в дочернем процессе, рабочий каталог — временный)"""
+    import uvicorn
+    from fastapi import Depends, HTTPException
+    from jose import JWTError, jwt
+    from sqlalchemy.orm import Session
+
+    import auth
+    import database
+    import main
+
+    if mode == "sync":
+        async def legacy_current_user(token: str = Depends(auth.oauth2_scheme),
+                                      db: Session = Depends(database.get_db)):
+            try:
+                username = jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM]).get("sub")
+            except JWTError:
+                raise HTTPException(status_code=401)
+            user = auth.get_user_by_username(db, username)
+            if user is None:
+                raise HTTPException(status_code=401)
+            return user
+
+        main.app.dependency_overrides[auth.get_current_user] = legacy_current_user
+
+    uvicorn.run(main.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+async def wait_ready(session, base_url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(base_url + "/") as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("Сервер не запустился")
+
+
+async def load(base_url: str, paths: list, concurrency: int, duration: float):
+    import aiohttp
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        await wait_ready(session, base_url)
+        credentials = {"email": "bench@example.com", "username": "bench", "password": "bench"}
+        await session.post(base_url + "/auth/register", json=credentials)
+        async with session.post(base_url + "/auth/login", data={"username": "bench", "password": "bench"}) as response:
+            token = (await response.json())["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        for category in ("спорт", "экономика"):
+            await session.post(base_url + "/api/preferences/", json={"category": category}, headers=headers)
+
+        latencies, errors = [], 0
+        deadline = time.monotonic() + duration
+
+        async def worker(index: int):
+            nonlocal errors
+            i = index
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    async with session.get(base_url + paths[i % len(paths)], headers=headers) as response:
+                        await response.read()
+                        if response.status != 200:
+                            errors += 1
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    errors += 1
+                latencies.append((time.perf_counter() - started) * 1000)
+                i += 1
+
+        started = time.monotonic()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        elapsed = time.monotonic() - started
+
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": latencies[len(latencies) // 2],
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "errors": errors,
+    }
+
+
+def run_mode(mode: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        os.symlink(ROOT / "templates", Path(tmp) / "templates")
+        env = dict(os.environ, INGEST_SCHEDULER_ENABLED="0", PYTHONPATH=str(ROOT), **MODE_ENV.get(mode, {}))
+        if args.seed:
+            subprocess.run(
+                [sys.executable, str(ROOT / "add_test_data.py")], cwd=tmp, env=env,
+                stdout=subprocess.DEVNULL, check=False
+            )
+        server = subprocess.Popen(
+            [sys.executable, __file__, "--serve", mode, "--port", str(args.port)], cwd=tmp, env=env
+        )
+        try:
+            return asyncio.run(load(f"http://127.0.0.1:{args.port}", args.paths.split(","), args.concurrency, args.duration))
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+                server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--modes", default="sync,nocache,async")
+    parser.add_argument("--paths", default=",".join(PATHS))
+    parser.add_argument("--seed", action="store_true", help="заполнить базу через add_test_data.py")
+    parser.add_argument("--serve", choices=["sync", "nocache", "async"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port)
+        return
+
+    print(f"{'mode':<6} {'req/s':>8} {'p50, ms':>9} {'p99, ms':>9} {'errors':>7}")
+    for mode in args.modes.split(","):
+        stats = run_mode(mode, args)
+        print(f"{mode:<6} {stats['rps']:>8.0f} {stats['p50']:>9.1f} {stats['p99']:>9.1f} {stats['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Бенчмарк загрузки новостей: построчная проверка URL против bulk_ingest.
+
+Создает временную SQLite базу с заданным числом строк и загружает в нее
+пакет кандидатов (половина — уже существующие URL).
+
+    python benchmarks/bench_bulk_ingest.py --rows 1000000 --batch 10000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+import models
+from ingestion import bulk_ingest
+
+
+def seed(engine, rows: int, chunk: int = 50000):
+    now = datetime.now()
+    with engine.begin() as conn:
+        for start in range(0, rows, chunk):
+            conn.execute(insert(models.NewsArticle), [
+                {
+                    "title": f"Заголовок {i}",
+                    "summary": f"Описание {i}",
+                    "url": f"https://example.com/news/{i}",
+                    "url_key": models.normalize_url(f"https://example.com/news/{i}"),
+                    "source": "ТАСС",
+                    "category": "общее",
+                    "published_at": now,
+                }
+                for i in range(start, min(start + chunk, rows))
+            ])
+
+
+def candidates(rows: int, batch: int):
+    # Половина пакета — дубликаты уже загруженных URL
+    for i in range(batch):
+        n = rows - batch // 2 + i
+        yield {
+            "title": f"Заголовок {n}",
+            "summary": f"Описание {n}",
+            "url": f"https://example.com/news/{n}",
+            "source": "ТАСС",
+            "category": "общее",
+        }
+
+
+def legacy_ingest(db, items):
+    """Прежний способ: SELECT по url на каждую запись и одиночные db.add"""
+    added = 0
+    for item in items:
+        if not db.query(models.NewsArticle).filter(models.NewsArticle.url == item["url"]).first():
+            db.add(models.NewsArticle(published_at=datetime.now(), **item))
+            added += 1
+    db.commit()
+    return added
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="строк в таблице")
+    parser.add_argument("--batch", type=int, default=10_000, help="кандидатов в пакете")
+    parser.add_argument("--legacy-sample", type=int, default=200,
+                        help="сколько кандидатов прогнать прежним способом (0 — пропустить)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        models.Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+
+        started = time.perf_counter()
+        seed(engine, args.rows)
+        print(f"seed: {args.rows} строк за {time.perf_counter() - started:.1f}с")
+
+        if args.legacy_sample:
+            # Прежний код сравнивал url без индекса — каждая проверка это полный скан
+            sample = list(candidates(args.rows, args.batch))[args.batch // 2 - args.legacy_sample // 2:][:args.legacy_sample]
+            with Session() as db:
+                started = time.perf_counter()
+                legacy_ingest(db, sample)
+                elapsed = time.perf_counter() - started
+            per_item = elapsed / len(sample)
+            print(f"legacy: {len(sample)} кандидатов за {elapsed:.2f}с "
+                  f"(~{per_item * args.batch:.0f}с на {args.batch})")
+
+        with Session() as db:
+            started = time.perf_counter()
+            result = bulk_ingest(db, candidates(args.rows, args.batch))
+            elapsed = time.perf_counter() - started
+        print(f"bulk_ingest: {args.batch} кандидатов за {elapsed:.2f}с "
+              f"(вставлено {result.inserted}, пропущено {result.skipped})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Бенчмарк пакетного API новостей: операции по одной против POST /api/news/bulk.
+
+На временной SQLite базе (PRAGMA из database.SQLITE_PRAGMAS) выполняются
+count созданий, затем изменений и удалений тех же статей: по одной операции
+на транзакцию, как отдельные POST/PUT/DELETE, и через bulk.BulkApplier
+порциями по --chunk (разбор NDJSON и проверка входят в замер).
+
+    python benchmarks/bench_bulk_news.py --count 20000 --single-sample 500
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy.orm import sessionmaker
+
+import models
+from bulk import BulkApplier, validate_operation
+from database import make_engine
+
+CATEGORIES = ["политика", "технологии", "спорт", "развлечения", "наука", "экономика", "культура"]
+SOURCES = ["РИА Новости", "Коммерсантъ", "ТАСС", "Интерфакс", "РБК"]
+
+
+def article(n: int, words, rng: random.Random) -> dict:
+    return {
+        "title": " ".join(rng.sample(words, 8)),
+        "summary": " ".join(rng.sample(words, 30)),
+        "source": rng.choice(SOURCES),
+        "category": rng.choice(CATEGORIES),
+        "url": f"https://example.com/news/{n}",
+        "published_at": datetime.now().isoformat(),
+    }
+
+
+def single(Session, operations):
+    """Как отдельные обработчики: поиск, изменение, commit и refresh на каждую операцию"""
+    with Session() as db:
+        for operation in operations:
+            if operation.op == "create":
+                data = operation.data
+                if db.query(models.NewsArticle.id).filter(
+                    models.NewsArticle.url_key == models.normalize_url(data.url)
+                ).first():
+                    continue
+                news = models.NewsArticle(**data.model_dump())
+                db.add(news)
+            else:
+                news = db.query(models.NewsArticle).filter(models.NewsArticle.id == operation.id).first()
+                if operation.op == "update":
+                    for name, value in operation.data.model_dump(exclude_unset=True).items():
+                        setattr(news, name, value)
+                else:
+                    news.is_active = False
+            db.commit()
+            db.refresh(news)
+
+
+def bulk(Session, lines, chunk: int) -> dict:
+    applier = BulkApplier(session_factory=Session, chunk_size=chunk)
+    try:
+        batch = []
+        for index, line in enumerate(lines):
+            batch.append((index, validate_operation(line)))
+            if len(batch) >= chunk:
+                applier.apply(batch)
+                batch = []
+        if batch:
+            applier.apply(batch)
+        return applier.finish()
+    finally:
+        applier.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=20_000, help="статей (и изменений, и удалений)")
+    parser.add_argument("--chunk", type=int, default=1000, help="операций в транзакции bulk")
+    parser.add_argument("--single-sample", type=int, default=500, help="операций каждого вида по одной (0 — пропустить)")
+    parser.add_argument("--vocabulary", type=int, default=50_000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    # Слова различаются уже в начале: кластеризация сравнивает первые буквы слов
+    letters = "абвгдежзиклмнопрстуфхцчшэюя"
+    words = ["".join(rng.choices(letters, k=rng.randint(5, 10))) for _ in range(args.vocabulary)]
+    creates = [json.dumps({"op": "create", "data": article(n, words, rng)}) for n in range(args.count)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        models.Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+
+        started = time.perf_counter()
+        result = bulk(Session, [line.encode() for line in creates], args.chunk)
+        elapsed = time.perf_counter() - started
+        print(f"bulk create: {result['applied']} за {elapsed:.2f}с ({args.count / elapsed:,.0f} оп/с)")
+        ids = list(range(1, args.count + 1))
+        for name, make in (
+            ("update", lambda article_id: {"op": "update", "id": article_id, "data": {"category": rng.choice(CATEGORIES)}}),
+            ("delete", lambda article_id: {"op": "delete", "id": article_id}),
+        ):
+            lines = [json.dumps(make(article_id)).encode() for article_id in ids]
+            started = time.perf_counter()
+            result = bulk(Session, lines, args.chunk)
+            elapsed = time.perf_counter() - started
+            print(f"bulk {name}: {result['applied']} за {elapsed:.2f}с ({len(lines) / elapsed:,.0f} оп/с)")
+
+        if args.single_sample:
+            offset = args.count + 1
+            samples = {
+                "create": [json.dumps({"op": "create", "data": article(offset + n, words, rng)})
+                           for n in range(args.single_sample)],
+                "update": [json.dumps({"op": "update", "id": offset + n, "data": {"category": "наука"}})
+                           for n in range(args.single_sample)],
+                "delete": [json.dumps({"op": "delete", "id": offset + n}) for n in range(args.single_sample)],
+            }
+            for name, lines in samples.items():
+                operations = [validate_operation(line) for line in lines]
+                started = time.perf_counter()
+                single(Session, operations)
+                elapsed = time.perf_counter() - started
+                print(f"по одной {name}: {len(lines)} за {elapsed:.2f}с ({len(lines) / elapsed:,.0f} оп/с)")
+
+
+if __name__ == "__main__":
+    main()
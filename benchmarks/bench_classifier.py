@@ -0,0 +1,127 @@
+"""Бенчмарк классификации: прежний detect_category против KeywordClassifier.
+
+Генерирует синтетические русскоязычные заголовки с описаниями и сравнивает
+пропускную способность прежней реализации (подстрочный поиск по каждому
+ключевому слову) и скомпилированного классификатора. Прежняя реализация
+возвращает первую совпавшую категорию, поэтому на коротких словарях она
+быстрее полного прохода; с ростом словаря ее стоимость растет линейно.
+
+    python benchmarks/bench_classifier.py --count 100000
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from classifier import CATEGORY_KEYWORDS, KeywordClassifier, default_classifier
+
+SUBJECTS = [
+    "Сборная России", "Правительство", "Центральный банк", "Ученые МГУ", "Известный артист",
+    "Крупная IT-компания", "Министр финансов", "Хоккейный клуб", "Городской театр", "Жители Москвы",
+]
+ACTIONS = [
+    "представили", "объявили о", "обсудили", "сообщили о", "раскритиковали", "поддержали",
+]
+OBJECTS = [
+    "новый смартфон", "итоги чемпионата", "курс рубля", "открытие в области медицины",
+    "выставку современного искусства", "санкции против компаний", "реформу образования",
+    "запуск космического аппарата", "рост инфляции", "премьеру фильма", "ремонт дорог",
+    "решение парламента", "нейросеть для врачей", "погоду на выходные",
+]
+TAILS = [
+    "Подробности пока не раскрываются.", "Эксперты ожидают продолжения.",
+    "Это может повлиять на рынок.", "Событие вызвало широкий резонанс.",
+    "Об этом сообщает пресс-служба.", "Решение вступит в силу в следующем месяце.",
+]
+
+
+LEGACY_KEYWORDS = {
+    "технологии": ["ии", "искусственный интеллект", "программирование", "гаджет", "смартфон", "it", "цифровой", "технологи", "компьютер"],
+    "политика": ["путин", "правительство", "выборы", "парламент", "министр", "санкции", "международный", "политик", "государство"],
+    "экономика": ["рубль", "доллар", "биржа", "инфляция", "бизнес", "компания", "рынок", "экономика", "финанс", "банк", "инвестиц"],
+    "спорт": ["футбол", "хоккей", "чемпионат", "сборная", "матч", "игрок", "спорт", "соревнован", "олимпийск"],
+    "наука": ["исследование", "ученые", "открытие", "космос", "медицина", "наука", "изобретение", "лаборатор"],
+    "культура": ["кино", "фильм", "музыка", "концерт", "выставка", "театр", "культура", "искусство", "артист"]
+}
+
+
+def legacy_detect_category(title: str, summary: str, category_keywords: dict = LEGACY_KEYWORDS) -> str:
+    """Прежняя реализация RealNewsParser.detect_category"""
+    text = (title + " " + summary).lower()
+
+    for category, keywords in category_keywords.items():
+        if any(keyword in text for keyword in keywords):
+            return category
+
+    return "общее"
+
+
+def synthetic_keywords(per_category: int, seed: int = 7):
+    """Словари, расширенные несовпадающими ключевыми словами, для оценки роста стоимости"""
+    rng = random.Random(seed)
+    letters = "бвгджзклмнпрстфхцчшщ"
+
+    def word():
+        return "".join(rng.choice(letters) for _ in range(rng.randint(5, 9)))
+
+    legacy = {category: keywords + [word() for _ in range(per_category)]
+              for category, keywords in LEGACY_KEYWORDS.items()}
+    compiled = {category: {**keywords, **{word() + r"\w*": 1.0 for _ in range(per_category)}}
+                for category, keywords in CATEGORY_KEYWORDS.items()}
+    return legacy, compiled
+
+
+def generate(count: int, seed: int = 42):
+    """Заголовок и описание из нескольких предложений (~200-300 символов, как в RSS)"""
+    rng = random.Random(seed)
+    items = []
+    for _ in range(count):
+        title = f"{rng.choice(SUBJECTS)} {rng.choice(ACTIONS)} {rng.choice(OBJECTS)}"
+        summary = " ".join(
+            [f"{rng.choice(SUBJECTS)} {rng.choice(ACTIONS)} {rng.choice(OBJECTS)}."]
+            + rng.sample(TAILS, rng.randint(2, 4))
+        )
+        items.append((title, summary))
+    return items
+
+
+def run(items, texts, legacy_keywords, classifier):
+    started = time.perf_counter()
+    legacy = [legacy_detect_category(title, summary, legacy_keywords) for title, summary in items]
+    legacy_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    results = classifier.classify_many(texts)
+    new_elapsed = time.perf_counter() - started
+
+    changed = sum(1 for old, (new, _) in zip(legacy, results) if old != new)
+    return legacy_elapsed, new_elapsed, changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--extra-keywords", type=int, nargs="+", default=[0, 50, 200],
+                        help="дополнительных ключевых слов на категорию")
+    args = parser.parse_args()
+
+    items = generate(args.count)
+    texts = [f"{title} {summary}" for title, summary in items]
+
+    print(f"{args.count} текстов")
+    print(f"{'extra kw':>8} {'legacy texts/s':>15} {'compiled texts/s':>17} {'changed':>8}")
+    for extra in args.extra_keywords:
+        if extra:
+            legacy_keywords, compiled_keywords = synthetic_keywords(extra)
+            classifier = KeywordClassifier(compiled_keywords)
+        else:
+            legacy_keywords, classifier = LEGACY_KEYWORDS, default_classifier
+        legacy_elapsed, new_elapsed, changed = run(items, texts, legacy_keywords, classifier)
+        print(f"{extra:>8} {args.count / legacy_elapsed:>15.0f} {args.count / new_elapsed:>17.0f} {changed:>8}")
+
+
+if __name__ == "__main__":
+    main()
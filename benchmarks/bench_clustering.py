@@ -0,0 +1,187 @@
+"""Бенчмарк кластеризации сюжетов: точность на размеченных новостях и пропускная способность.
+
+Размеченный набор (clustering_labeled.json) — заметки разных источников об
+одних и тех же событиях, включая похожие, но разные сюжеты (два решения ЦБ,
+два матча «Спартака»). Для него считаются попарные precision/recall.
+
+Пропускная способность измеряется на синтетическом потоке новых событий и
+пересказов недавних (часть слов исходной заметки заменена). Учитывается
+только время подписи, поиска и добавления в индекс.
+
+    python benchmarks/bench_clustering.py --count 1000000
+"""
+import argparse
+import itertools
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from clustering import CLUSTER_MAX_ARTICLES, CLUSTER_THRESHOLD, CLUSTER_WINDOW_HOURS, StoryIndex
+
+LABELED_PATH = Path(__file__).resolve().parent / "clustering_labeled.json"
+SYLLABLES = [consonant + vowel for consonant in "бвгдзклмнпрстфхч" for vowel in "аеиоуя"]
+# Самые частые слова отсеиваются как служебные: ранги общей лексики начинаются с этого
+ZIPF_OFFSET = 50
+
+
+def make_index(args) -> StoryIndex:
+    return StoryIndex(threshold=args.threshold, window_hours=args.window_hours, max_articles=args.max_articles,
+                      num_hashes=args.num_hashes, bands=args.bands)
+
+
+def evaluate_labeled(args):
+    items = json.loads(LABELED_PATH.read_text(encoding="utf-8"))
+    index = make_index(args)
+    now = datetime.now()
+    clusters = []
+    for article_id, item in enumerate(items):
+        signature = index.signature(item["title"], item["summary"])
+        cluster_id, _ = index.match(signature)
+        cluster_id = article_id if cluster_id is None else cluster_id
+        index.add(article_id, cluster_id, signature, now)
+        clusters.append(cluster_id)
+
+    tp = fp = fn = 0
+    for left, right in itertools.combinations(range(len(items)), 2):
+        same_story = items[left]["story"] == items[right]["story"]
+        same_cluster = clusters[left] == clusters[right]
+        tp += same_story and same_cluster
+        fp += same_cluster and not same_story
+        fn += same_story and not same_cluster
+    precision = tp / (tp + fp) if tp + fp else 1.0
+    recall = tp / (tp + fn) if tp + fn else 1.0
+    stories = len({item["story"] for item in items})
+    print(f"Размеченный набор: {len(items)} статей, {stories} сюжетов, найдено {len(set(clusters))} кластеров")
+    print(f"  пары: precision {precision:.2f}, recall {recall:.2f}, "
+          f"F1 {2 * precision * recall / (precision + recall or 1):.2f}")
+
+
+class Stream:
+    """Синтетический поток заметок: новые события и пересказы недавних.
+
+    Первая заметка о событии — случайный текст из общей лексики и редких слов,
+    последующие — ее пересказ другим изданием: каждое слово с вероятностью
+    rewrite заменяется другим.
+    """
+
+    def __init__(self, vocabulary: int, duplicate_rate: float, rewrite: float, seed: int = 42):
+        self.rng = random.Random(seed)
+        self.words = list({self._word() for _ in range(vocabulary * 2)})[:vocabulary]
+        self.weights = list(itertools.accumulate(
+            1.0 / (rank + ZIPF_OFFSET) for rank in range(1, len(self.words) + 1)
+        ))
+        self.duplicate_rate = duplicate_rate
+        self.rewrite = rewrite
+        self.events = []
+
+    def _word(self) -> str:
+        # Согласная на конце: упрощенный стемминг слово не укорачивает
+        return "".join(self.rng.choice(SYLLABLES) for _ in range(self.rng.randint(3, 4))) + self.rng.choice("кмнрст")
+
+    def _text(self, count: int):
+        # Половина слов — общая лексика (распределение Ципфа), половина — редкие
+        common = self.rng.choices(self.words, cum_weights=self.weights, k=count - count // 2)
+        return common + self.rng.sample(self.words, count // 2)
+
+    def _retell(self, words):
+        common = self.rng.choices(self.words, cum_weights=self.weights, k=len(words))
+        return [replacement if self.rng.random() < self.rewrite else word for word, replacement in zip(words, common)]
+
+    def next(self):
+        rng = self.rng
+        if self.events and rng.random() < self.duplicate_rate:
+            event_id = rng.randrange(max(0, len(self.events) - 500), len(self.events))
+            title, summary = self.events[event_id]
+            title, summary = self._retell(title), self._retell(summary)
+        else:
+            title, summary = self._text(8), self._text(24)
+            self.events.append((title, summary))
+            event_id = len(self.events) - 1
+        return event_id, " ".join(title), " ".join(summary)
+
+
+def run_stream(args):
+    index = make_index(args)
+    stream = Stream(args.vocabulary, args.duplicate_rate, args.rewrite)
+    started_at = datetime(2026, 1, 1)
+    step = timedelta(seconds=args.step_seconds)
+    event_of = {}
+    first_seen = {}
+    joined = correct = repeats = found = 0
+    elapsed = 0.0
+
+    for article_id in range(args.count):
+        event_id, title, summary = stream.next()
+        published_at = started_at + step * article_id
+        started = time.perf_counter()
+        signature = index.signature(title, summary)
+        cluster_id, _ = index.match(signature)
+        index.add(article_id, article_id if cluster_id is None else cluster_id, signature, published_at)
+        elapsed += time.perf_counter() - started
+
+        # Повтор — событие уже есть в окне; правильное отнесение — к его кластеру
+        previous = first_seen.get(event_id)
+        in_window = previous is not None and previous in index._entries
+        repeats += in_window
+        if cluster_id is not None:
+            joined += 1
+            correct += event_of.get(cluster_id) == event_id
+            found += in_window and event_of.get(cluster_id) == event_id
+        else:
+            event_of[article_id] = event_id
+        if not in_window:
+            first_seen[event_id] = article_id
+
+        if args.progress and (article_id + 1) % args.progress == 0:
+            print(f"  {article_id + 1:>9} статей: {(article_id + 1) / elapsed:,.0f} статей/с, в окне {len(index)}")
+
+    # Поиск по LSH против полного перебора окна на одних и тех же подписях
+    sample = [index.signature(*stream.next()[1:]) for _ in range(args.scan_sample)]
+    started = time.perf_counter()
+    for signature in sample:
+        index.match(signature)
+    lsh_elapsed = time.perf_counter() - started
+    started = time.perf_counter()
+    for signature in sample:
+        max(index.similarity(signature, entry[1]) for entry in index._entries.values())
+    scan_elapsed = time.perf_counter() - started
+
+    stats = index.stats()
+    print(f"Синтетический поток: {args.count} статей, {len(stream.events)} событий, доля повторов {args.duplicate_rate}")
+    print(f"  {args.count / elapsed:,.0f} статей/с ({elapsed / args.count * 1e6:.1f} мкс на статью)")
+    print(f"  в окне {stats['articles']} статей, {stats['buckets']} корзин LSH")
+    print(f"  присоединено к сюжетам {joined}: precision {correct / joined if joined else 1.0:.3f}, "
+          f"recall {found / repeats if repeats else 1.0:.3f}")
+    if sample:
+        print(f"  поиск: LSH {lsh_elapsed / len(sample) * 1e6:.0f} мкс, "
+              f"перебор окна {scan_elapsed / len(sample) * 1e6:.0f} мкс на запрос")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--threshold", type=float, default=CLUSTER_THRESHOLD)
+    parser.add_argument("--num-hashes", type=int, default=StoryIndex.NUM_HASHES)
+    parser.add_argument("--bands", type=int, default=StoryIndex.BANDS)
+    parser.add_argument("--window-hours", type=float, default=CLUSTER_WINDOW_HOURS)
+    parser.add_argument("--max-articles", type=int, default=CLUSTER_MAX_ARTICLES)
+    parser.add_argument("--step-seconds", type=float, default=5.0, help="интервал между статьями потока")
+    parser.add_argument("--duplicate-rate", type=float, default=0.3)
+    parser.add_argument("--rewrite", type=float, default=0.3, help="доля слов, заменяемых в пересказе")
+    parser.add_argument("--vocabulary", type=int, default=20_000)
+    parser.add_argument("--scan-sample", type=int, default=200, help="запросов для сравнения с полным перебором")
+    parser.add_argument("--progress", type=int, default=0, help="печатать скорость каждые N статей")
+    args = parser.parse_args()
+
+    evaluate_labeled(args)
+    if args.count:
+        run_stream(args)
+
+
+if __name__ == "__main__":
+    main()
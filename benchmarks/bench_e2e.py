@@ -0,0 +1,354 @@
+"""Сквозной бенчмарк API: лента, категории, карточка новости, авторизация и загрузка.
+
+Приложение работает на SQLite базе, заполненной datagen.py, — в том же
+процессе (ASGI-транспорт httpx, без сети) или отдельным процессом uvicorn
+(HTTP через aiohttp). Каждый сценарий нагружается concurrency параллельными
+клиентами duration секунд после прогрева. Результат — JSON с пропускной
+способностью, перцентилями задержек и параметрами запуска (в том числе
+коммитом), который можно сравнить с прошлым запуском через --compare.
+
+    python benchmarks/bench_e2e.py --articles 200000 --users 2000 --output before.json
+    python benchmarks/bench_e2e.py --database /tmp/bench.db --transport http --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+REQUEST_TIMEOUT = 30.0
+SCENARIOS = ["list", "category", "detail", "personalized", "auth_login", "ingest"]
+
+
+class InProcessClient:
+    """Запросы к приложению через ASGI без сети (httpx устанавливается вместе с TestClient)"""
+
+    def __init__(self):
+        import httpx
+
+        import main
+        self.app = main.app
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=self.app), base_url="http://bench",
+                                        timeout=REQUEST_TIMEOUT)
+        self._lifespan = None
+
+    async def __aenter__(self):
+        self._lifespan = self.app.router.lifespan_context(self.app)
+        await self._lifespan.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.client.aclose()
+        await self._lifespan.__aexit__(*exc)
+
+    async def request(self, method: str, path: str, **kwargs):
+        response = await self.client.request(method, path, **kwargs)
+        return response.status_code, response.content, response.headers
+
+
+class HttpClient:
+    """Запросы к отдельному процессу uvicorn"""
+
+    def __init__(self, base_url: str, concurrency: int):
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.session = None
+
+    async def __aenter__(self):
+        import aiohttp
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.concurrency),
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+        )
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                if (await self.request("GET", "/api/health/live"))[0] == 200:
+                    return self
+            except OSError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError("Сервер не запустился")
+            await asyncio.sleep(0.2)
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    async def request(self, method: str, path: str, content: bytes = None, data: dict = None, **kwargs):
+        body = content if content is not None else data
+        async with self.session.request(method, self.base_url + path, data=body, **kwargs) as response:
+            return response.status, await response.read(), response.headers
+
+
+class Context:
+    """Общие данные сценариев: объем базы, токены пользователей, генератор новостей"""
+
+    def __init__(self, args):
+        from datagen import CATEGORY_WEIGHTS, DEFAULT_PASSWORD, ArticleGenerator
+        self.articles = args.articles
+        self.users = args.users
+        self.password = DEFAULT_PASSWORD
+        self.categories = list(CATEGORY_WEIGHTS)
+        self.category_weights = list(CATEGORY_WEIGHTS.values())
+        self.ingest_batch = args.ingest_batch
+        self.generator = ArticleGenerator(seed=None)
+        self.tokens = []
+
+    def username(self, rng: random.Random) -> str:
+        return f"user{rng.randrange(self.users):06d}"
+
+    async def login(self, client, username: str) -> str:
+        status, body, _ = await client.request("POST", "/auth/login",
+                                               data={"username": username, "password": self.password})
+        if status != 200:
+            raise RuntimeError(f"Не удалось войти как {username}: {status} {body[:200]!r}")
+        return json.loads(body)["access_token"]
+
+    def auth(self, rng: random.Random) -> dict:
+        return {"Authorization": f"Bearer {rng.choice(self.tokens)}"}
+
+
+async def scenario_list(client, ctx: Context, rng):
+    return (await client.request("GET", "/api/news/?limit=20"))[0]
+
+
+async def scenario_category(client, ctx: Context, rng):
+    category = rng.choices(ctx.categories, weights=ctx.category_weights)[0]
+    return (await client.request("GET", f"/api/news/category/{category}?limit=20"))[0]
+
+
+async def scenario_detail(client, ctx: Context, rng):
+    return (await client.request("GET", f"/api/news/{rng.randint(1, ctx.articles)}"))[0]
+
+
+async def scenario_personalized(client, ctx: Context, rng):
+    return (await client.request("GET", "/api/personalized-news/?limit=20", headers=ctx.auth(rng)))[0]
+
+
+async def scenario_auth_login(client, ctx: Context, rng):
+    status, _, _ = await client.request("POST", "/auth/login",
+                                        data={"username": ctx.username(rng), "password": ctx.password})
+    return status
+
+
+async def scenario_ingest(client, ctx: Context, rng):
+    lines = [json.dumps({"op": "create", "data": {**row, "published_at": row["published_at"].isoformat()}},
+                        ensure_ascii=False)
+             for row in ctx.generator.generate(ctx.ingest_batch, days=1)]
+    status, _, _ = await client.request("POST", "/api/news/bulk", content="\n".join(lines).encode(),
+                                        headers={**ctx.auth(rng), "Content-Type": "application/x-ndjson"})
+    return status
+
+
+def percentile(samples, q: float) -> float:
+    return samples[min(len(samples) - 1, int(len(samples) * q))] if samples else 0.0
+
+
+async def run_scenario(client, ctx: Context, name: str, concurrency: int, duration: float, warmup: float,
+                       seed: int) -> dict:
+    handler = globals()[f"scenario_{name}"]
+    latencies, errors, rejected = [], 0, 0
+
+    async def worker(index: int, deadline: float, record: bool):
+        nonlocal errors, rejected
+        rng = random.Random(seed * 1000 + index)
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                status = await handler(client, ctx, rng)
+            except Exception:
+                status = None
+            if record:
+                latencies.append((time.perf_counter() - started) * 1000)
+                # 503 — штатный отказ при перегрузке (очередь хеширования паролей), а не ошибка
+                if status == 503:
+                    rejected += 1
+                elif status is None or status >= 400:
+                    errors += 1
+
+    if warmup:
+        deadline = time.monotonic() + warmup
+        await asyncio.gather(*(worker(i, deadline, False) for i in range(concurrency)))
+    started = time.monotonic()
+    deadline = started + duration
+    await asyncio.gather(*(worker(i, deadline, True) for i in range(concurrency)))
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+    result = {
+        "requests": len(latencies),
+        "errors": errors,
+        "rejected": rejected,
+        "rps": round(len(latencies) / elapsed, 1),
+        "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 0.5), 2),
+        "p90_ms": round(percentile(latencies, 0.9), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+        "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+    }
+    if name == "ingest":
+        result["items_per_second"] = round(result["rps"] * ctx.ingest_batch, 1)
+    return result
+
+
+async def run_scenarios(client, args) -> dict:
+    ctx = Context(args)
+    async with client:
+        # Токены нескольких пользователей получаются заранее: вход — отдельный сценарий
+        ctx.tokens = [await ctx.login(client, f"user{n:06d}") for n in range(min(args.users, 4))]
+        results = {}
+        for name in args.scenarios.split(","):
+            results[name] = await run_scenario(client, ctx, name, args.concurrency, args.duration, args.warmup,
+                                               args.seed)
+            print(f"{name:<13} {results[name]['rps']:>9.1f} {results[name]['p50_ms']:>9.2f} "
+                  f"{results[name]['p99_ms']:>9.2f} {results[name]['errors']:>7} {results[name]['rejected']:>9}",
+                  file=sys.stderr)
+        return results
+
+
+def git_revision() -> dict:
+    def git(*command):
+        return subprocess.run(["git", *command], cwd=ROOT, capture_output=True, text=True, timeout=60).stdout.strip()
+    try:
+        return {"commit": git("rev-parse", "--short", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+    except (OSError, subprocess.SubprocessError):
+        return {"commit": None, "dirty": None}
+
+
+def prepare_database(path: str, args, env: dict):
+    """Заполнение базы через datagen.py, если в ней еще нет статей"""
+    import sqlite3
+    if os.path.exists(path):
+        connection = sqlite3.connect(path)
+        try:
+            count = connection.execute("SELECT count(*) FROM news_articles").fetchone()[0]
+            users = connection.execute("SELECT count(*) FROM users").fetchone()[0]
+        except sqlite3.OperationalError:
+            count = users = 0
+        finally:
+            connection.close()
+        if count:
+            # Для сценариев нужен реальный объем базы, а не запрошенный
+            args.articles, args.users = count, users
+            print(f"База {path}: {args.articles} статей, {args.users} пользователей", file=sys.stderr)
+            return
+    subprocess.run(
+        [sys.executable, str(ROOT / "datagen.py"), "--articles", str(args.articles), "--users", str(args.users),
+         "--seed", str(args.seed)],
+        cwd=ROOT, env=env, check=True,
+    )
+
+
+def compare(results: dict, baseline_path: str, tolerance: float) -> bool:
+    """Таблица изменений относительно прошлого запуска; False при регрессии больше tolerance"""
+    baseline = json.loads(Path(baseline_path).read_text(encoding="utf-8"))
+    print(f"\nСравнение с {baseline_path} ({baseline['meta'].get('commit')}):")
+    differs = [key for key in ("transport", "articles", "users", "concurrency", "ingest_batch", "platform")
+               if baseline["meta"].get(key) != results["meta"].get(key)]
+    if differs:
+        print(f"Внимание: запуски различаются параметрами {', '.join(differs)} — сравнение неточно")
+    print(f"{'scenario':<13} {'req/s':>18} {'p99, ms':>20}")
+    ok = True
+    for name, current in results["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if before is None:
+            continue
+        rps_change = current["rps"] / before["rps"] - 1 if before["rps"] else 0.0
+        p99_change = current["p99_ms"] / before["p99_ms"] - 1 if before["p99_ms"] else 0.0
+        regression = rps_change < -tolerance or p99_change > tolerance
+        ok = ok and not regression
+        print(f"{name:<13} {before['rps']:>8.1f} {rps_change:>+8.1%} {before['p99_ms']:>10.2f} {p99_change:>+8.1%}"
+              f"{'  регрессия' if regression else ''}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--articles", type=int, default=100_000, help="статей в новой базе")
+    parser.add_argument("--users", type=int, default=1000, help="пользователей в новой базе")
+    parser.add_argument("--database", help="файл SQLite; если в нем есть данные, генерация пропускается")
+    parser.add_argument("--transport", choices=["inprocess", "http"], default="inprocess")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="секунд на сценарий")
+    parser.add_argument("--warmup", type=float, default=2.0, help="секунд прогрева перед замером")
+    parser.add_argument("--ingest-batch", type=int, default=20, help="новостей в запросе сценария ingest")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="файл для JSON (по умолчанию — stdout)")
+    parser.add_argument("--compare", help="JSON прошлого запуска для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="допустимое падение req/s и рост p99 при сравнении (0.1 = 10%%)")
+    args = parser.parse_args()
+    unknown = set(args.scenarios.split(",")) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"неизвестные сценарии: {', '.join(sorted(unknown))}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.abspath(args.database or os.path.join(tmp, "bench.db"))
+        env = dict(
+            os.environ, DATABASE_URL=f"sqlite:///{path}", PYTHONPATH=str(ROOT),
+            INGEST_SCHEDULER_ENABLED="0", RETENTION_INTERVAL="0", STATS_RECONCILE_INTERVAL="0",
+        )
+        prepare_database(path, args, env)
+        print(f"{'scenario':<13} {'req/s':>9} {'p50, ms':>9} {'p99, ms':>9} {'errors':>7} {'rejected':>9}", file=sys.stderr)
+
+        server = None
+        if args.transport == "inprocess":
+            # Настройки приложения читаются при импорте; шаблоны ищутся относительно рабочего каталога
+            os.environ.update(env)
+            os.chdir(ROOT)
+            client = InProcessClient()
+        else:
+            server = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+                cwd=ROOT, env=env,
+            )
+            client = HttpClient(f"http://127.0.0.1:{args.port}", args.concurrency)
+        try:
+            scenarios = asyncio.run(run_scenarios(client, args))
+        finally:
+            if server is not None:
+                server.terminate()
+                try:
+                    server.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    server.kill()
+                    server.wait()
+
+    results = {
+        "meta": {
+            **git_revision(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "transport": args.transport,
+            "articles": args.articles,
+            "users": args.users,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "ingest_batch": args.ingest_batch,
+        },
+        "scenarios": scenarios,
+    }
+    output = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+    if args.compare and not compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Бенчмарк выгрузки корпуса: /api/news/export против постраничного /api/news/?skip=.
+
+Приложение вызывается в том же процессе напрямую через ASGI: тело ответа
+считается и отбрасывается, поэтому пиковая память (tracemalloc, --memory)
+— это память сервера, а не клиента. Пагинация по skip/limit читает тот же
+корпус страницами по --page-size, как это делают текущие выгрузки.
+
+    python benchmarks/bench_export.py --database news.db --memory
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from urllib.parse import urlencode
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+async def call(app, path: str, params: dict, encoding: str = "identity") -> tuple:
+    """(статус, байт тела) одного запроса"""
+    result = {"status": None, "bytes": 0}
+    received = asyncio.Event()
+
+    async def receive():
+        if received.is_set():
+            # StreamingResponse ждет отключения клиента, пока отправляет тело
+            await asyncio.Event().wait()
+        received.set()
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            result["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            result["bytes"] += len(message.get("body", b""))
+
+    scope = {"type": "http", "http_version": "1.1", "method": "GET", "path": path, "raw_path": path.encode(),
+             "root_path": "", "query_string": urlencode(params).encode(), "scheme": "http",
+             "headers": [(b"accept-encoding", encoding.encode())], "server": ("bench", 80), "client": ("bench", 1)}
+    await app(scope, receive, send)
+    return result["status"], result["bytes"]
+
+
+async def page_through(app, page_size: int, encoding: str) -> tuple:
+    pages, total = 0, 0
+    while True:
+        status, size = await call(app, "/api/news/", {"skip": pages * page_size, "limit": page_size}, encoding)
+        pages += 1
+        total += size
+        # Пустая страница — "[]"
+        if status != 200 or size <= 2:
+            return status, total
+
+
+async def run(args):
+    import main
+    from cache import ALL, response_cache
+    app = main.app
+    scenarios = [(f"skip/limit={args.page_size}", lambda: page_through(app, args.page_size, "identity"))]
+    for export_format in ("ndjson", "csv"):
+        for encoding in ("identity", "gzip"):
+            scenarios.append((f"export {export_format} {encoding}",
+                              lambda f=export_format, e=encoding: call(app, "/api/news/export", {"format": f}, e)))
+    async with app.router.lifespan_context(app):
+        for label, scenario in scenarios:
+            response_cache.invalidate(ALL)
+            if args.memory:
+                tracemalloc.start()
+            started = time.perf_counter()
+            status, size = await scenario()
+            elapsed = time.perf_counter() - started
+            peak = ""
+            if args.memory:
+                peak = f"  пик {tracemalloc.get_traced_memory()[1] / 1e6:7.2f} МБ"
+                tracemalloc.stop()
+            print(f"{label:<24} {elapsed:7.2f} с  {size / 1e6:8.2f} МБ  {status}{peak}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database", help="файл SQLite; если в нем нет статей, он заполняется datagen.py")
+    parser.add_argument("--articles", type=int, default=20_000)
+    parser.add_argument("--page-size", type=int, default=500)
+    parser.add_argument("--memory", action="store_true", help="пиковая память через tracemalloc (в разы медленнее)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.abspath(args.database or os.path.join(tmp, "bench.db"))
+        os.environ.update(DATABASE_URL=f"sqlite:///{path}", INGEST_SCHEDULER_ENABLED="0", RETENTION_INTERVAL="0",
+                          STATS_RECONCILE_INTERVAL="0", LOG_LEVEL=os.getenv("LOG_LEVEL", "WARNING"))
+        import sqlite3
+        connection = sqlite3.connect(path)
+        try:
+            count = connection.execute("SELECT count(*) FROM news_articles").fetchone()[0]
+        except sqlite3.OperationalError:
+            count = 0
+        finally:
+            connection.close()
+        if not count:
+            subprocess.run([sys.executable, str(ROOT / "datagen.py"), "--articles", str(args.articles), "--users", "0"],
+                           cwd=ROOT, check=True)
+        os.chdir(ROOT)
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Бенчмарк «шторма логинов»: задержка новостных API во время массового входа.
+
+Запускает приложение в отдельном процессе uvicorn на временной базе. Читатели
+непрерывно запрашивают /api/news/ и /api/news/search, сначала без нагрузки, затем параллельно с
+потоком запросов /auth/login. Режимы:
+
+    inline  прежнее поведение: bcrypt выполняется в общем пуле потоков
+            (как в синхронном обработчике), без ограничения очереди;
+    pool    текущая версия: отдельный пул процессов и отказ 503 при
+            заполненной очереди.
+
+Выводятся p50/p99 задержки чтения новостей в обеих фазах, пропускная
+способность логинов и число отказов 503 (клиенты соблюдают Retry-After).
+
+    python benchmarks/bench_login_storm.py --readers 8 --logins 64 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from bench_auth_load import wait_ready
+
+# Асинхронный и синхронный (выполняется в пуле потоков) обработчики
+NEWS_PATHS = ["/api/news/?limit=20", "/api/news/search?q=технологии"]
+
+
+def serve(mode: str, port: int):
+    """Запуск приложения (в дочернем процессе, рабочий каталог — временный)"""
+    import uvicorn
+    from starlette.concurrency import run_in_threadpool
+
+    import auth
+    import main
+
+    if mode == "inline":
+        async def run_inline(func, *args):
+            return await run_in_threadpool(func, *args)
+
+        auth.run_password_task = run_inline
+
+    uvicorn.run(main.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def percentiles(samples):
+    if not samples:
+        return 0.0, 0.0
+    samples = sorted(samples)
+    return samples[len(samples) // 2], samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+
+async def phase(session, base_url: str, readers: int, logins: int, duration: float) -> dict:
+    import aiohttp
+
+    news_latencies, login_status = [], {}
+    deadline = time.monotonic() + duration
+
+    async def reader(index: int):
+        while time.monotonic() < deadline:
+            index += 1
+            started = time.perf_counter()
+            try:
+                async with session.get(base_url + NEWS_PATHS[index % len(NEWS_PATHS)]) as response:
+                    await response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                continue
+            news_latencies.append((time.perf_counter() - started) * 1000)
+
+    async def login():
+        while time.monotonic() < deadline:
+            try:
+                async with session.post(base_url + "/auth/login", data={"username": "bench", "password": "bench"}) as response:
+                    await response.read()
+                    login_status[response.status] = login_status.get(response.status, 0) + 1
+                    retry_after = response.headers.get("Retry-After")
+                if retry_after:
+                    await asyncio.sleep(float(retry_after))
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                login_status["error"] = login_status.get("error", 0) + 1
+
+    started = time.monotonic()
+    await asyncio.gather(*(reader(i) for i in range(readers)), *(login() for _ in range(logins)))
+    elapsed = time.monotonic() - started
+    p50, p99 = percentiles(news_latencies)
+    return {
+        "news_p50": p50,
+        "news_p99": p99,
+        "news_rps": len(news_latencies) / elapsed,
+        "logins_ok": login_status.get(200, 0) / elapsed,
+        "rejected": login_status.get(503, 0),
+    }
+
+
+async def load(base_url: str, args) -> list:
+    import aiohttp
+
+    connector = aiohttp.TCPConnector(limit=args.readers + args.logins)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=30)) as session:
+        await wait_ready(session, base_url)
+        credentials = {"email": "bench@example.com", "username": "bench", "password": "bench"}
+        await session.post(base_url + "/auth/register", json=credentials)
+        quiet = await phase(session, base_url, args.readers, 0, args.duration)
+        storm = await phase(session, base_url, args.readers, args.logins, args.duration)
+    return [("quiet", quiet), ("storm", storm)]
+
+
+def run_mode(mode: str, args) -> list:
+    with tempfile.TemporaryDirectory() as tmp:
+        os.symlink(ROOT / "templates", Path(tmp) / "templates")
+        env = dict(os.environ, INGEST_SCHEDULER_ENABLED="0", PYTHONPATH=str(ROOT))
+        subprocess.run([sys.executable, str(ROOT / "add_test_data.py")], cwd=tmp, env=env,
+                       stdout=subprocess.DEVNULL, check=False)
+        server = subprocess.Popen(
+            [sys.executable, __file__, "--serve", mode, "--port", str(args.port)], cwd=tmp, env=env
+        )
+        try:
+            return asyncio.run(load(f"http://127.0.0.1:{args.port}", args))
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+                server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--modes", default="inline,pool")
+    parser.add_argument("--serve", choices=["inline", "pool"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port)
+        return
+
+    print(f"{'mode':<7} {'phase':<6} {'news p50':>9} {'news p99':>9} {'news/s':>7} {'logins/s':>9} {'503':>6}")
+    for mode in args.modes.split(","):
+        for name, stats in run_mode(mode, args):
+            print(f"{mode:<7} {name:<6} {stats['news_p50']:>9.1f} {stats['news_p99']:>9.1f} "
+                  f"{stats['news_rps']:>7.0f} {stats['logins_ok']:>9.1f} {stats['rejected']:>6}")
+
+
+if __name__ == "__main__":
+    main()
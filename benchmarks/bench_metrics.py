@@ -0,0 +1,98 @@
+"""Бенчмарк стоимости метрик: наносекунды на HTTP-запрос и на SQL-запрос.
+
+HTTP: минимальное приложение Starlette с одним маршрутом вызывается напрямую
+через ASGI (без сети и сериализации) с metrics.MetricsMiddleware и без него.
+SQL: SELECT 1 на SQLite в памяти с обработчиками metrics.instrument_engine и
+без них, внутри HTTP-запроса (с учетом в его счетчиках).
+
+    python benchmarks/bench_metrics.py --requests 50000 --queries 50000
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, text
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.responses import Response
+from starlette.routing import Route
+
+import metrics
+
+
+async def endpoint(request):
+    return Response(b"ok")
+
+
+def make_app(instrumented: bool) -> Starlette:
+    middleware = [Middleware(metrics.MetricsMiddleware)] if instrumented else []
+    return Starlette(routes=[Route("/api/news/{news_id}", endpoint)], middleware=middleware)
+
+
+async def call_many(app, count: int) -> float:
+    """Секунды на count запросов"""
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for n in range(count):
+        scope = {"type": "http", "method": "GET", "path": f"/api/news/{n}", "raw_path": b"", "root_path": "",
+                 "query_string": b"", "headers": [], "scheme": "http", "server": ("test", 80)}
+        await app(scope, receive, send)
+    return time.perf_counter() - started
+
+
+def query_many(engine, count: int) -> float:
+    statement = text("SELECT 1")
+    with engine.connect() as connection:
+        started = time.perf_counter()
+        for _ in range(count):
+            connection.execute(statement)
+        return time.perf_counter() - started
+
+
+def best(run, repeats: int) -> float:
+    return min(run() for _ in range(repeats))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=50_000)
+    parser.add_argument("--repeats", type=int, default=5, help="берется лучший из повторов")
+    args = parser.parse_args()
+
+    plain, instrumented = make_app(False), make_app(True)
+    loop = asyncio.new_event_loop()
+    timings = {}
+    for label, app in (("без метрик", plain), ("с метриками", instrumented)):
+        loop.run_until_complete(call_many(app, 1000))
+        timings[label] = best(lambda: loop.run_until_complete(call_many(app, args.requests)), args.repeats)
+        print(f"HTTP {label:<12} {timings[label] / args.requests * 1e9:10,.0f} нс/запрос")
+    overhead = (timings["с метриками"] - timings["без метрик"]) / args.requests * 1e9
+    print(f"HTTP накладные расходы {overhead:10,.0f} нс/запрос")
+
+    plain_engine = create_engine("sqlite://")
+    instrumented_engine = create_engine("sqlite://")
+    metrics.instrument_engine(instrumented_engine, "bench")
+    # Как внутри HTTP-запроса: запросы складываются в его счетчики
+    metrics._request_queries.set([0, 0.0])
+    timings = {}
+    for label, engine in (("без метрик", plain_engine), ("с метриками", instrumented_engine)):
+        query_many(engine, 1000)
+        timings[label] = best(lambda: query_many(engine, args.queries), args.repeats)
+        print(f"SQL  {label:<12} {timings[label] / args.queries * 1e9:10,.0f} нс/запрос")
+    overhead = (timings["с метриками"] - timings["без метрик"]) / args.queries * 1e9
+    print(f"SQL  накладные расходы {overhead:10,.0f} нс/запрос")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Бенчмарк HTML-страниц: страниц в секунду для /news и статической главной.
+
+Приложение запускается в том же процессе (ASGI-транспорт httpx) на SQLite базе,
+заполненной datagen.py. Сценарии выполняются concurrency параллельными
+клиентами: /news без изменений данных, /news со сбросом версии данных каждые
+--invalidate-every запросов (как при постоянной загрузке новостей) и главная
+страница. Тело читается без распаковки, чтобы мерить сервер, а не клиента.
+
+    python benchmarks/bench_pages.py --articles 20000 --concurrency 16 --encoding gzip
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+async def run_scenario(client, path: str, headers: dict, concurrency: int, duration: float,
+                       invalidate_every: int = 0) -> dict:
+    from cache import LIST, response_cache
+    latencies, sizes, statuses = [], [], {}
+    counter = 0
+
+    async def worker(deadline: float):
+        nonlocal counter
+        while time.monotonic() < deadline:
+            counter += 1
+            if invalidate_every and counter % invalidate_every == 0:
+                response_cache.invalidate(LIST)
+            started = time.perf_counter()
+            async with client.stream("GET", path, headers=headers) as response:
+                size = 0
+                async for chunk in response.aiter_raw():
+                    size += len(chunk)
+            latencies.append((time.perf_counter() - started) * 1000)
+            sizes.append(size)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.monotonic()
+    await asyncio.gather(*(worker(started + duration) for _ in range(concurrency)))
+    elapsed = time.monotonic() - started
+    latencies.sort()
+    return {
+        "pages_per_second": len(latencies) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2],
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "bytes": sum(sizes) // max(1, len(sizes)),
+        "statuses": statuses,
+    }
+
+
+async def run(args):
+    import httpx
+
+    import main
+    app = main.app
+    headers = {"Accept-Encoding": args.encoding}
+    scenarios = [
+        ("/news", "/news", 0),
+        (f"/news, сброс каждые {args.invalidate_every}", "/news", args.invalidate_every),
+        ("/", "/", 0),
+    ]
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            for label, path, invalidate_every in scenarios:
+                await run_scenario(client, path, headers, args.concurrency, args.warmup, invalidate_every)
+                result = await run_scenario(client, path, headers, args.concurrency, args.duration, invalidate_every)
+                print(f"{label:<28} {result['pages_per_second']:>9.1f} стр/с  p50 {result['p50_ms']:7.2f} мс  "
+                      f"p99 {result['p99_ms']:7.2f} мс  {result['bytes']:>7} байт  {result['statuses']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database", help="файл SQLite; если в нем нет статей, он заполняется datagen.py")
+    parser.add_argument("--articles", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5.0, help="секунд на сценарий")
+    parser.add_argument("--warmup", type=float, default=1.0)
+    parser.add_argument("--invalidate-every", type=int, default=100, help="запросов между сбросами версии данных")
+    parser.add_argument("--encoding", default="gzip", help="Accept-Encoding клиента (identity — без сжатия)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.abspath(args.database or os.path.join(tmp, "bench.db"))
+        os.environ.update(DATABASE_URL=f"sqlite:///{path}", INGEST_SCHEDULER_ENABLED="0", RETENTION_INTERVAL="0",
+                          STATS_RECONCILE_INTERVAL="0", LOG_LEVEL=os.getenv("LOG_LEVEL", "WARNING"))
+        import sqlite3
+        connection = sqlite3.connect(path)
+        try:
+            count = connection.execute("SELECT count(*) FROM news_articles").fetchone()[0]
+        except sqlite3.OperationalError:
+            count = 0
+        finally:
+            connection.close()
+        if not count:
+            subprocess.run([sys.executable, str(ROOT / "datagen.py"), "--articles", str(args.articles), "--users", "0"],
+                           cwd=ROOT, check=True)
+        # Шаблоны ищутся относительно рабочего каталога
+        os.chdir(ROOT)
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
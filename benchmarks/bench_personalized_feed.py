@@ -0,0 +1,126 @@
+"""Бенчмарк персональной ленты: построение лент и задержка выдачи страницы.
+
+Создает временную SQLite базу с синтетическими новостями и пользователями с
+предпочтениями, рассчитывает ленты (FeedRanker.warm), затем измеряет p50/p99
+выдачи страницы из кеша, добавления новых статей во все ленты и, для
+сравнения, прежнего запроса по категориям.
+
+    python benchmarks/bench_personalized_feed.py --rows 200000 --users 1000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+import models
+from classifier import CATEGORY_KEYWORDS
+from ranking import FeedRanker
+from migrate import upgrade
+
+CATEGORIES = list(CATEGORY_KEYWORDS)
+WORDS = (
+    "правительство сборная футбол рубль биржа инфляция ученые открытие космос театр выставка "
+    "концерт смартфон технологии компания рынок министр парламент выборы матч чемпионат "
+    "хоккей медицина исследование фильм музыка банк инвестиции санкции погода москва регион"
+).split()
+
+
+def seed(engine, rows: int, users: int, chunk: int = 20000):
+    rng = random.Random(1)
+    start = datetime.now() - timedelta(minutes=rows)
+    with engine.begin() as conn:
+        for offset in range(0, rows, chunk):
+            conn.execute(insert(models.NewsArticle), [
+                {
+                    "title": " ".join(rng.choices(WORDS, k=6)).capitalize(),
+                    "summary": " ".join(rng.choices(WORDS, k=25)) + ".",
+                    "url": f"https://example.com/news/{i}",
+                    "url_key": f"https://example.com/news/{i}",
+                    "source": "ТАСС",
+                    "category": rng.choice(CATEGORIES),
+                    "published_at": start + timedelta(minutes=i),
+                }
+                for i in range(offset, min(offset + chunk, rows))
+            ])
+        conn.execute(insert(models.User), [
+            {"email": f"user{i}@example.com", "username": f"user{i}", "hashed_password": "-"}
+            for i in range(users)
+        ])
+        user_ids = [row[0] for row in conn.execute(models.User.__table__.select().with_only_columns(models.User.id))]
+        preferences = []
+        for user_id in user_ids:
+            preferences += [{"user_id": user_id, "category": c, "keyword": None} for c in rng.sample(CATEGORIES, 2)]
+            preferences += [{"user_id": user_id, "category": None, "keyword": w} for w in rng.sample(WORDS, 2)]
+        conn.execute(insert(models.UserPreference), preferences)
+    return user_ids
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2], samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(2)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        upgrade(engine)
+        user_ids = seed(engine, args.rows, args.users)
+
+        ranker = FeedRanker()
+        with sessionmaker(bind=engine)() as db:
+            started = time.perf_counter()
+            ranker.warm(db)
+            elapsed = time.perf_counter() - started
+            print(f"warm: {len(user_ids)} лент за {elapsed:.1f}с ({elapsed / len(user_ids) * 1000:.1f} мс на ленту)")
+
+            samples = []
+            for _ in range(args.requests):
+                user_id, skip = rng.choice(user_ids), rng.choice((0, 20, 40))
+                t = time.perf_counter()
+                ranker.get_feed(db, user_id, limit=args.limit, skip=skip)
+                samples.append((time.perf_counter() - t) * 1000)
+            p50, p99 = percentiles(samples)
+            print(f"get_feed (кеш):        p50 {p50:.3f} мс, p99 {p99:.3f} мс")
+
+            samples = []
+            for user_id in user_ids[:200]:
+                categories = [c for c, in db.query(models.UserPreference.category).filter(
+                    models.UserPreference.user_id == user_id, models.UserPreference.category.isnot(None))]
+                t = time.perf_counter()
+                db.query(models.NewsArticle).filter(
+                    models.NewsArticle.is_active == True, models.NewsArticle.category.in_(categories)
+                ).order_by(models.NewsArticle.published_at.desc()).limit(args.limit).all()
+                samples.append((time.perf_counter() - t) * 1000)
+            p50, p99 = percentiles(samples)
+            print(f"запрос по категориям:  p50 {p50:.3f} мс, p99 {p99:.3f} мс")
+
+            batch = [
+                {"id": args.rows + i + 1, "title": "Футбол и банк", "summary": "", "source": "ТАСС",
+                 "category": rng.choice(CATEGORIES), "url": f"https://example.com/new/{i}",
+                 "published_at": datetime.now(), "is_active": True, "created_at": datetime.now()}
+                for i in range(100)
+            ]
+            t = time.perf_counter()
+            ranker.on_articles_added(batch)
+            print(f"on_articles_added: 100 статей в {len(user_ids)} лент за {(time.perf_counter() - t) * 1000:.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
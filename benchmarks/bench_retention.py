@@ -0,0 +1,129 @@
+"""Бенчмарк хранения: размер таблицы и скорость запросов при длительной работе.
+
+Моделирует days дней загрузки по per-day статей (часть из них удаляется) в
+двух временных SQLite базах: с ежедневным переносом в архив и без него.
+Периодически печатает число строк, размер файла и время типичных запросов:
+первой страницы ленты, категории и подсчета активных статей.
+
+    python benchmarks/bench_retention.py --days 365 --per-day 2000 --retention-days 30
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import sessionmaker
+
+import models
+import stats
+from database import make_engine
+from retention import RetentionManager
+
+CATEGORIES = ["политика", "экономика", "спорт", "технологии", "культура", "общее"]
+QUERY_REPEATS = 20
+
+
+def load_day(Session, day: datetime, per_day: int, inactive_rate: float, offset: int, rng: random.Random):
+    rows = [
+        {
+            "title": f"Заголовок {n}",
+            "summary": f"Описание новости {n} " * 8,
+            "url": f"https://example.com/news/{n}",
+            "url_key": models.normalize_url(f"https://example.com/news/{n}"),
+            "source": f"Источник {n % 20}",
+            "category": rng.choice(CATEGORIES),
+            "published_at": day + timedelta(seconds=86400 * i / per_day),
+            "is_active": True,
+        }
+        for i, n in enumerate(range(offset, offset + per_day))
+    ]
+    with Session() as db:
+        db.execute(insert(models.NewsArticle), rows)
+        stats.apply_deltas(db.connection(), stats.article_deltas(rows))
+        db.commit()
+        # Мягкое удаление части статей, как DELETE /api/news/{id}
+        deleted = [row for row in rows if rng.random() < inactive_rate]
+        if deleted:
+            table = models.NewsArticle.__table__
+            db.execute(update(table).where(table.c.url_key.in_([row["url_key"] for row in deleted]))
+                       .values(is_active=False, updated_at=day + timedelta(days=1)))
+            stats.apply_deltas(db.connection(), stats.article_deltas(deleted, sign=-1))
+            db.commit()
+
+
+def timed(Session, statement) -> float:
+    """Среднее время запроса в миллисекундах"""
+    with Session() as db:
+        db.execute(statement).all()
+        started = time.perf_counter()
+        for _ in range(QUERY_REPEATS):
+            db.execute(statement).all()
+        return (time.perf_counter() - started) / QUERY_REPEATS * 1000
+
+
+def report(label: str, Session, path: str, retention_seconds: float):
+    article = models.NewsArticle
+    active = article.is_active == True
+    feed = select(article.id, article.title).where(active).order_by(article.published_at.desc(), article.id.desc()).limit(50)
+    category = (select(article.id, article.title).where(article.category == "спорт", active)
+                .order_by(article.published_at.desc()).limit(50))
+    count = select(func.count()).select_from(article).where(active)
+    with Session() as db:
+        hot = db.scalar(select(func.count()).select_from(article))
+        archived = db.scalar(select(func.count()).select_from(models.NewsArchive))
+    size = sum(os.path.getsize(path + suffix) for suffix in ("", "-wal") if os.path.exists(path + suffix))
+    print(f"  {label:<10} строк {hot:>8}, в архиве {archived:>8}, файл {size / 2**20:7.1f} МБ | "
+          f"лента {timed(Session, feed):6.2f} мс, категория {timed(Session, category):6.2f} мс, "
+          f"подсчет {timed(Session, count):7.2f} мс | архивирование {retention_seconds:5.2f} с")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--per-day", type=int, default=2000, help="статей в день")
+    parser.add_argument("--inactive-rate", type=float, default=0.05, help="доля удаляемых статей")
+    parser.add_argument("--retention-days", type=float, default=30)
+    parser.add_argument("--inactive-days", type=float, default=7)
+    parser.add_argument("--max-rows", type=int, default=0, help="максимум активных статей (0 — без ограничения)")
+    parser.add_argument("--batch", type=int, default=1000, help="статей в одной транзакции переноса")
+    parser.add_argument("--report-every", type=int, default=30, help="печатать состояние каждые N дней")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setups = {}
+        for label in ("архив", "без архива"):
+            path = os.path.join(tmp, f"{len(setups)}.db")
+            engine = make_engine(f"sqlite:///{path}")
+            models.Base.metadata.create_all(bind=engine)
+            Session = sessionmaker(bind=engine)
+            manager = RetentionManager(session_factory=Session, interval=0, days=args.retention_days,
+                                       inactive_days=args.inactive_days, max_rows=args.max_rows,
+                                       batch_size=args.batch, bind=engine)
+            setups[label] = (Session, path, manager if label == "архив" else None)
+
+        started_at = datetime(2026, 1, 1)
+        retention_seconds = {label: 0.0 for label in setups}
+        for day in range(args.days):
+            today = started_at + timedelta(days=day)
+            for label, (Session, path, manager) in setups.items():
+                load_day(Session, today, args.per_day, args.inactive_rate, day * args.per_day, random.Random(day))
+                if manager is not None:
+                    started = time.perf_counter()
+                    manager.run_once(now=today + timedelta(days=1))
+                    retention_seconds[label] += time.perf_counter() - started
+            if (day + 1) % args.report_every == 0 or day + 1 == args.days:
+                print(f"день {day + 1}: загружено {(day + 1) * args.per_day} статей")
+                for label, (Session, path, manager) in setups.items():
+                    report(label, Session, path, retention_seconds[label])
+                    retention_seconds[label] = 0.0
+
+
+if __name__ == "__main__":
+    main()
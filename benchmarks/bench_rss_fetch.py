@@ -0,0 +1,106 @@
+"""Бенчмарк загрузки RSS: последовательный feedparser против AsyncFeedFetcher.
+
+Поднимает локальный сервер-заглушку с искусственной задержкой и измеряет
+время загрузки в зависимости от числа источников. Каждому источнику выдается
+собственный адрес 127.0.0.N, чтобы лимит соединений на хост не искажал картину.
+
+    python benchmarks/bench_rss_fetch.py --latency 0.3 --sources 1 2 4 8 16
+"""
+import argparse
+import asyncio
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import feedparser
+from aiohttp import web
+
+from fetcher import AsyncFeedFetcher, shutdown_parse_executor
+
+
+def build_feed(items: int) -> bytes:
+    entries = "".join(
+        f"<item><title>Новость номер {i}</title>"
+        f"<link>https://example.com/news/{i}</link>"
+        f"<description>Краткое описание новости номер {i}</description></item>"
+        for i in range(items)
+    )
+    return (
+        '<?xml version="1.0" encoding="utf-8"?><rss version="2.0"><channel>'
+        f"<title>Stub</title>{entries}</channel></rss>"
+    ).encode("utf-8")
+
+
+async def start_stub_server(latency: float, items: int):
+    body = build_feed(items)
+
+    async def handler(request):
+        await asyncio.sleep(latency)
+        return web.Response(body=body, content_type="application/rss+xml")
+
+    app = web.Application()
+    app.router.add_get("/feed/{n}", handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "0.0.0.0", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, port
+
+
+def make_sources(port: int, count: int):
+    return [
+        {"url": f"http://127.0.0.{i % 250 + 1}:{port}/feed/{i}", "source": f"stub-{i}", "category": "общее"}
+        for i in range(count)
+    ]
+
+
+def run_sequential(sources):
+    for source in sources:
+        feedparser.parse(source["url"])
+
+
+async def run_concurrent(sources, parse_executor):
+    async with AsyncFeedFetcher(executor=parse_executor) as fetcher:
+        results = await fetcher.fetch_all(sources)
+    failed = [r for r in results if r.error]
+    if failed:
+        raise RuntimeError(f"{len(failed)} источников завершились ошибкой: {failed[0].error}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.3, help="задержка ответа сервера, с")
+    parser.add_argument("--items", type=int, default=50, help="записей в ленте")
+    parser.add_argument("--sources", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    runner, port = await start_stub_server(args.latency, args.items)
+    loop = asyncio.get_running_loop()
+    blocking_pool = ThreadPoolExecutor(max_workers=1)
+    try:
+        print(f"latency={args.latency}s items={args.items}")
+        print(f"{'sources':>8} {'sequential, s':>14} {'async, s':>10} {'speedup':>8}")
+        for count in args.sources:
+            sources = make_sources(port, count)
+
+            started = time.perf_counter()
+            await loop.run_in_executor(blocking_pool, run_sequential, sources)
+            sequential = time.perf_counter() - started
+
+            started = time.perf_counter()
+            await run_concurrent(sources, None)
+            concurrent = time.perf_counter() - started
+
+            print(f"{count:>8} {sequential:>14.3f} {concurrent:>10.3f} {sequential / concurrent:>7.1f}x")
+    finally:
+        blocking_pool.shutdown()
+        shutdown_parse_executor()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,113 @@
+"""Бенчмарк поиска: FTS5 (search_news) против LIKE '%q%' по title/summary.
+
+Создает временную SQLite базу с синтетическими новостями (FTS индекс
+заполняется триггерами при вставке) и сравнивает задержку запросов.
+
+    python benchmarks/bench_search.py --rows 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import sessionmaker
+
+import models
+from migrate import upgrade
+from search import search_news
+
+WORDS = (
+    "правительство сборная футбол рубль биржа инфляция ученые открытие космос театр выставка "
+    "концерт смартфон технологии компания рынок министр парламент выборы матч чемпионат "
+    "хоккей медицина исследование фильм музыка банк инвестиции санкции погода москва регион "
+    "город область заявил сообщил решение проект строительство транспорт школа университет"
+).split()
+
+SYLLABLES = "ба ве ги до ку ла ме ни по ру са те фи хо цу ча ше ры мо зе ля ко ти".split()
+
+QUERIES = ["футбол", "рубля", "космос открытие", "министр финансов", "выставка театр", "университете"]
+
+
+def build_vocabulary(rng, size: int = 20000):
+    """Словарь с распределением Ципфа: тематические слова частые, синтетические — редкие"""
+    synthetic = {"".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))) for _ in range(size)}
+    vocabulary = WORDS + sorted(synthetic)
+    rng.shuffle(vocabulary)
+    cum_weights, total = [], 0.0
+    for rank in range(1, len(vocabulary) + 1):
+        total += 1.0 / rank
+        cum_weights.append(total)
+    return vocabulary, cum_weights
+
+
+def seed(engine, rows: int, chunk: int = 20000):
+    rng = random.Random(1)
+    start = datetime(2020, 1, 1)
+    vocabulary, cum_weights = build_vocabulary(rng)
+
+    def phrase(k):
+        return " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=k)).capitalize()
+
+    with engine.begin() as conn:
+        for offset in range(0, rows, chunk):
+            conn.execute(insert(models.NewsArticle), [
+                {
+                    "title": phrase(7),
+                    "summary": phrase(30) + ".",
+                    "url": f"https://example.com/news/{i}",
+                    "url_key": f"https://example.com/news/{i}",
+                    "source": "ТАСС",
+                    "category": "общее",
+                    "published_at": start + timedelta(minutes=i),
+                }
+                for i in range(offset, min(offset + chunk, rows))
+            ])
+
+
+def timed(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        upgrade(engine)
+
+        started = time.perf_counter()
+        seed(engine, args.rows)
+        print(f"seed: {args.rows} строк (с индексацией FTS) за {time.perf_counter() - started:.1f}с")
+
+        like_sql = text(
+            "SELECT id FROM news_articles WHERE is_active AND (title LIKE :q OR summary LIKE :q) "
+            "ORDER BY published_at DESC LIMIT :limit"
+        )
+        with sessionmaker(bind=engine)() as db:
+            print(f"{'query':<22} {'LIKE, ms':>10} {'FTS5, ms':>10}")
+            for query in QUERIES:
+                pattern = f"%{query.split()[0]}%"
+                like_ms = timed(lambda: db.execute(like_sql, {"q": pattern, "limit": args.limit}).all(), args.repeat)
+                fts_ms = timed(lambda: search_news(db, query, args.limit), args.repeat)
+                print(f"{query:<22} {like_ms:>10.1f} {fts_ms:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
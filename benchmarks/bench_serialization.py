@@ -0,0 +1,117 @@
+"""Бенчмарк сериализации списков новостей: ORM + Pydantic против строк + orjson.
+
+Создает временную SQLite базу и многократно строит JSON-страницу новостей
+двумя способами:
+
+    orm   прежний путь: ORM-объекты, затем то же, что делает FastAPI для
+          response_model=List[NewsArticle] (валидация from_attributes,
+          jsonable_encoder, json.dumps в JSONResponse);
+    rows  текущий путь: select() нужных столбцов и serialization.dump_news_rows.
+
+Выводится число строк в секунду только на сериализацию и вместе с запросом
+к БД.
+
+    python benchmarks/bench_serialization.py --rows 5000 --page 100
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+import models
+import schemas as sch
+from serialization import dump_news_rows, news_rows
+
+
+def seed(engine, rows: int):
+    start = datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(models.NewsArticle), [
+            {
+                "title": f"Новость номер {i}: правительство обсудило «бюджет»",
+                "summary": "Краткое описание новости с кириллицей и спецсимволами \"<>&\". " * 3,
+                "url": f"https://example.com/news/{i}",
+                "url_key": f"https://example.com/news/{i}",
+                "source": "ТАСС",
+                "category": ("политика", "экономика", "спорт")[i % 3],
+                "published_at": start + timedelta(minutes=i),
+            }
+            for i in range(rows)
+        ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--page", type=int, default=100)
+    parser.add_argument("--pages", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        models.Base.metadata.create_all(bind=engine)
+        seed(engine, args.rows)
+        response_field = create_response_field(name="bench", type_=List[sch.NewsArticle])
+        order = (models.NewsArticle.published_at.desc(), models.NewsArticle.id.desc())
+
+        def offsets():
+            for page in range(args.pages):
+                yield (page * args.page) % max(1, args.rows - args.page)
+
+        def fetch_orm(db, offset):
+            return db.query(models.NewsArticle).order_by(*order).offset(offset).limit(args.page).all()
+
+        def fetch_rows(db, offset):
+            return db.execute(news_rows().order_by(*order).offset(offset).limit(args.page)).all()
+
+        async def encode_orm(items) -> int:
+            content = await serialize_response(field=response_field, response_content=items)
+            return len(JSONResponse(content).body)
+
+        async def encode_rows(rows) -> int:
+            return len(dump_news_rows(rows))
+
+        async def measure(db, fetch, encode):
+            """(секунды на сериализацию, секунды на запрос и сериализацию, байты)"""
+            encoding = total = 0.0
+            size = 0
+            for offset in offsets():
+                started = time.perf_counter()
+                page = fetch(db, offset)
+                fetched = time.perf_counter()
+                size += await encode(page)
+                finished = time.perf_counter()
+                encoding += finished - fetched
+                total += finished - started
+                db.expunge_all()
+            return encoding, total, size
+
+        results = {}
+        with sessionmaker(bind=engine)() as db:
+            for name, fetch, encode in (("orm", fetch_orm, encode_orm), ("rows", fetch_rows, encode_rows)):
+                asyncio.run(measure(db, fetch, encode))
+                results[name] = asyncio.run(measure(db, fetch, encode))
+
+        count = args.pages * args.page
+        print(f"{'path':<6} {'encode rows/s':>14} {'end-to-end rows/s':>18} {'bytes':>10}")
+        for name, (encoding, total, size) in results.items():
+            print(f"{name:<6} {count / encoding:>14.0f} {count / total:>18.0f} {size:>10}")
+        print(f"ускорение сериализации: x{results['orm'][0] / results['rows'][0]:.1f}, "
+              f"с запросом к БД: x{results['orm'][1] / results['rows'][1]:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+"""Пакетные операции с новостями: создание, изменение и удаление в одном запросе.
+
+Тело запроса — NDJSON (по операции в строке, читается потоком) или JSON-массив:
+
+    {"op": "create", "data": {"title": ..., "url": ..., ...}}
+    {"op": "update", "id": 5, "data": {"category": "спорт"}}
+    {"op": "delete", "id": 5}
+
+Операции проверяются по одной по мере чтения и применяются порциями по
+BULK_CHUNK_SIZE: на порцию — один SELECT затронутых статей и один — занятых
+URL, INSERT и UPDATE через executemany и одна фиксация. С atomic=true все
+порции выполняются в одной транзакции, и любая ошибка откатывает весь запрос
+(блокировка записи SQLite держится до конца чтения тела).
+
+Число операций ограничено BULK_MAX_OPERATIONS. JSON-массив сверх лимита
+отклоняется (413) до применения. В NDJSON лимит становится известен только при
+чтении тела, когда предыдущие порции уже могут быть зафиксированы, поэтому на
+операции сверх лимита чтение прекращается, а в результате появляется
+truncated_at — номер первой необработанной. Без atomic примененные операции
+остаются в силе; с atomic=true все откатывается.
+"""
+import os
+from datetime import datetime
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import bindparam, insert, select, update
+from starlette.concurrency import run_in_threadpool
+
+import schemas as sch
+from cache import ALL, response_cache
+from clustering import story_clusterer
+from database import SessionLocal
+from ingestion import notify_listeners
+from models import NewsArticle, normalize_url
+from ranking import feed_ranker
+from serialization import loads
+from stats import Deltas, apply_deltas, article_deltas, count_article
+
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "1000"))
+BULK_MAX_OPERATIONS = int(os.getenv("BULK_MAX_OPERATIONS", "100000"))
+
+CREATED = "created"
+UPDATED = "updated"
+DELETED = "deleted"
+FAILED = "failed"
+ROLLED_BACK = "rolled_back"
+
+OPERATION = TypeAdapter(sch.NewsBulkOperation)
+TABLE = NewsArticle.__table__
+# Состояние статьи, которое читается перед изменением и пишется UPDATE
+STATE_FIELDS = ("title", "summary", "source", "category", "url", "url_key", "published_at", "is_active", "cluster_id")
+# created_at нужен только для снимков статей в лентах
+READ_FIELDS = STATE_FIELDS + ("created_at",)
+READ_COLUMNS = (TABLE.c.id, *(TABLE.c[name] for name in READ_FIELDS))
+NOT_NULL_FIELDS = ("title", "source", "url", "published_at")
+
+
+async def read_operations(request: Request) -> AsyncIterator[Tuple[int, object]]:
+    """(номер, операция): строки NDJSON в байтах или элементы JSON-массива"""
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonl" in content_type:
+        index = 0
+        buffer = b""
+        async for data in request.stream():
+            buffer += data
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield index, line
+                    index += 1
+        if buffer.strip():
+            yield index, buffer
+        return
+    try:
+        items = loads(await request.body())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array or NDJSON of operations")
+    if len(items) > BULK_MAX_OPERATIONS:
+        # Массив прочитан целиком — лимит проверяется до применения
+        raise HTTPException(status_code=413, detail=f"Too many operations (max {BULK_MAX_OPERATIONS})")
+    for index, item in enumerate(items):
+        yield index, item
+
+
+def validate_operation(item):
+    if isinstance(item, (bytes, str)):
+        return OPERATION.validate_json(item)
+    return OPERATION.validate_python(item)
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(map(str, item['loc']))}: {item['msg']}" if item["loc"] else item["msg"] for item in error.errors()
+    )
+
+
+class BulkApplier:
+    """Применение операций порциями в одной сессии.
+
+    Результаты копятся по номерам операций; изменения в памяти (индекс сюжетов,
+    ленты, кеш ответов) выполняются только после фиксации соответствующей
+    транзакции.
+    """
+
+    def __init__(self, session_factory=SessionLocal, atomic: bool = False, chunk_size: int = BULK_CHUNK_SIZE):
+        self.db = session_factory()
+        self.atomic = atomic
+        self.chunk_size = chunk_size
+        self.results: List[dict] = []
+        self.failed = False
+        # Номер первой операции сверх BULK_MAX_OPERATIONS (чтение прекращено)
+        self.truncated_at: Optional[int] = None
+        self._effects: List[Callable[[], None]] = []
+
+    def fail(self, index: int, op: Optional[str], article_id: Optional[int], error: str):
+        self.results.append({"index": index, "op": op, "id": article_id, "status": FAILED, "error": error})
+        self.failed = True
+
+    def apply(self, chunk: List[Tuple[int, object]]):
+        pending, write = self._prepare(chunk)
+        if self.atomic and self.failed:
+            # Запрос все равно будет отменен: операции только проверяются
+            self.results.extend(pending)
+            return
+        try:
+            if write is not None:
+                self._effects.append(write())
+            if not self.atomic:
+                self.db.commit()
+                self._run_effects()
+        except Exception as e:
+            self.db.rollback()
+            self._effects.clear()
+            for result in pending:
+                result.update(status=FAILED, error=f"Database error: {e}")
+            self.failed = True
+        self.results.extend(pending)
+
+    def _prepare(self, chunk: List[Tuple[int, object]]):
+        """Проверка порции по текущему состоянию статей; SQL — в возвращаемой функции"""
+        db = self.db
+        article_ids = {operation.id for _, operation in chunk if operation.op != "create"}
+        state = {}
+        if article_ids:
+            state = {row[0]: dict(zip(READ_FIELDS, row[1:]))
+                     for row in db.execute(select(*READ_COLUMNS).where(TABLE.c.id.in_(article_ids)))}
+        url_keys = {}
+        for index, operation in chunk:
+            url = operation.data.url if operation.op != "delete" else None
+            if url is not None:
+                url_keys[index] = normalize_url(url)
+        # Владелец каждого URL. Освобожденный в порции URL остается за прежней
+        # статьей до фиксации, иначе порядок UPDATE нарушил бы уникальность
+        taken: Dict[str, int] = {}
+        if url_keys:
+            taken = dict(db.execute(select(TABLE.c.url_key, TABLE.c.id).where(TABLE.c.url_key.in_(set(url_keys.values())))).all())
+
+        pending = []
+        creates = []
+        before: Dict[int, dict] = {}
+        now = datetime.now()
+        for index, operation in chunk:
+            if operation.op == "create":
+                url_key = url_keys[index]
+                if url_key in taken:
+                    self.fail(index, operation.op, None, "News with this URL already exists")
+                    continue
+                taken[url_key] = 0
+                row = operation.data.model_dump()
+                row.update(url_key=url_key, published_at=row["published_at"] or now)
+                result = {"index": index, "op": operation.op, "id": None, "status": CREATED, "error": None}
+                creates.append((row, result))
+                pending.append(result)
+                continue
+
+            current = state.get(operation.id)
+            if current is None:
+                self.fail(index, operation.op, operation.id, "News not found")
+                continue
+            if operation.op == "delete":
+                before.setdefault(operation.id, dict(current))
+                current["is_active"] = False
+                pending.append({"index": index, "op": operation.op, "id": operation.id, "status": DELETED, "error": None})
+                continue
+
+            data = operation.data.model_dump(exclude_unset=True)
+            nulls = [name for name in NOT_NULL_FIELDS if name in data and data[name] is None]
+            if nulls:
+                self.fail(index, operation.op, operation.id, f"Fields may not be null: {', '.join(nulls)}")
+                continue
+            if "url" in data:
+                url_key = url_keys[index]
+                if taken.get(url_key, operation.id) != operation.id:
+                    self.fail(index, operation.op, operation.id, "News with this URL already exists")
+                    continue
+                taken[url_key] = operation.id
+                data["url_key"] = url_key
+            before.setdefault(operation.id, dict(current))
+            current.update(data)
+            pending.append({"index": index, "op": operation.op, "id": operation.id, "status": UPDATED, "error": None})
+
+        if not creates and not before:
+            return pending, None
+        return pending, lambda: self._write(creates, before, state)
+
+    def _write(self, creates: List[Tuple[dict, dict]], before: Dict[int, dict], state: Dict[int, dict]):
+        """SQL порции в текущей транзакции; возвращает действия после фиксации"""
+        connection = self.db.connection()
+        deltas = Deltas()
+
+        rows = [row for row, _ in creates]
+        if rows:
+            inserted = connection.execute(
+                insert(TABLE).returning(TABLE.c.id, TABLE.c.is_active, TABLE.c.created_at, sort_by_parameter_order=True),
+                rows,
+            ).all()
+            for (row, result), (article_id, is_active, created_at) in zip(creates, inserted):
+                row.update(id=article_id, is_active=is_active, created_at=created_at)
+                result["id"] = article_id
+            deltas.update(article_deltas(rows))
+
+        # UPDATE группируются по набору измененных столбцов (обычно их немного),
+        # чтобы не переписывать неизменные title/summary и индекс news_fts
+        groups: Dict[Tuple[str, ...], List[dict]] = {}
+        for article_id, old in before.items():
+            new = state[article_id]
+            fields = tuple(name for name in STATE_FIELDS if new[name] != old[name])
+            if fields:
+                groups.setdefault(fields, []).append({"b_id": article_id, **{f"b_{name}": new[name] for name in fields}})
+            if old["is_active"]:
+                count_article(deltas, old["category"], old["source"], -1)
+            if new["is_active"]:
+                count_article(deltas, new["category"], new["source"])
+        for fields, params in groups.items():
+            connection.execute(
+                update(TABLE).where(TABLE.c.id == bindparam("b_id")).values({name: bindparam(f"b_{name}") for name in fields}),
+                params,
+            )
+
+        assignments = story_clusterer.assign(rows)
+        story_clusterer.store(self.db, assignments)
+        for row, assignment in zip(rows, assignments):
+            row["cluster_id"] = assignment.cluster_id
+        removed = [article_id for article_id, old in before.items() if old["is_active"] and not state[article_id]["is_active"]]
+        new_heads = story_clusterer.promote_heads(self.db, [article_id for article_id in removed if state[article_id]["cluster_id"] == article_id])
+        apply_deltas(connection, deltas)
+
+        changed = [{"id": article_id, **state[article_id]} for article_id in before]
+        old_scopes = [{"id": article_id, "category": old["category"]} for article_id, old in before.items()]
+
+        def effects():
+            story_clusterer.add(assignments)
+            story_clusterer.on_articles_removed(removed, new_heads)
+            feed_ranker.on_articles_removed(before)
+            feed_ranker.on_articles_added([article for article in changed if article["is_active"]])
+            notify_listeners(rows)
+            if new_heads:
+                # У статей сюжета сменился cluster_id — они могут быть в любых категориях
+                response_cache.invalidate(ALL)
+            elif changed:
+                response_cache.invalidate_articles(changed + old_scopes)
+
+        return effects
+
+    def _run_effects(self):
+        effects, self._effects = self._effects, []
+        for effect in effects:
+            effect()
+
+    def finish(self) -> dict:
+        committed = not (self.atomic and (self.failed or self.truncated_at is not None))
+        if self.atomic:
+            if committed:
+                self.db.commit()
+                self._run_effects()
+            else:
+                self.db.rollback()
+                self._effects.clear()
+                for result in self.results:
+                    if result["status"] != FAILED:
+                        result["status"] = ROLLED_BACK
+        self.results.sort(key=lambda result: result["index"])
+        failed = sum(1 for result in self.results if result["status"] == FAILED)
+        applied = sum(1 for result in self.results if result["status"] in (CREATED, UPDATED, DELETED))
+        return {"atomic": self.atomic, "committed": committed, "applied": applied, "failed": failed,
+                "truncated_at": self.truncated_at, "results": self.results}
+
+    def close(self):
+        self.db.close()
+
+
+def response_status(result: dict) -> int:
+    """Код ответа на пакет; 413 и 400 означают, что ничего не сохранено"""
+    if result["truncated_at"] is not None and not (result["committed"] and result["applied"]):
+        return 413
+    return 200 if result["committed"] else 400
+
+
+async def run_bulk(request: Request, atomic: bool = False, applier: Optional[BulkApplier] = None) -> dict:
+    applier = applier or BulkApplier(atomic=atomic)
+    try:
+        chunk = []
+        async for index, item in read_operations(request):
+            if index >= BULK_MAX_OPERATIONS:
+                applier.truncated_at = index
+                break
+            try:
+                chunk.append((index, validate_operation(item)))
+            except ValidationError as e:
+                applier.fail(index, None, None, _validation_message(e))
+                continue
+            if len(chunk) >= applier.chunk_size:
+                await run_in_threadpool(applier.apply, chunk)
+                chunk = []
+        if chunk:
+            await run_in_threadpool(applier.apply, chunk)
+        return await run_in_threadpool(applier.finish)
+    finally:
+        await run_in_threadpool(applier.close)
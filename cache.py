@@ -0,0 +1,224 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastapi import Request, Response
+
+from ingestion import add_listener
+from user_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL", "redis://localhost:6379/0")
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "5000"))
+
+# Области версионирования. Ключ кешированного ответа содержит текущие версии
+# своих областей, поэтому запись устаревает сразу после увеличения версии и
+# больше не читается (а затем вытесняется по TTL/LRU).
+ALL = "all"
+LIST = "list"
+
+
+def category_scope(category: Optional[str]) -> str:
+    return f"category:{category}"
+
+
+def article_scope(article_id: int) -> str:
+    return f"article:{article_id}"
+
+
+@dataclass
+class CachedResponse:
+    """Сериализованный ответ: тело, тип, заголовки и ETag"""
+    body: bytes
+    media_type: str
+    headers: Dict[str, str] = field(default_factory=dict)
+    etag: str = ""
+
+    def __post_init__(self):
+        if not self.etag:
+            self.etag = '"' + hashlib.blake2b(self.body, digest_size=16).hexdigest() + '"'
+
+    def dumps(self) -> bytes:
+        meta = json.dumps({"media_type": self.media_type, "headers": self.headers, "etag": self.etag})
+        return meta.encode("utf-8") + b"\n" + self.body
+
+    @classmethod
+    def loads(cls, data: bytes) -> "CachedResponse":
+        meta, body = data.split(b"\n", 1)
+        return cls(body=body, **json.loads(meta))
+
+
+class MemoryBackend:
+    """Кеш в памяти процесса: ответы в TTL+LRU, версии областей в словаре"""
+
+    def __init__(self, max_size: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL):
+        self._entries = TTLCache(max_size, ttl)
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        return self._entries.get(key)
+
+    def set(self, key: str, value: CachedResponse):
+        self._entries.put(key, value)
+
+    def get_versions(self, scopes: List[str]) -> List[int]:
+        return [self._versions.get(scope, 0) for scope in scopes]
+
+    def bump(self, scopes: Iterable[str]):
+        with self._lock:
+            for scope in scopes:
+                self._versions[scope] = self._versions.get(scope, 0) + 1
+
+    def stats(self) -> dict:
+        return {"backend": "memory", **self._entries.stats()}
+
+
+class RedisBackend:
+    """Кеш в Redis (или совместимом сервере), общий для нескольких процессов.
+
+    Вытеснение LRU выполняет сам сервер (maxmemory-policy allkeys-lru), TTL
+    задается при записи. Ошибки соединения не ломают запрос: чтение считается
+    промахом, запись и увеличение версии пропускаются с записью в лог.
+    """
+
+    PREFIX = "news-cache:"
+    SOCKET_TIMEOUT = 0.05
+
+    def __init__(self, url: str = RESPONSE_CACHE_URL, ttl: float = RESPONSE_CACHE_TTL):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("Для RESPONSE_CACHE_BACKEND=redis установите пакет redis")
+        self.ttl = ttl
+        self.client = redis.Redis.from_url(
+            url, socket_timeout=self.SOCKET_TIMEOUT, socket_connect_timeout=self.SOCKET_TIMEOUT
+        )
+        self._errors = (redis.RedisError, OSError)
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        try:
+            data = self.client.get(self.PREFIX + key)
+        except self._errors:
+            logger.warning("Кеш ответов недоступен", exc_info=True)
+            return None
+        return CachedResponse.loads(data) if data is not None else None
+
+    def set(self, key: str, value: CachedResponse):
+        try:
+            self.client.set(self.PREFIX + key, value.dumps(), px=int(self.ttl * 1000))
+        except self._errors:
+            logger.warning("Кеш ответов недоступен", exc_info=True)
+
+    def get_versions(self, scopes: List[str]) -> List[int]:
+        try:
+            values = self.client.mget([self.PREFIX + "v:" + scope for scope in scopes])
+        except self._errors:
+            logger.warning("Кеш ответов недоступен", exc_info=True)
+            return [-1] * len(scopes)
+        return [int(value) if value is not None else 0 for value in values]
+
+    def bump(self, scopes: Iterable[str]):
+        try:
+            with self.client.pipeline(transaction=False) as pipe:
+                for scope in scopes:
+                    pipe.incr(self.PREFIX + "v:" + scope)
+                pipe.execute()
+        except self._errors:
+            logger.exception("Не удалось сбросить кеш ответов")
+
+    def stats(self) -> dict:
+        return {"backend": "redis"}
+
+
+def create_backend(name: str = RESPONSE_CACHE_BACKEND):
+    if name == "memory":
+        return MemoryBackend()
+    if name == "redis":
+        return RedisBackend()
+    raise ValueError(f"Неизвестный RESPONSE_CACHE_BACKEND: {name}")
+
+
+class ResponseCache:
+    """Кеш готовых ответов GET-обработчиков с ETag и точной инвалидацией.
+
+    Обработчик вызывает lookup() с областями, от которых зависит ответ. При
+    попадании возвращается готовый Response (или 304, если If-None-Match
+    совпал с ETag); при промахе обработчик строит тело и сохраняет его через
+    store(). Запись новостей вызывает invalidate() для затронутых областей.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend if backend is not None else create_backend()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def _key(self, request: Request, scopes: Tuple[str, ...]) -> Optional[str]:
+        versions = self.backend.get_versions([ALL, *scopes])
+        if any(version < 0 for version in versions):
+            return None
+        query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+        return f"{request.url.path}?{query}|" + ".".join(map(str, versions))
+
+    @staticmethod
+    def _respond(request: Request, entry: CachedResponse) -> Response:
+        headers = {**entry.headers, "ETag": entry.etag, "Cache-Control": "no-cache"}
+        if request.headers.get("if-none-match") == entry.etag:
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type=entry.media_type, headers=headers)
+
+    def lookup(self, request: Request, *scopes: str) -> Tuple[Optional[str], Optional[Response]]:
+        """Ключ записи и готовый ответ (None при промахе)"""
+        key = self._key(request, scopes)
+        entry = self.backend.get(key) if key is not None else None
+        if entry is None:
+            self.misses += 1
+            return key, None
+        self.hits += 1
+        response = self._respond(request, entry)
+        if response.status_code == 304:
+            self.not_modified += 1
+        return key, response
+
+    def store(self, request: Request, key: Optional[str], body: bytes, media_type: str = "application/json",
+              headers: Optional[Dict[str, str]] = None) -> Response:
+        entry = CachedResponse(body=body, media_type=media_type, headers=headers or {})
+        if key is not None:
+            self.backend.set(key, entry)
+        return self._respond(request, entry)
+
+    def invalidate(self, *scopes: str):
+        self.backend.bump(scopes)
+
+    def invalidate_articles(self, articles: Iterable[dict]):
+        """Сброс после записи статей (словари или объекты с id и category)"""
+        scopes = {LIST}
+        for article in articles:
+            if not isinstance(article, dict):
+                article = {"id": article.id, "category": article.category}
+            scopes.add(category_scope(article["category"]))
+            if article.get("id") is not None:
+                scopes.add(article_scope(article["id"]))
+        self.invalidate(*scopes)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "store": self.backend.stats(),
+        }
+
+
+response_cache = ResponseCache()
+add_listener(response_cache.invalidate_articles)
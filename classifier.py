@@ -0,0 +1,164 @@
+import re
+from typing import Dict, Iterable, List, Tuple
+
+DEFAULT_CATEGORY = "общее"
+
+# Ключевые слова категорий — фрагменты регулярных выражений по основам слов.
+# Каждый фрагмент должен совпадать с целым словом (или фразой): границы слова
+# добавляются автоматически, окончания задаются через \w* или явный перечень.
+# Первый символ фрагмента должен быть буквой.
+# Вес отражает, насколько уверенно слово указывает на категорию.
+CATEGORY_KEYWORDS: Dict[str, Dict[str, float]] = {
+    "технологии": {
+        r"ии": 1.0,
+        r"it": 1.0,
+        r"искусственн\w* интеллект\w*": 2.0,
+        r"нейросет\w*": 1.5,
+        r"программирован\w*": 1.0,
+        r"программист\w*": 1.0,
+        r"гаджет\w*": 1.0,
+        r"смартфон\w*": 1.0,
+        r"цифров\w*": 1.0,
+        r"технологи\w*": 2.0,
+        r"компьютер\w*": 1.0,
+    },
+    "политика": {
+        r"путин\w*": 1.5,
+        r"правительств\w*": 1.0,
+        r"выбор(?:ы|ов|ах|ам)": 1.5,
+        r"парламент\w*": 1.5,
+        r"министр\w*": 1.0,
+        r"санкци\w*": 1.0,
+        r"международн\w*": 0.5,
+        r"политик\w*": 2.0,
+        r"политическ\w*": 2.0,
+        r"государств\w*": 1.0,
+    },
+    "экономика": {
+        r"рубл\w*": 1.0,
+        r"доллар\w*": 1.0,
+        r"бирж\w*": 1.5,
+        r"инфляци\w*": 1.5,
+        r"бизнес\w*": 1.0,
+        r"компани\w*": 0.5,
+        r"рын(?:ок|к\w*)": 1.0,
+        r"экономик\w*": 2.0,
+        r"экономическ\w*": 2.0,
+        r"финанс\w*": 1.0,
+        r"банк\w*": 1.0,
+        r"инвестиц\w*": 1.0,
+    },
+    "спорт": {
+        r"футбол\w*": 1.5,
+        r"хокке\w*": 1.5,
+        r"чемпионат\w*": 1.5,
+        r"сборн(?:ая|ой|ую|ые|ых)": 1.0,
+        r"матч\w*": 1.0,
+        r"игрок\w*": 1.0,
+        r"спорт\w*": 2.0,
+        r"соревнован\w*": 1.5,
+        r"олимпийск\w*": 1.5,
+    },
+    "наука": {
+        r"исследован\w*": 1.0,
+        r"учен(?:ый|ые|ых|ым|ыми)": 1.5,
+        r"открыти\w*": 1.0,
+        r"космос\w*": 1.0,
+        r"космическ\w*": 1.0,
+        r"медицин\w*": 1.0,
+        r"наук\w*": 2.0,
+        r"научн\w*": 2.0,
+        r"изобретени\w*": 1.0,
+        r"лаборатор\w*": 1.0,
+    },
+    "культура": {
+        r"кино\w*": 1.0,
+        r"фильм\w*": 1.0,
+        r"музык\w*": 1.0,
+        r"концерт\w*": 1.0,
+        r"выставк\w*": 1.5,
+        r"театр\w*": 1.5,
+        r"культур\w*": 2.0,
+        r"искусств(?:о|а|у|ом|е)": 1.5,
+        r"артист\w*": 1.0,
+    },
+}
+
+
+class KeywordClassifier:
+    """Классификатор новостей по взвешенным ключевым словам.
+
+    Все ключевые слова собираются в одно регулярное выражение, поэтому текст
+    просматривается за один проход. Каждое совпадение добавляет вес слова к
+    своей категории; побеждает категория с наибольшей суммой.
+    """
+
+    PREFIX_DEPTH = 2
+
+    def __init__(self, category_keywords: Dict[str, Dict[str, float]] = CATEGORY_KEYWORDS,
+                 default: str = DEFAULT_CATEGORY):
+        self.default = default
+        self.categories = list(category_keywords)
+        # Номер группы в общем выражении -> (индекс категории, вес)
+        self._groups: List[Tuple[int, float]] = [(-1, 0.0)]
+        items = [
+            (keyword, category_index, weight)
+            for category_index, keywords in enumerate(category_keywords.values())
+            for keyword, weight in keywords.items()
+        ]
+        # Совпадение начинается с небуквенного символа перед словом: для такого
+        # выражения re быстро пропускает позиции внутри слов
+        self._pattern = re.compile(r"\W(?:" + self._build(items, self.PREFIX_DEPTH) + r")(?!\w)")
+
+    def _build(self, items: List[Tuple[str, int, float]], depth: int) -> str:
+        """Альтернатива ключевых слов, сгруппированных по первым буквам.
+
+        На каждой позиции re проверяет только ветку совпавшей буквы, а не все
+        ключевые слова подряд. Каждое слово остается отдельной группой захвата.
+        """
+        if depth == 0:
+            alternatives = []
+            for fragment, category_index, weight in items:
+                alternatives.append("(" + fragment.replace(" ", r"\s+") + ")")
+                self._groups.append((category_index, weight))
+            return "|".join(alternatives)
+
+        by_char: Dict[str, List[Tuple[str, int, float]]] = {}
+        rest = []
+        for fragment, category_index, weight in items:
+            if fragment[:1].isalpha():
+                by_char.setdefault(fragment[0], []).append((fragment[1:], category_index, weight))
+            else:
+                rest.append((fragment, category_index, weight))
+        branches = [re.escape(char) + "(?:" + self._build(sub, depth - 1) + ")" for char, sub in by_char.items()]
+        if rest:
+            branches.append(self._build(rest, 0))
+        return "|".join(branches)
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return " " + text.lower().replace("ё", "е")
+
+    def scores(self, text: str) -> List[float]:
+        """Суммарный вес совпадений по каждой категории"""
+        totals = [0.0] * len(self.categories)
+        groups = self._groups
+        for match in self._pattern.finditer(self._normalize(text)):
+            category_index, weight = groups[match.lastindex]
+            totals[category_index] += weight
+        return totals
+
+    def classify(self, text: str) -> Tuple[str, float]:
+        """Категория с наибольшим весом и сам вес; без совпадений — категория по умолчанию"""
+        totals = self.scores(text)
+        score = max(totals)
+        if score <= 0:
+            return self.default, 0.0
+        return self.categories[totals.index(score)], score
+
+    def classify_many(self, texts: Iterable[str]) -> List[Tuple[str, float]]:
+        classify = self.classify
+        return [classify(text) for text in texts]
+
+
+default_classifier = KeywordClassifier()
@@ -0,0 +1,429 @@
+import hashlib
+import logging
+import operator
+import os
+import random
+import re
+import threading
+from array import array
+from collections import Counter, deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, exists, func, select, update
+from sqlalchemy.orm import Session, aliased
+
+from models import NewsArticle
+from search import stem
+
+logger = logging.getLogger(__name__)
+
+# Сюжеты ищутся только среди статей за последние CLUSTER_WINDOW_HOURS часов
+CLUSTER_WINDOW_HOURS = float(os.getenv("CLUSTER_WINDOW_HOURS", "72"))
+# Минимальная оценка сходства Жаккара, при которой статья попадает в сюжет
+CLUSTER_THRESHOLD = float(os.getenv("CLUSTER_THRESHOLD", "0.3"))
+# Ограничение памяти индекса (~3 КБ на статью)
+CLUSTER_MAX_ARTICLES = int(os.getenv("CLUSTER_MAX_ARTICLES", "20000"))
+
+STORE_CHUNK_SIZE = 500
+
+# Служебные слова и новостные штампы, не отличающие один сюжет от другого
+STOP_WORDS = frozenset("""
+    и в во не что он на я с со как а то все она так его но да ты к у же вы за бы по только ее мне было
+    вот от меня еще нет о об из ему теперь когда даже ну ли если уже или ни быть был него до вас там
+    потом себя ничего ей может они тут где есть надо ней для мы их чем была сам чтоб без чего раз тоже
+    себе под будет тогда кто этот того потому этого какой здесь этом один почти тем чтобы нее сейчас были
+    куда можно при два об другой хоть после над больше тот через эти нас про всего них какая много три
+    эту этой перед такой им более также это года году год заявил заявила заявили сообщил сообщила
+    сообщили сообщает сообщается рассказал рассказала отметил отметила стало известно время
+    который которая которые которых которой ранее новости новость
+""".split())
+
+# Из описания берутся первые слова: дальше источники расходятся сильнее
+SUMMARY_WORDS = 40
+# Основы обрезаются до общего префикса: «повысил»/«повышение», «Пекине»/«Пекин»
+TOKEN_LENGTH = 5
+
+
+def _words(title: Optional[str], summary: Optional[str]) -> List[str]:
+    words = re.findall(r"\w+", (title or "").lower().replace("ё", "е"))
+    return words + re.findall(r"\w+", (summary or "").lower().replace("ё", "е"))[:SUMMARY_WORDS]
+
+
+def _token(word: str) -> Optional[str]:
+    if word in STOP_WORDS or (len(word) <= 2 and not word.isdigit()):
+        return None
+    return stem(word)[:TOKEN_LENGTH]
+
+
+def shingles(title: Optional[str], summary: Optional[str]) -> set:
+    """Префиксы основ значимых слов заголовка и начала описания"""
+    tokens = set(map(_token, _words(title, summary)))
+    tokens.discard(None)
+    return tokens
+
+
+@lru_cache(maxsize=1 << 18)
+def _word_hash(word: str) -> Optional[int]:
+    # Стабильный между процессами хеш (в отличие от hash() для строк);
+    # кешируется по исходному слову, чтобы не повторять стемминг
+    token = _token(word)
+    if token is None:
+        return None
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+@dataclass
+class Assignment:
+    """Результат отнесения статьи к сюжету"""
+    article_id: int
+    cluster_id: int
+    signature: Optional[array]
+    published_at: datetime
+    similarity: float = 0.0
+
+
+class StoryIndex:
+    """LSH-индекс MinHash-подписей статей за скользящее окно.
+
+    Подпись — one permutation MinHash: каждое слово хешируется один раз и
+    попадает в одну из num_hashes корзин, пустые корзины заполняются
+    значениями других корзин. Подпись делится на bands полос; статьи,
+    совпавшие хотя бы по одной полосе, — кандидаты, среди них выбирается
+    самая похожая по доле совпавших позиций (оценка сходства Жаккара). Время поиска не зависит от
+    числа статей в окне: в каждой корзине полосы хранятся только bucket_size
+    последних статей.
+    """
+
+    NUM_HASHES = 96
+    BANDS = 32
+    BUCKET_SIZE = 32
+    MAX_CANDIDATES = 8
+
+    def __init__(self, threshold: float = CLUSTER_THRESHOLD, window_hours: float = CLUSTER_WINDOW_HOURS,
+                 max_articles: int = CLUSTER_MAX_ARTICLES, num_hashes: int = NUM_HASHES, bands: int = BANDS,
+                 bucket_size: int = BUCKET_SIZE):
+        rows = num_hashes // bands
+        self.threshold = threshold
+        self.window = timedelta(hours=window_hours)
+        self.max_articles = max_articles
+        self.num_hashes = num_hashes
+        self.bands = bands
+        self.bucket_size = bucket_size
+        # Границы полос в байтах подписи (array("I"), 4 байта на значение)
+        self._bands = [(band, band * rows * 4, (band + 1) * rows * 4) for band in range(bands)]
+        rng = random.Random(num_hashes)
+        self._probes = [rng.sample(range(num_hashes), num_hashes) for _ in range(num_hashes)]
+        self._ranks = [[probes.index(position) for position in range(num_hashes)] for probes in self._probes]
+        # Ключ полосы -> id статьи или список id (от старых к новым)
+        self._buckets: Dict[int, object] = {}
+        # id -> [cluster_id или None (статья удалена), подпись]
+        self._entries: Dict[int, list] = {}
+        self._order: Deque[Tuple[datetime, int]] = deque()
+        self._latest: Optional[datetime] = None
+        self._last_signature: Optional[array] = None
+        self._last_keys: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def signature(self, title: Optional[str], summary: Optional[str]) -> Optional[array]:
+        hashes = set(map(_word_hash, _words(title, summary)))
+        hashes.discard(None)
+        if not hashes:
+            return None
+        size = self.num_hashes
+        bins = [-1] * size
+        for value in hashes:
+            # Младшие биты хеша выбирают корзину, старшие 32 — значение в ней
+            position = value % size
+            value >>= 32
+            if bins[position] < 0 or value < bins[position]:
+                bins[position] = value
+        # Пустая корзина берет значение первой непустой из своей фиксированной
+        # случайной последовательности корзин (optimal densification): у похожих
+        # текстов значения совпадают так же часто, а соседние пустые корзины
+        # заполняются из разных слов
+        filled = [position for position, value in enumerate(bins) if value >= 0]
+        if len(filled) < size:
+            values = bins[:]
+            sparse = len(filled) * 4 < size
+            for position, probes in enumerate(self._probes):
+                if values[position] >= 0:
+                    continue
+                if sparse:
+                    # То же, что перебор probes, но за один проход по непустым
+                    bins[position] = values[min(filled, key=self._ranks[position].__getitem__)]
+                    continue
+                for probe in probes:
+                    if values[probe] >= 0:
+                        bins[position] = values[probe]
+                        break
+        return array("I", bins)
+
+    @staticmethod
+    def similarity(left: array, right: array) -> float:
+        return sum(map(operator.eq, left, right)) / len(left)
+
+    def _band_keys(self, signature: array) -> List[int]:
+        # hash() байтов меняется между процессами, но индекс живет только в памяти;
+        # совпадение ключей разных полос дает лишь лишнего кандидата.
+        # Ключи последней подписи запоминаются: за match обычно следует add
+        if signature is not self._last_signature:
+            raw = signature.tobytes()
+            self._last_keys = [hash(raw[start:end]) ^ band for band, start, end in self._bands]
+            self._last_signature = signature
+        return self._last_keys
+
+    def match(self, signature: Optional[array]) -> Tuple[Optional[int], float]:
+        """Сюжет самой похожей статьи окна (cluster_id, сходство) или (None, 0)"""
+        if signature is None:
+            return None, 0.0
+        # Кандидаты упорядочены по числу совпавших полос: проверяются только
+        # самые похожие, даже если общие слова собрали в корзинах много статей
+        hits = Counter()
+        for key in self._band_keys(signature):
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                continue
+            if isinstance(bucket, list):
+                hits.update(bucket)
+            else:
+                hits[bucket] += 1
+        best_cluster, best_similarity = None, 0.0
+        for article_id, _ in hits.most_common(self.MAX_CANDIDATES):
+            entry = self._entries.get(article_id)
+            if entry is None or entry[0] is None:
+                continue
+            value = self.similarity(signature, entry[1])
+            if value > best_similarity:
+                best_cluster, best_similarity = entry[0], value
+        if best_similarity < self.threshold:
+            return None, best_similarity
+        return best_cluster, best_similarity
+
+    def add(self, article_id: int, cluster_id: int, signature: Optional[array], published_at: datetime):
+        if signature is None or article_id in self._entries:
+            return
+        self._entries[article_id] = [cluster_id, signature]
+        self._order.append((published_at, article_id))
+        buckets = self._buckets
+        for key in self._band_keys(signature):
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = article_id
+            elif isinstance(bucket, list):
+                bucket.append(article_id)
+                if len(bucket) > self.bucket_size:
+                    del bucket[0]
+            else:
+                buckets[key] = [bucket, article_id]
+        if self._latest is None or published_at > self._latest:
+            self._latest = published_at
+        self._evict()
+
+    def _evict(self):
+        # Статьи добавляются в порядке поступления, поэтому вытесняемая статья
+        # стоит первой во всех своих корзинах (если ее еще не вытеснил bucket_size)
+        horizon = self._latest - self.window
+        order, buckets = self._order, self._buckets
+        while order and (order[0][0] < horizon or len(order) > self.max_articles):
+            _, article_id = order.popleft()
+            _, signature = self._entries.pop(article_id)
+            for key in self._band_keys(signature):
+                bucket = buckets.get(key)
+                if bucket == article_id:
+                    del buckets[key]
+                elif isinstance(bucket, list) and bucket[0] == article_id:
+                    del bucket[0]
+                    if len(bucket) == 1:
+                        buckets[key] = bucket[0]
+
+    def discard(self, article_id: int):
+        """Статья больше не присоединяет к себе новые (удаляется при вытеснении)"""
+        entry = self._entries.get(article_id)
+        if entry is not None:
+            entry[0] = None
+
+    def rename_clusters(self, new_heads: Dict[int, int]):
+        """Замена id сюжетов: {старый: новый}"""
+        for entry in self._entries.values():
+            if entry[0] in new_heads:
+                entry[0] = new_heads[entry[0]]
+
+    def clear(self):
+        self._buckets.clear()
+        self._entries.clear()
+        self._order.clear()
+        self._latest = None
+
+    def stats(self) -> dict:
+        return {
+            "articles": len(self._entries),
+            "buckets": len(self._buckets),
+            "window_hours": self.window.total_seconds() / 3600,
+            "threshold": self.threshold,
+        }
+
+
+def _field(article, name: str):
+    return article.get(name) if isinstance(article, dict) else getattr(article, name)
+
+
+def collapsed(category: Optional[str] = None):
+    """Условие «первая статья сюжета»: остальные статьи сюжета скрываются.
+
+    У статей, загруженных до появления сюжетов, cluster_id пуст — каждая
+    считается отдельным сюжетом. В ленте категории первой считается статья
+    сюжета с наименьшим id среди активных статей этой категории: первая
+    статья всего сюжета может быть в другой категории, и тогда сюжет
+    пропал бы из ленты.
+    """
+    if category is None:
+        return func.coalesce(NewsArticle.cluster_id, NewsArticle.id) == NewsArticle.id
+    earlier = aliased(NewsArticle)
+    return ~exists().where(
+        earlier.cluster_id == NewsArticle.cluster_id,
+        earlier.id < NewsArticle.id,
+        earlier.category == category,
+        earlier.is_active == True,
+    )
+
+
+class StoryClusterer:
+    """Отнесение новых статей к сюжетам и хранение индекса окна.
+
+    Идентификатор сюжета — id его первой статьи. Сюжет назначается внутри
+    транзакции загрузки (assign + store), а в индекс статьи попадают только
+    после фиксации (add), чтобы откат не оставил ссылок на несуществующие id.
+    """
+
+    def __init__(self, index: Optional[StoryIndex] = None):
+        self.index = index or StoryIndex()
+        self._lock = threading.Lock()
+
+    def assign(self, articles: Iterable) -> List[Assignment]:
+        """Сюжеты для статей с уже известными id (словари или ORM-объекты).
+
+        Статьи одной пачки сравниваются и с окном, и друг с другом.
+        """
+        batch = StoryIndex(
+            threshold=self.index.threshold, num_hashes=self.index.num_hashes,
+            bands=self.index.bands, bucket_size=self.index.bucket_size,
+        )
+        assignments = []
+        for article in articles:
+            article_id = _field(article, "id")
+            published_at = _field(article, "published_at") or datetime.now()
+            signature = self.index.signature(_field(article, "title"), _field(article, "summary"))
+            with self._lock:
+                cluster_id, value = self.index.match(signature)
+            batch_cluster_id, batch_value = batch.match(signature)
+            if batch_cluster_id is not None and batch_value > value:
+                cluster_id, value = batch_cluster_id, batch_value
+            if cluster_id is None:
+                cluster_id = article_id
+            batch.add(article_id, cluster_id, signature, published_at)
+            assignments.append(Assignment(article_id, cluster_id, signature, published_at, value))
+        return assignments
+
+    @staticmethod
+    def store(db: Session, assignments: List[Assignment], chunk_size: int = STORE_CHUNK_SIZE):
+        """Запись cluster_id вставленных строк в текущей транзакции"""
+        heads = [item.article_id for item in assignments if item.cluster_id == item.article_id]
+        members = [{"b_id": item.article_id, "b_cluster_id": item.cluster_id}
+                   for item in assignments if item.cluster_id != item.article_id]
+        table = NewsArticle.__table__
+        connection = db.connection()
+        for start in range(0, len(heads), chunk_size):
+            chunk = heads[start:start + chunk_size]
+            connection.execute(update(table).where(table.c.id.in_(chunk)).values(cluster_id=table.c.id))
+        if members:
+            connection.execute(
+                update(table).where(table.c.id == bindparam("b_id")).values(cluster_id=bindparam("b_cluster_id")),
+                members,
+            )
+
+    def add(self, assignments: List[Assignment]):
+        """Добавление зафиксированных статей в индекс окна"""
+        with self._lock:
+            for item in assignments:
+                self.index.add(item.article_id, item.cluster_id, item.signature, item.published_at)
+
+    def warm(self, db: Session):
+        """Заполнение индекса статьями за окно (при старте приложения)"""
+        since = datetime.now() - self.index.window
+        rows = db.execute(
+            select(NewsArticle.id, NewsArticle.cluster_id, NewsArticle.title, NewsArticle.summary,
+                   NewsArticle.published_at)
+            .where(NewsArticle.is_active == True, NewsArticle.published_at >= since)
+            .order_by(NewsArticle.published_at.desc(), NewsArticle.id.desc())
+            .limit(self.index.max_articles)
+        ).all()
+        with self._lock:
+            self.index.clear()
+            for article_id, cluster_id, title, summary, published_at in reversed(rows):
+                self.index.add(article_id, cluster_id or article_id, self.index.signature(title, summary), published_at)
+        logger.info(f"Индекс сюжетов: {len(self.index)} статей за {self.index.window}")
+
+    @staticmethod
+    def promote_head(db: Session, article) -> Optional[int]:
+        """Передача сюжета следующей активной статье при удалении первой.
+
+        Иначе при collapse_duplicates скрылся бы весь сюжет. Возвращает id
+        новой первой статьи (изменения — в текущей транзакции).
+        """
+        if article.cluster_id != article.id:
+            return None
+        new_head = db.scalar(
+            select(func.min(NewsArticle.id))
+            .where(NewsArticle.cluster_id == article.id, NewsArticle.id != article.id, NewsArticle.is_active == True)
+        )
+        if new_head is not None:
+            db.execute(
+                update(NewsArticle)
+                .where(NewsArticle.cluster_id == article.id, NewsArticle.id != article.id)
+                .values(cluster_id=new_head)
+            )
+        return new_head
+
+    @staticmethod
+    def promote_heads(db: Session, head_ids: List[int], chunk_size: int = STORE_CHUNK_SIZE) -> Dict[int, int]:
+        """promote_head для удаленных из таблицы первых статей (перенос в архив).
+
+        Возвращает {старый id сюжета: новый} для сюжетов, где остались активные статьи.
+        """
+        new_heads = {}
+        for start in range(0, len(head_ids), chunk_size):
+            chunk = head_ids[start:start + chunk_size]
+            new_heads.update(db.execute(
+                select(NewsArticle.cluster_id, func.min(NewsArticle.id))
+                .where(NewsArticle.cluster_id.in_(chunk), NewsArticle.is_active == True)
+                .group_by(NewsArticle.cluster_id)
+            ).all())
+        if new_heads:
+            table = NewsArticle.__table__
+            db.connection().execute(
+                update(table).where(table.c.cluster_id == bindparam("b_old")).values(cluster_id=bindparam("b_new")),
+                [{"b_old": old, "b_new": new} for old, new in new_heads.items()],
+            )
+        return new_heads
+
+    def on_article_removed(self, article_id: int, new_head: Optional[int] = None):
+        self.on_articles_removed([article_id], {article_id: new_head} if new_head is not None else None)
+
+    def on_articles_removed(self, article_ids: Iterable[int], new_heads: Optional[Dict[int, int]] = None):
+        with self._lock:
+            for article_id in article_ids:
+                self.index.discard(article_id)
+            if new_heads:
+                self.index.rename_clusters(new_heads)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return self.index.stats()
+
+
+story_clusterer = StoryClusterer()
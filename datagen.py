@@ -0,0 +1,287 @@
+"""Синтетические данные в объемах production: новости, пользователи и их предпочтения.
+
+Тексты собираются из шаблонов по категориям, распределение категорий и
+источников неравномерное (как в реальных лентах), часть заметок — пересказы
+недавних событий другими изданиями. Генерация детерминирована при заданном seed.
+
+    python datagen.py --articles 1000000 --users 5000
+    python datagen.py --articles 20000 --mode ingest   # через bulk_ingest, с сюжетами
+"""
+import argparse
+import itertools
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, sessionmaker
+
+import database
+import models
+import stats
+from auth import hash_password
+from ingestion import bulk_ingest
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PASSWORD = "password123"
+
+# Доли категорий и «вес» источников (закон Ципфа по рангу)
+CATEGORY_WEIGHTS = {
+    "политика": 0.24, "экономика": 0.20, "спорт": 0.16, "технологии": 0.12,
+    "развлечения": 0.10, "культура": 0.10, "наука": 0.08,
+}
+SOURCES = [
+    ("РИА Новости", "ria.ru"), ("ТАСС", "tass.ru"), ("Интерфакс", "interfax.ru"), ("РБК", "rbc.ru"),
+    ("Коммерсантъ", "kommersant.ru"), ("Ведомости", "vedomosti.ru"), ("Газета.Ru", "gazeta.ru"),
+    ("Лента.ру", "lenta.ru"), ("Известия", "iz.ru"), ("Спорт-Экспресс", "sport-express.ru"),
+    ("Хабр", "habr.com"), ("N+1", "nplus1.ru"),
+]
+SOURCE_WEIGHTS = [1 / (rank + 1) ** 1.1 for rank in range(len(SOURCES))]
+
+VOCABULARY = {
+    "политика": {
+        "subjects": ["Госдума", "Совет Федерации", "Правительство", "МИД России", "Кремль", "Губернатор области",
+                     "Министр обороны", "Делегация ЕС", "Парламент Франции", "Президент США", "Генсек ООН"],
+        "actions": ["одобрил", "отклонил", "обсудил", "внес на рассмотрение", "раскритиковал", "поддержал",
+                    "отложил", "подписал"],
+        "objects": ["законопроект о выборах", "новый пакет санкций", "бюджет на следующий год",
+                    "соглашение о сотрудничестве", "поправки в Конституцию", "реформу местного самоуправления",
+                    "меморандум о безопасности", "план урегулирования конфликта"],
+    },
+    "экономика": {
+        "subjects": ["Центробанк", "Минфин", "Сбербанк", "Газпром", "Мосбиржа", "Росстат", "Аналитики ВТБ",
+                     "Крупнейшие ретейлеры", "Нефтяные компании", "Экспортеры зерна"],
+        "actions": ["повысил", "снизил", "сохранил", "пересмотрел", "спрогнозировал", "зафиксировал"],
+        "objects": ["ключевую ставку", "прогноз инфляции", "курс рубля", "дивиденды за год", "цены на нефть",
+                    "объем кредитования", "налоговую нагрузку", "выручку за квартал"],
+    },
+    "спорт": {
+        "subjects": ["Спартак", "ЦСКА", "Зенит", "Локомотив", "Сборная России", "Даниил Медведев",
+                     "Сборная по хоккею", "Динамо", "Краснодар", "Биатлонисты"],
+        "actions": ["обыграл соперника в матче за", "уступил в борьбе за", "вышел в финал турнира за",
+                    "сыграл вничью в матче за", "завоевал"],
+        "objects": ["Кубок России", "золото чемпионата мира", "первое место в группе", "выход в плей-офф",
+                    "Суперкубок", "бронзовые медали"],
+    },
+    "технологии": {
+        "subjects": ["Яндекс", "Apple", "Google", "Microsoft", "Сбер", "OpenAI", "Samsung", "Росатом",
+                     "Разработчики из МФТИ", "Стартап из Казани"],
+        "actions": ["представил", "выпустил", "анонсировал", "открыл доступ к", "обновил", "протестировал"],
+        "objects": ["новую нейросеть", "смартфон с гибким экраном", "квантовый процессор", "облачную платформу",
+                    "систему беспилотного вождения", "операционную систему", "чип для искусственного интеллекта"],
+    },
+    "развлечения": {
+        "subjects": ["Netflix", "Кинопоиск", "Первый канал", "Известный блогер", "Звезда сериала",
+                     "Организаторы фестиваля", "Популярная певица", "Режиссер боевика"],
+        "actions": ["показал", "анонсировал", "отменил", "перенес", "рассказал о", "снял"],
+        "objects": ["второй сезон сериала", "новое шоу", "концертный тур", "премьеру фильма", "рейтинг проектов",
+                    "новогодний эфир", "музыкальный клип"],
+    },
+    "культура": {
+        "subjects": ["Третьяковская галерея", "Большой театр", "Эрмитаж", "Пушкинский музей",
+                     "Министерство культуры", "Союз писателей", "Мариинский театр"],
+        "actions": ["открыл", "представил", "посвятил юбилею", "вернул в экспозицию", "объявил"],
+        "objects": ["выставку авангарда", "новую постановку", "литературную премию", "реставрированные полотна",
+                    "фестиваль классической музыки", "программу для детей"],
+    },
+    "наука": {
+        "subjects": ["Ученые МГУ", "Астрономы", "Физики ЦЕРН", "Генетики", "Российская академия наук",
+                     "Исследователи из Новосибирска", "Палеонтологи", "Роскосмос"],
+        "actions": ["обнаружили", "описали", "доказали", "смоделировали", "получили первые данные о"],
+        "objects": ["новую экзопланету", "механизм старения клеток", "древний вид динозавров",
+                    "сверхпроводник при комнатной температуре", "вакцину от гриппа", "темную материю"],
+    },
+}
+PLACES = ["в Москве", "в Санкт-Петербурге", "в Казани", "в Новосибирске", "в Екатеринбурге", "в Сочи",
+          "во Владивостоке", "в Брюсселе", "в Женеве", "в Пекине", "в Вашингтоне"]
+DETAILS = [
+    "Решение вступит в силу с {month}.",
+    "По данным источников, речь идет о {number} млрд рублей.",
+    "Эксперты ожидают изменения на {percent}% в ближайшие месяцы.",
+    "Подробности планируется раскрыть {weekday}.",
+    "В обсуждении приняли участие более {number} человек.",
+    "Это уже {ordinal} подобный случай с начала года.",
+]
+QUOTES = [
+    "«Мы рассчитываем на результат уже в этом году», — заявил представитель.",
+    "Официальные комментарии пока не поступали.",
+    "Как отметили аналитики, ситуация остается неопределенной.",
+    "Участники рынка восприняли новость сдержанно.",
+]
+MONTHS = ["января", "февраля", "марта", "апреля", "мая", "июня", "июля", "августа", "сентября", "октября",
+          "ноября", "декабря"]
+WEEKDAYS = ["в понедельник", "во вторник", "в среду", "в четверг", "в пятницу", "на следующей неделе"]
+ORDINALS = ["второй", "третий", "четвертый", "пятый", "шестой"]
+# Доли пользователей по числу предпочтений: 0, 1, 2, 3, 4
+PREFERENCE_COUNT_WEIGHTS = [0.2, 0.3, 0.25, 0.15, 0.1]
+
+
+def _detail(rng: random.Random) -> str:
+    return rng.choice(DETAILS).format(
+        month=f"1 {rng.choice(MONTHS)}", number=rng.randint(2, 900), percent=rng.randint(1, 25),
+        weekday=rng.choice(WEEKDAYS), ordinal=rng.choice(ORDINALS),
+    )
+
+
+class ArticleGenerator:
+    """Поток кандидатов в формате bulk_ingest (title, summary, url, source, category, published_at).
+
+    Даты равномерно покрывают последние days дней по возрастанию, поэтому
+    id статей растут вместе с published_at, как при реальной загрузке.
+    """
+
+    RECENT_EVENTS = 500
+
+    def __init__(self, seed: Optional[int] = None, duplicate_rate: float = 0.15):
+        self.rng = random.Random(seed)
+        self.duplicate_rate = duplicate_rate
+        self.categories = list(CATEGORY_WEIGHTS)
+        self.category_weights = list(itertools.accumulate(CATEGORY_WEIGHTS.values()))
+        self.source_weights = list(itertools.accumulate(SOURCE_WEIGHTS))
+        self._events: List[tuple] = []
+        # Уникальность URL между запусками без seed
+        self._url_prefix = f"{self.rng.getrandbits(32):08x}"
+
+    def _event(self, category: str) -> tuple:
+        rng = self.rng
+        words = VOCABULARY[category]
+        title = f"{rng.choice(words['subjects'])} {rng.choice(words['actions'])} {rng.choice(words['objects'])}"
+        if rng.random() < 0.5:
+            title += f" {rng.choice(PLACES)}"
+        return category, title, [_detail(rng), _detail(rng)]
+
+    def _summary(self, title: str, details: List[str]) -> str:
+        return " ".join([f"{title}.", *details, self.rng.choice(QUOTES)])
+
+    def generate(self, count: int, days: float = 365, end: Optional[datetime] = None) -> Iterator[dict]:
+        rng = self.rng
+        end = end or datetime.now()
+        span = timedelta(days=days)
+        for n in range(count):
+            if self._events and rng.random() < self.duplicate_rate:
+                # Пересказ недавнего события другим изданием: другой порядок подробностей и цитата
+                category, title, details = rng.choice(self._events)
+                details = rng.sample(details, len(details))
+            else:
+                category, title, details = event = self._event(
+                    rng.choices(self.categories, cum_weights=self.category_weights)[0]
+                )
+                self._events.append(event)
+                if len(self._events) > self.RECENT_EVENTS:
+                    del self._events[0]
+            source, domain = rng.choices(SOURCES, cum_weights=self.source_weights)[0]
+            published_at = end - span + span * (n + rng.random()) / count
+            yield {
+                "title": title,
+                "summary": self._summary(title, details),
+                "url": f"https://{domain}/news/{published_at:%Y/%m/%d}/{self._url_prefix}-{n}",
+                "source": source,
+                "category": category,
+                "published_at": published_at,
+            }
+
+
+def generate_articles(count: int, seed: Optional[int] = None, days: float = 365, **options) -> Iterator[dict]:
+    return ArticleGenerator(seed=seed, **options).generate(count, days)
+
+
+def generate_users(count: int, seed: Optional[int] = None, hashed_password: Optional[str] = None):
+    """Пользователи и их предпочтения: (строки users, строки user_preferences без user_id -> индекс)"""
+    rng = random.Random(seed)
+    # bcrypt медленный намеренно: у всех сгенерированных пользователей один пароль
+    hashed_password = hashed_password or hash_password(DEFAULT_PASSWORD)
+    categories = list(CATEGORY_WEIGHTS)
+    weights = list(CATEGORY_WEIGHTS.values())
+    users, preferences = [], []
+    for n in range(count):
+        users.append({
+            "username": f"user{n:06d}",
+            "email": f"user{n:06d}@example.com",
+            "hashed_password": hashed_password,
+            "is_active": True,
+        })
+        for _ in range(rng.choices(range(len(PREFERENCE_COUNT_WEIGHTS)), weights=PREFERENCE_COUNT_WEIGHTS)[0]):
+            category = rng.choices(categories, weights=weights)[0]
+            if rng.random() < 0.6:
+                preferences.append({"user_index": n, "category": category, "keyword": None})
+            else:
+                # Ключевое слово — из лексики категории, чтобы оно встречалось в заголовках
+                keyword = rng.choice(VOCABULARY[category]["objects"]).split()[-1]
+                preferences.append({"user_index": n, "category": None, "keyword": keyword})
+    return users, preferences
+
+
+def load(session_factory=database.SessionLocal, articles: int = 0, users: int = 0, seed: Optional[int] = 42,
+         days: float = 365, mode: str = "direct", chunk_size: int = 5000, progress: int = 0) -> Dict[str, int]:
+    """Загрузка в базу; mode=direct — INSERT пачками без дедупликации и сюжетов,
+    mode=ingest — через bulk_ingest (как RSS-загрузка, заметно медленнее)"""
+    loaded = {"articles": 0, "users": 0, "preferences": 0}
+    generator = ArticleGenerator(seed=seed)
+    with session_factory() as db:
+        if users:
+            user_rows, preference_rows = generate_users(users, seed)
+            users_table = models.User.__table__
+            inserted = db.execute(
+                insert(users_table).returning(users_table.c.id, sort_by_parameter_order=True), user_rows
+            ).all()
+            user_ids = [row[0] for row in inserted]
+            for row in preference_rows:
+                row["user_id"] = user_ids[row.pop("user_index")]
+            for start in range(0, len(preference_rows), chunk_size):
+                db.execute(insert(models.UserPreference), preference_rows[start:start + chunk_size])
+            db.commit()
+            loaded["users"], loaded["preferences"] = len(user_rows), len(preference_rows)
+
+        batch = []
+        started = time.perf_counter()
+        reported = 0
+        for row in generator.generate(articles, days):
+            batch.append(row)
+            if len(batch) >= chunk_size:
+                loaded["articles"] += _load_articles(db, batch, mode)
+                batch = []
+                if progress and loaded["articles"] - reported >= progress:
+                    reported = loaded["articles"]
+                    rate = reported / (time.perf_counter() - started)
+                    logger.info(f"Загружено {reported} статей ({rate:,.0f} в секунду)")
+        if batch:
+            loaded["articles"] += _load_articles(db, batch, mode)
+        # Счетчики пересчитываются один раз в конце
+        stats.reconcile(db)
+    return loaded
+
+
+def _load_articles(db: Session, rows: List[dict], mode: str) -> int:
+    if mode == "ingest":
+        return bulk_ingest(db, rows).inserted
+    for row in rows:
+        row["url_key"] = models.normalize_url(row["url"])
+    db.execute(insert(models.NewsArticle), rows)
+    db.commit()
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--articles", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--days", type=float, default=365, help="период дат публикации, дни до текущего момента")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mode", choices=["direct", "ingest"], default="direct")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    import migrate
+    migrate.upgrade(database.engine)
+    started = time.perf_counter()
+    loaded = load(sessionmaker(bind=database.engine), args.articles, args.users, args.seed, args.days,
+                  args.mode, args.chunk_size, progress=max(args.chunk_size, args.articles // 20))
+    print(f"{loaded} за {time.perf_counter() - started:.1f}с")
+
+
+if __name__ == "__main__":
+    main()
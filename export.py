@@ -0,0 +1,206 @@
+"""Потоковая выгрузка статей в NDJSON или CSV.
+
+Строки читаются курсором порциями по EXPORT_BATCH_SIZE (yield_per) и сразу
+отправляются клиенту, поэтому память не зависит от размера выгрузки: в ней
+одна порция строк и буфер сжатия. gzip включается по Accept-Encoding и
+сжимает поток по мере отправки.
+
+Инкрементальная выгрузка: ответ несет водяной знак в заголовке
+X-Export-Watermark, клиент передает его в updated_since следующего запроса.
+updated_at ставится при flush, а видна строка только после фиксации, поэтому
+знак отстает от текущего времени на EXPORT_WATERMARK_LAG секунд: строка,
+записанная в транзакции, которая зафиксирована позже начала выгрузки, но не
+позже чем через EXPORT_WATERMARK_LAG после flush, придет в следующей выгрузке.
+Значение должно превышать самую долгую пишущую транзакцию (пакетная загрузка
+фиксирует все порции разом) и расхождение часов серверов приложения. Доставка —
+не менее одного раза: строки за последние EXPORT_WATERMARK_LAG секунд приходят
+повторно, копия различает их по id и берет версию с большим updated_at.
+
+Удаления выгружаются только с include_inactive=true: статьи, снятые с
+публикации (is_active=false), и статьи, перенесенные в архив политикой
+хранения, — последние идут после основных строк с is_active=false и
+updated_at, равным времени переноса. Без include_inactive удаления не
+выгружаются.
+"""
+import csv
+import io
+import os
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Callable, List, Optional, Sequence
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Boolean, DateTime, Select, false, select
+
+from database import AsyncSessionLocal
+from models import NewsArchive, NewsArticle
+from pages import accepted_encodings
+from serialization import NEWS_FIELDS, dumps
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+EXPORT_GZIP_LEVEL = int(os.getenv("EXPORT_GZIP_LEVEL", "6"))
+# Отставание водяного знака от текущего времени, секунды
+EXPORT_WATERMARK_LAG = float(os.getenv("EXPORT_WATERMARK_LAG", "300"))
+
+WATERMARK_HEADER = "X-Export-Watermark"
+
+NDJSON = "ndjson"
+CSV = "csv"
+MEDIA_TYPES = {NDJSON: "application/x-ndjson", CSV: "text/csv; charset=utf-8"}
+
+EXPORT_FIELDS = NEWS_FIELDS + ("updated_at",)
+EXPORT_COLUMNS = tuple(getattr(NewsArticle, name) for name in EXPORT_FIELDS)
+# Статья из архива выглядит как удаленная: is_active=false, updated_at — время переноса
+ARCHIVE_COLUMNS = tuple(
+    false().label(name) if name == "is_active"
+    else NewsArchive.archived_at.label(name) if name == "updated_at"
+    else getattr(NewsArchive, name)
+    for name in EXPORT_FIELDS
+)
+
+
+def _utc(value: datetime) -> datetime:
+    # updated_at и archived_at хранятся в UTC без часового пояса
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _filters(model, date_from: Optional[datetime], date_to: Optional[datetime],
+             category: Optional[str], source: Optional[str]) -> list:
+    conditions = []
+    if date_from is not None:
+        conditions.append(model.published_at >= date_from)
+    if date_to is not None:
+        conditions.append(model.published_at < date_to)
+    if category is not None:
+        conditions.append(model.category == category)
+    if source is not None:
+        conditions.append(model.source == source)
+    return conditions
+
+
+def export_query(date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                 category: Optional[str] = None, source: Optional[str] = None,
+                 updated_since: Optional[datetime] = None, include_inactive: bool = False) -> Select:
+    """select() выгрузки; date_from/date_to ограничивают published_at, date_to не включается"""
+    statement = select(*EXPORT_COLUMNS).where(*_filters(NewsArticle, date_from, date_to, category, source))
+    if not include_inactive:
+        statement = statement.where(NewsArticle.is_active == True)
+    if updated_since is not None:
+        statement = statement.where(NewsArticle.updated_at >= _utc(updated_since))
+    return statement.order_by(NewsArticle.updated_at, NewsArticle.id)
+
+
+def archive_query(date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                  category: Optional[str] = None, source: Optional[str] = None,
+                  updated_since: Optional[datetime] = None) -> Select:
+    """Статьи, перенесенные в архив, в виде удаленных строк выгрузки"""
+    statement = select(*ARCHIVE_COLUMNS).where(*_filters(NewsArchive, date_from, date_to, category, source))
+    if updated_since is not None:
+        statement = statement.where(NewsArchive.archived_at >= _utc(updated_since))
+    return statement.order_by(NewsArchive.archived_at, NewsArchive.id)
+
+
+def export_queries(date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                   category: Optional[str] = None, source: Optional[str] = None,
+                   updated_since: Optional[datetime] = None, include_inactive: bool = False) -> List[Select]:
+    """Запросы выгрузки: статьи и, с include_inactive, перенесенные в архив"""
+    statements = [export_query(date_from, date_to, category, source, updated_since, include_inactive)]
+    if include_inactive:
+        statements.append(archive_query(date_from, date_to, category, source, updated_since))
+    return statements
+
+
+def watermark(now: Optional[datetime] = None) -> datetime:
+    """updated_since для следующей выгрузки; берется до начала чтения"""
+    return (now or datetime.utcnow()) - timedelta(seconds=EXPORT_WATERMARK_LAG)
+
+
+def encode_ndjson(rows: Sequence[Sequence]) -> bytes:
+    fields = EXPORT_FIELDS
+    return b"".join(dumps(dict(zip(fields, row))) + b"\n" for row in rows)
+
+
+# Столбцы, которые csv.writer вывел бы через str(): даты — в ISO 8601, как в
+# NDJSON, логические значения — true/false
+_CSV_DATETIME_COLUMNS = tuple(index for index, column in enumerate(EXPORT_COLUMNS)
+                              if isinstance(column.type, DateTime))
+_CSV_BOOLEAN_COLUMNS = tuple(index for index, column in enumerate(EXPORT_COLUMNS)
+                             if isinstance(column.type, Boolean))
+
+
+def _csv_row(row: Sequence) -> list:
+    row = list(row)
+    for index in _CSV_DATETIME_COLUMNS:
+        if row[index] is not None:
+            row[index] = row[index].isoformat()
+    for index in _CSV_BOOLEAN_COLUMNS:
+        if row[index] is not None:
+            row[index] = "true" if row[index] else "false"
+    return row
+
+
+def encode_csv(rows: Sequence[Sequence]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(map(_csv_row, rows))
+    return buffer.getvalue().encode("utf-8")
+
+
+ENCODERS = {NDJSON: encode_ndjson, CSV: encode_csv}
+
+
+async def stream_batches(statements: Sequence[Select], session_factory=AsyncSessionLocal,
+                         batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[Sequence]:
+    """Порции строк запросов по очереди, курсором (одна транзакция чтения — согласованный снимок)"""
+    async with session_factory() as db_session:
+        for statement in statements:
+            result = await db_session.stream(statement.execution_options(yield_per=batch_size))
+            async for rows in result.partitions():
+                yield rows
+
+
+async def _encoded(batches: AsyncIterator[Sequence], encode: Callable[[Sequence], bytes],
+                   header: bytes) -> AsyncIterator[bytes]:
+    if header:
+        yield header
+    async for rows in batches:
+        yield encode(rows)
+
+
+async def export_chunks(batches: AsyncIterator[Sequence], encode: Callable[[Sequence], bytes],
+                        header: bytes = b"", compress: bool = False) -> AsyncIterator[bytes]:
+    if not compress:
+        async for data in _encoded(batches, encode, header):
+            yield data
+        return
+    # wbits=31 — формат gzip (заголовок и CRC), а не голый deflate
+    compressor = zlib.compressobj(EXPORT_GZIP_LEVEL, zlib.DEFLATED, 31)
+    async for data in _encoded(batches, encode, header):
+        # Пока буфер сжатия не заполнен, compress() ничего не возвращает
+        data = compressor.compress(data)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_response(request: Request, statements: Sequence[Select], export_format: str = NDJSON) -> StreamingResponse:
+    compress = accepted_encodings(request.headers.get("accept-encoding", "")).get("gzip", 0.0) > 0
+    header = b""
+    if export_format == CSV:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(EXPORT_FIELDS)
+        header = buffer.getvalue().encode("utf-8")
+    headers = {
+        "Content-Disposition": f'attachment; filename="news.{export_format}"',
+        "Cache-Control": "no-store",
+        "Vary": "Accept-Encoding",
+        WATERMARK_HEADER: watermark().isoformat(),
+    }
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        export_chunks(stream_batches(statements), ENCODERS[export_format], header, compress),
+        media_type=MEDIA_TYPES[export_format], headers=headers,
+    )
@@ -0,0 +1,124 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+from datetime import datetime
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+FEED_STATE_PATH = os.getenv("FEED_STATE_PATH", "./feed_state.json")
+
+
+class FeedStateStore:
+    """Состояние загрузки RSS источников, сохраняемое на диск.
+
+    Для каждого URL хранит ETag, Last-Modified и хеш тела последнего ответа,
+    чтобы следующие запросы были условными, а неизменившиеся ленты не
+    разбирались повторно. Также ведет счетчики попаданий/промахов.
+    """
+
+    def __init__(self, path: str = FEED_STATE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._states = self._load()
+
+    def _load(self) -> dict:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Не удалось прочитать состояние лент {self.path}: {e}")
+            return {}
+
+    def _state(self, url: str) -> dict:
+        return self._states.setdefault(url, {
+            "etag": None,
+            "last_modified": None,
+            "content_hash": None,
+            "content_length": 0,
+            "hits": 0,
+            "misses": 0,
+            "bytes_saved": 0,
+            "last_status": None,
+            "last_fetched_at": None,
+        })
+
+    def request_headers(self, url: str) -> dict:
+        """Заголовки условного запроса для источника"""
+        with self._lock:
+            state = self._states.get(url) or {}
+            headers = {}
+            if state.get("etag"):
+                headers["If-None-Match"] = state["etag"]
+            if state.get("last_modified"):
+                headers["If-Modified-Since"] = state["last_modified"]
+            return headers
+
+    def is_unchanged(self, url: str, content_hash: str) -> bool:
+        with self._lock:
+            state = self._states.get(url)
+            return state is not None and state.get("content_hash") == content_hash
+
+    def record(self, result):
+        """Учет результата загрузки (вызывается после сохранения записей в БД)"""
+        if result.error:
+            return
+        url = result.source["url"]
+        with self._lock:
+            state = self._state(url)
+            state["last_status"] = result.status
+            state["last_fetched_at"] = datetime.utcnow().isoformat()
+            if result.not_modified:
+                state["hits"] += 1
+                if result.status == 304:
+                    state["bytes_saved"] += state["content_length"]
+                return
+            state["misses"] += 1
+            # Имена заголовков не зависят от регистра: серверы отдают и ETag, и Etag, и etag
+            headers = {name.lower(): value for name, value in result.headers.items()}
+            state["etag"] = headers.get("etag")
+            state["last_modified"] = headers.get("last-modified")
+            state["content_hash"] = result.content_hash
+            state["content_length"] = len(result.body or b"")
+
+    def save(self):
+        """Атомарная запись состояния на диск"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with self._lock:
+            data = json.dumps(self._states, ensure_ascii=False, indent=2)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".feed_state.")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(data)
+                os.replace(tmp_path, self.path)
+            except OSError:
+                os.unlink(tmp_path)
+                raise
+
+    def stats(self) -> dict:
+        """Счетчики по источникам"""
+        with self._lock:
+            return {
+                url: {
+                    "hits": state["hits"],
+                    "misses": state["misses"],
+                    "bytes_saved": state["bytes_saved"],
+                    "last_status": state["last_status"],
+                    "last_fetched_at": state["last_fetched_at"],
+                }
+                for url, state in self._states.items()
+            }
+
+
+_store: Optional[FeedStateStore] = None
+
+
+def get_feed_state_store() -> FeedStateStore:
+    global _store
+    if _store is None:
+        _store = FeedStateStore()
+    return _store
@@ -0,0 +1,196 @@
+import asyncio
+import hashlib
+import logging
+import random
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import aiohttp
+import feedparser
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "NewsAggregator/1.0 (+https://github.com/arenevapolina52/news-aggregator)"
+
+_parse_executor: Optional[Executor] = None
+
+
+def get_parse_executor() -> Executor:
+    """Общий пул процессов для разбора RSS (feedparser упирается в GIL)"""
+    global _parse_executor
+    if _parse_executor is None:
+        _parse_executor = ProcessPoolExecutor(max_workers=AsyncFeedFetcher.PARSE_WORKERS)
+    return _parse_executor
+
+
+def shutdown_parse_executor():
+    """Остановка пула разбора (вызывается при завершении приложения)"""
+    global _parse_executor
+    if _parse_executor is not None:
+        _parse_executor.shutdown(wait=False, cancel_futures=True)
+        _parse_executor = None
+
+
+def parse_feed_bytes(content: bytes, limit: Optional[int] = None) -> List[dict]:
+    """Разбор тела RSS ленты в список простых словарей.
+
+    Выполняется в пуле процессов, поэтому возвращает только сериализуемые данные.
+    """
+    feed = feedparser.parse(content)
+    entries = []
+    for entry in feed.entries[:limit]:
+        title = entry.get("title")
+        link = entry.get("link")
+        if not title or not link:
+            continue
+        entries.append({
+            "title": title,
+            "link": link,
+            "summary": entry.get("summary") or entry.get("description") or title,
+        })
+    return entries
+
+
+@dataclass
+class FetchResult:
+    """Результат загрузки одного источника"""
+    source: dict
+    status: Optional[int] = None
+    body: Optional[bytes] = None
+    headers: dict = field(default_factory=dict)
+    entries: List[dict] = field(default_factory=list)
+    content_hash: Optional[str] = None
+    not_modified: bool = False
+    error: Optional[str] = None
+    attempts: int = 0
+    elapsed: float = 0.0
+
+
+class AsyncFeedFetcher:
+    """Конкурентная загрузка RSS лент через общий пул соединений aiohttp.
+
+    Используется как асинхронный контекстный менеджер:
+
+        async with AsyncFeedFetcher() as fetcher:
+            results = await fetcher.fetch_all(sources)
+    """
+
+    PER_HOST_LIMIT = 2
+    TOTAL_LIMIT = 32
+    TIMEOUT = 10.0
+    RETRIES = 3
+    BACKOFF = 0.5
+    PARSE_WORKERS = 2
+    ENTRIES_LIMIT = 5
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, per_host_limit: int = None, total_limit: int = None,
+                 timeout: float = None, retries: int = None, backoff: float = None,
+                 entries_limit: Optional[int] = ENTRIES_LIMIT, executor: Executor = None,
+                 state_store=None):
+        self.per_host_limit = per_host_limit or self.PER_HOST_LIMIT
+        self.total_limit = total_limit or self.TOTAL_LIMIT
+        self.timeout = timeout or self.TIMEOUT
+        self.retries = self.RETRIES if retries is None else retries
+        self.backoff = self.BACKOFF if backoff is None else backoff
+        self.entries_limit = entries_limit
+        self.executor = executor
+        self.state_store = state_store
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.total_limit,
+            limit_per_host=self.per_host_limit,
+            ttl_dns_cache=300,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={"User-Agent": USER_AGENT},
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._session.close()
+        self._session = None
+
+    async def fetch(self, source: dict, headers: dict = None) -> FetchResult:
+        """Загрузка одного источника с повторами и экспоненциальной задержкой"""
+        result = FetchResult(source=source)
+        started = time.perf_counter()
+
+        for attempt in range(self.retries + 1):
+            result.attempts = attempt + 1
+            try:
+                async with self._session.get(source["url"], headers=headers) as response:
+                    result.status = response.status
+                    result.headers = dict(response.headers)
+                    if response.status in self.RETRY_STATUSES:
+                        result.error = f"HTTP {response.status}"
+                    elif response.status >= 400:
+                        result.error = f"HTTP {response.status}"
+                        break
+                    else:
+                        result.body = await response.read()
+                        result.error = None
+                        break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                result.error = f"{type(e).__name__}: {e}"
+
+            if attempt < self.retries:
+                delay = self.backoff * (2 ** attempt)
+                await asyncio.sleep(delay + random.uniform(0, delay))
+
+        result.elapsed = time.perf_counter() - started
+        return result
+
+    async def parse(self, result: FetchResult) -> FetchResult:
+        """Разбор загруженного тела в пуле воркеров"""
+        if result.body is None:
+            return result
+        loop = asyncio.get_running_loop()
+        executor = self.executor or get_parse_executor()
+        started = time.perf_counter()
+        try:
+            result.entries = await loop.run_in_executor(
+                executor, parse_feed_bytes, result.body, self.entries_limit
+            )
+        except Exception as e:
+            result.error = f"Ошибка разбора: {e}"
+        metrics.observe_stage(result.source["source"], "parse", time.perf_counter() - started)
+        return result
+
+    async def fetch_and_parse(self, source: dict) -> FetchResult:
+        """Условная загрузка источника; неизменившиеся ленты не разбираются"""
+        headers = self.state_store.request_headers(source["url"]) if self.state_store else None
+        result = await self.fetch(source, headers=headers)
+        metrics.observe_stage(source["source"], "fetch", result.elapsed)
+        if result.error:
+            metrics.INGEST_FETCHES.labels(source["source"], "error").inc()
+            logger.warning("Не удалось загрузить источник", extra={
+                "source": source["source"], "error": result.error, "attempts": result.attempts,
+            })
+            return result
+
+        if result.status == 304:
+            result.not_modified = True
+        else:
+            result.content_hash = hashlib.sha256(result.body).hexdigest()
+            if self.state_store and self.state_store.is_unchanged(source["url"], result.content_hash):
+                result.not_modified = True
+        if result.not_modified:
+            metrics.INGEST_FETCHES.labels(source["source"], "not_modified").inc()
+            return result
+
+        metrics.INGEST_FETCHES.labels(source["source"], "ok").inc()
+        return await self.parse(result)
+
+    async def fetch_all(self, sources: List[dict]) -> List[FetchResult]:
+        """Конкурентная загрузка и разбор всех источников"""
+        return await asyncio.gather(*(self.fetch_and_parse(source) for source in sources))
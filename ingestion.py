@@ -0,0 +1,113 @@
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Iterable, List
+
+from sqlalchemy import select, union_all
+from sqlalchemy.orm import Session
+
+from clustering import story_clusterer
+from database import insert_on_conflict
+from models import NewsArchive, NewsArticle, normalize_url
+from stats import apply_deltas, article_deltas
+
+logger = logging.getLogger(__name__)
+
+INGEST_CHUNK_SIZE = 500
+
+ARTICLE_FIELDS = ("title", "summary", "url", "source", "category", "published_at")
+
+
+@dataclass
+class IngestResult:
+    """Итог пакетной загрузки новостей"""
+    inserted: int = 0
+    skipped: int = 0
+    inserted_rows: List[dict] = field(default_factory=list)
+
+
+# Подписчики на новые статьи: вызываются после фиксации транзакции со списком
+# вставленных строк (словари с полями NewsArticle, включая id)
+_listeners: List[Callable[[List[dict]], None]] = []
+
+
+def add_listener(listener: Callable[[List[dict]], None]):
+    _listeners.append(listener)
+
+
+def notify_listeners(rows: List[dict]):
+    if not rows:
+        return
+    for listener in _listeners:
+        try:
+            listener(rows)
+        except Exception:
+            logger.exception(f"Ошибка обработчика новых статей {listener!r}")
+
+
+def _insert_ignore(db: Session):
+    """INSERT ... ON CONFLICT (url_key) DO NOTHING для текущего диалекта"""
+    return insert_on_conflict(db.get_bind(), NewsArticle).on_conflict_do_nothing(index_elements=["url_key"]).returning(
+        NewsArticle.id, NewsArticle.url_key, NewsArticle.is_active, NewsArticle.created_at
+    )
+
+
+def _existing_url_keys(db: Session, url_keys: List[str]) -> set:
+    # Архивные тоже: удаленная статья, которая еще есть в RSS, не должна вернуться
+    rows = db.execute(union_all(
+        select(NewsArticle.url_key).where(NewsArticle.url_key.in_(url_keys)),
+        select(NewsArchive.url_key).where(NewsArchive.url_key.in_(url_keys)),
+    ))
+    return {row[0] for row in rows}
+
+
+def bulk_ingest(db: Session, candidates: Iterable[dict], chunk_size: int = INGEST_CHUNK_SIZE) -> IngestResult:
+    """Пакетная загрузка новостей с дедупликацией по нормализованному URL.
+
+    Кандидаты — словари с полями title, summary, url, source, category и
+    (необязательно) published_at. Существующие URL определяются одним запросом
+    на пакет, новые строки вставляются одним INSERT ... ON CONFLICT DO NOTHING.
+    Новым статьям назначается сюжет (cluster_id) в той же транзакции.
+    """
+    result = IngestResult()
+    chunk = {}
+
+    def flush():
+        existing = _existing_url_keys(db, list(chunk))
+        rows = [row for url_key, row in chunk.items() if url_key not in existing]
+        result.skipped += len(chunk) - len(rows)
+        if rows:
+            inserted = db.execute(_insert_ignore(db), rows).all()
+            for article_id, url_key, is_active, created_at in inserted:
+                row = chunk[url_key]
+                row.update(id=article_id, is_active=is_active, created_at=created_at)
+                result.inserted_rows.append(row)
+            result.inserted += len(inserted)
+            result.skipped += len(rows) - len(inserted)
+        chunk.clear()
+
+    now = datetime.now()
+    for candidate in candidates:
+        url_key = normalize_url(candidate["url"])
+        if url_key in chunk:
+            result.skipped += 1
+            continue
+        row = {name: candidate.get(name) for name in ARTICLE_FIELDS}
+        row["url_key"] = url_key
+        row["published_at"] = row["published_at"] or now
+        chunk[url_key] = row
+        if len(chunk) >= chunk_size:
+            flush()
+
+    if chunk:
+        flush()
+    assignments = story_clusterer.assign(result.inserted_rows)
+    story_clusterer.store(db, assignments)
+    for row, assignment in zip(result.inserted_rows, assignments):
+        row["cluster_id"] = assignment.cluster_id
+    apply_deltas(db.connection(), article_deltas(result.inserted_rows))
+    db.commit()
+    story_clusterer.add(assignments)
+    notify_listeners(result.inserted_rows)
+    return result
+
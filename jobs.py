@@ -0,0 +1,196 @@
+import json
+import logging
+import os
+import threading
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from classifier import default_classifier
+from database import SessionLocal
+from models import NewsArticle
+from cache import ALL, response_cache
+from ranking import feed_ranker
+from stats import Deltas, apply_deltas, count_article
+
+logger = logging.getLogger(__name__)
+
+RECATEGORIZE_CHECKPOINT_PATH = os.getenv("RECATEGORIZE_CHECKPOINT_PATH", "./recategorize_checkpoint.json")
+
+
+@dataclass
+class JobProgress:
+    """Прогресс фоновой задачи"""
+    id: str
+    kind: str
+    status: str = "pending"
+    processed: int = 0
+    updated: int = 0
+    last_id: int = 0
+    resumed: bool = False
+    error: Optional[str] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    def as_dict(self) -> dict:
+        data = asdict(self)
+        for key in ("started_at", "finished_at"):
+            if data[key] is not None:
+                data[key] = data[key].isoformat()
+        return data
+
+
+class RecategorizationJob:
+    """Переклассификация новостей порциями по диапазонам первичного ключа.
+
+    Каждая порция читается отдельным запросом (id > last_id ORDER BY id LIMIT n),
+    классифицируется пакетно и записывается одним bulk UPDATE только для
+    строк, у которых категория изменилась. После каждой порции фиксируется
+    транзакция и сохраняется контрольная точка, поэтому блокировка записи
+    держится недолго, а прерванная задача продолжается с места остановки.
+
+    С only_missing=False заданная категория заменяется, только если в тексте
+    нашлись ключевые слова: категория по умолчанию без совпадений попадает
+    лишь в пустые поля, а категории, которых классификатор не знает
+    (например, выставленные редактором), не затираются.
+    """
+
+    CHUNK_SIZE = 1000
+
+    def __init__(self, only_missing: bool = True, chunk_size: int = CHUNK_SIZE,
+                 checkpoint_path: str = RECATEGORIZE_CHECKPOINT_PATH):
+        self.only_missing = only_missing
+        self.chunk_size = chunk_size
+        self.checkpoint_path = checkpoint_path
+        self.progress = JobProgress(id=uuid.uuid4().hex, kind="recategorize")
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def _load_checkpoint(self):
+        if not os.path.exists(self.checkpoint_path):
+            return
+        with open(self.checkpoint_path, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        if checkpoint.get("only_missing") != self.only_missing:
+            return
+        self.progress.last_id = checkpoint["last_id"]
+        self.progress.processed = checkpoint["processed"]
+        self.progress.updated = checkpoint["updated"]
+        self.progress.resumed = True
+
+    def _save_checkpoint(self):
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "only_missing": self.only_missing,
+                "last_id": self.progress.last_id,
+                "processed": self.progress.processed,
+                "updated": self.progress.updated,
+            }, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _clear_checkpoint(self):
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    def _process_chunk(self, db: Session) -> bool:
+        """Обработка одной порции; False — строк больше нет"""
+        query = (
+            select(NewsArticle.id, NewsArticle.title, NewsArticle.summary, NewsArticle.category,
+                   NewsArticle.source, NewsArticle.is_active)
+            .where(NewsArticle.id > self.progress.last_id)
+            .order_by(NewsArticle.id)
+            .limit(self.chunk_size)
+        )
+        if self.only_missing:
+            query = query.where(NewsArticle.category.is_(None))
+        rows = db.execute(query).all()
+        if not rows:
+            return False
+
+        results = default_classifier.classify_many(f"{row.title} {row.summary or ''}" for row in rows)
+        changes = []
+        deltas = Deltas()
+        for row, (category, score) in zip(rows, results):
+            if category == row.category or (score <= 0 and row.category is not None):
+                continue
+            changes.append({"id": row.id, "category": category})
+            if row.is_active:
+                count_article(deltas, row.category, row.source, -1)
+                count_article(deltas, category, row.source)
+        if changes:
+            db.execute(update(NewsArticle), changes)
+            apply_deltas(db.connection(), deltas)
+        db.commit()
+
+        self.progress.last_id = rows[-1][0]
+        self.progress.processed += len(rows)
+        self.progress.updated += len(changes)
+        self._save_checkpoint()
+        return True
+
+    def run(self, db: Session) -> JobProgress:
+        self.progress.status = "running"
+        self.progress.started_at = datetime.now()
+        try:
+            self._load_checkpoint()
+            while not self._cancelled.is_set() and self._process_chunk(db):
+                pass
+            if self._cancelled.is_set():
+                self.progress.status = "cancelled"
+            else:
+                self._clear_checkpoint()
+                self.progress.status = "done"
+            if self.progress.updated:
+                feed_ranker.clear()
+                response_cache.invalidate(ALL)
+        except Exception as e:
+            db.rollback()
+            self.progress.status = "failed"
+            self.progress.error = str(e)
+            logger.exception("Ошибка переклассификации")
+        finally:
+            self.progress.finished_at = datetime.now()
+        return self.progress
+
+
+class JobRegistry:
+    """Фоновые задачи текущего процесса"""
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self._jobs: Dict[str, RecategorizationJob] = {}
+        self._lock = threading.Lock()
+
+    def start(self, job: RecategorizationJob) -> RecategorizationJob:
+        """Запуск задачи в отдельном потоке; если такая уже выполняется — возвращается она"""
+        with self._lock:
+            for existing in self._jobs.values():
+                if existing.progress.kind == job.progress.kind and existing.progress.status in ("pending", "running"):
+                    return existing
+            self._jobs[job.progress.id] = job
+        threading.Thread(target=self._run, args=(job,), daemon=True, name=f"job-{job.progress.id}").start()
+        return job
+
+    def _run(self, job: RecategorizationJob):
+        db = self.session_factory()
+        try:
+            job.run(db)
+        finally:
+            db.close()
+
+    def get(self, job_id: str) -> Optional[RecategorizationJob]:
+        return self._jobs.get(job_id)
+
+    def cancel_all(self):
+        for job in self._jobs.values():
+            job.cancel()
+
+
+job_registry = JobRegistry()
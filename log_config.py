@@ -0,0 +1,66 @@
+"""Структурированное логирование: по записи JSON в строке (по умолчанию) или текст.
+
+LOG_FORMAT=json|text, LOG_LEVEL=INFO. Поля, переданные через extra=, выводятся
+отдельными ключами JSON (в текстовом формате — парами key=value в конце):
+
+    logger.info("Источник загружен", extra={"source": "ТАСС", "entries": 5})
+"""
+import logging
+import os
+import sys
+from datetime import datetime, timezone
+
+from serialization import dumps
+
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+
+# Стандартные атрибуты LogRecord; все остальные пришли из extra=
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def _extra(record: logging.LogRecord) -> dict:
+    return {key: value for key, value in vars(record).items() if key not in _RESERVED}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **_extra(record),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        try:
+            return dumps(entry).decode()
+        except TypeError:
+            # В extra попал объект, который JSON не поддерживает
+            return dumps({key: value if isinstance(value, (str, int, float, bool, type(None))) else str(value)
+                          for key, value in entry.items()}).decode()
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        extra = _extra(record)
+        if extra:
+            text += " " + " ".join(f"{key}={value}" for key, value in extra.items())
+        return text
+
+
+def configure_logging(log_format: str = LOG_FORMAT, level: str = LOG_LEVEL):
+    """Обработчик корневого логгера (stderr); повторный вызов его заменяет"""
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if log_format == "json" else TextFormatter())
+    root = logging.getLogger()
+    for existing in [h for h in root.handlers if getattr(h, "_log_config", False)]:
+        root.removeHandler(existing)
+    handler._log_config = True
+    root.addHandler(handler)
+    root.setLevel(level.upper())
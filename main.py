@@ -1,22 +1,71 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Request
+from fastapi import FastAPI, Depends, HTTPException, status, Request, Response, Query
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
-from typing import List, Optional
+from typing import List, Literal, Optional
 import database as db
 import schemas as sch
 import auth
 import models
+from fetcher import shutdown_parse_executor
+from ingestion import bulk_ingest
+from scheduler import INGEST_SCHEDULER_ENABLED, IngestionScheduler
+from jobs import RecategorizationJob, job_registry
+from pagination import CURSOR_HEADER, paginate_rows_async
+from serialization import (ARCHIVE_FIELDS, NEWS_FIELDS, archive_rows, dump_news_dicts, dump_news_row, dump_news_rows,
+                           dumps, news_rows)
+import search
+import bulk
+import export
+from ranking import feed_ranker
+from clustering import collapsed, story_clusterer
+from cache import ALL, LIST, article_scope, category_scope, response_cache
+from retention import retention_manager
+from pages import page_renderer
+import stats
+import migrate
+import metrics
+import profiling
+from log_config import configure_logging
 from datetime import datetime
 from contextlib import asynccontextmanager
+import logging
+
+configure_logging()
+logger = logging.getLogger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    models.Base.metadata.create_all(bind=db.engine)
-    print("Таблицы базы данных созданы")
+    await run_in_threadpool(migrate.check_schema, db.engine)
+    logger.info("Схема базы данных актуальна")
+    await stats.stats_reconciler.start()
+    await run_in_threadpool(_warm_feeds)
+    await run_in_threadpool(page_renderer.warm)
+    await retention_manager.start()
+    
+    scheduler = None
+    if INGEST_SCHEDULER_ENABLED:
+        from parser import RealNewsParser
+        scheduler = IngestionScheduler(RealNewsParser.RSS_SOURCES)
+        await scheduler.start()
+    app.state.scheduler = scheduler
     yield
+    if scheduler is not None:
+        await scheduler.stop()
+    await retention_manager.stop()
+    await stats.stats_reconciler.stop()
+    job_registry.cancel_all()
+    shutdown_parse_executor()
+    auth.shutdown_password_executor()
+    await db.async_engine.dispose()
+
+def _warm_feeds():
+    with db.SessionLocal() as db_session:
+        story_clusterer.warm(db_session)
+        feed_ranker.warm(db_session)
 
 app = FastAPI(
     title="News Aggregator API",
@@ -25,51 +74,133 @@ app = FastAPI(
     lifespan=lifespan
 )
 
-templates = Jinja2Templates(directory="templates")
+# Запросы к БД учитываются и в метриках HTTP-запроса, в котором выполнены
+app.add_middleware(profiling.ProfilingMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
+metrics.instrument_engine(db.engine, "sync")
+metrics.instrument_engine(db.async_engine.sync_engine, "async")
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 @app.get("/", response_class=HTMLResponse)
 async def read_root(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
+    return page_renderer.static_page("index.html").respond(request)
 
 @app.get("/login", response_class=HTMLResponse)
 async def login_page(request: Request):
-    return templates.TemplateResponse("login.html", {"request": request})
+    return page_renderer.static_page("login.html").respond(request)
 
 @app.get("/register", response_class=HTMLResponse)
 async def register_page(request: Request):
-    return templates.TemplateResponse("register.html", {"request": request})
+    return page_renderer.static_page("register.html").respond(request)
 
 @app.get("/news", response_class=HTMLResponse)
-async def news_page(request: Request, db_session: Session = Depends(db.get_db)):
-    news = db_session.query(models.NewsArticle).filter(
-        models.NewsArticle.is_active == True
-    ).order_by(models.NewsArticle.published_at.desc()).limit(20).all()
-    return templates.TemplateResponse("news.html", {"request": request, "news": news})
+async def news_page(request: Request, cursor: Optional[str] = None):
+    """Первая страница статей рендерится на сервере один раз на версию данных (gzip/brotli, ETag)"""
+    return await page_renderer.news_page(request, cursor)
 
 @app.get("/create-news", response_class=HTMLResponse)
 async def create_news_page(request: Request):
-    return templates.TemplateResponse("create_news.html", {"request": request})
+    return page_renderer.static_page("create_news.html").respond(request)
 
 @app.get("/api/news/", response_model=List[sch.NewsArticle], summary="Получить все новости")
-def read_news(skip: int = 0, limit: int = 100, db_session: Session = Depends(db.get_db)):
-    """Получить список всех новостей с пагинацией"""
-    return db_session.query(models.NewsArticle).filter(
-        models.NewsArticle.is_active == True
-    ).offset(skip).limit(limit).all()
+async def read_news(request: Request, skip: int = 0, limit: int = Query(100, ge=1, le=500),
+                    cursor: Optional[str] = None, collapse_duplicates: bool = False,
+                    db_session: AsyncSession = Depends(db.get_async_db)):
+    """Получить список всех новостей с пагинацией.
+
+    Новости отсортированы по дате публикации (сначала новые). Курсор следующей
+    страницы возвращается в заголовке X-Next-Cursor; skip оставлен для
+    совместимости и на глубоких страницах работает медленно.
+    collapse_duplicates=true оставляет по одной (первой) статье каждого сюжета.
+    Ответы кешируются до следующей записи новостей (ETag, 304).
+    """
+    key, cached = response_cache.lookup(request, LIST)
+    if cached is not None:
+        return cached
+    
+    statement = news_rows().where(models.NewsArticle.is_active == True)
+    if collapse_duplicates:
+        statement = statement.where(collapsed())
+    headers = {}
+    if skip and not cursor:
+        result = await db_session.execute(statement.order_by(
+            models.NewsArticle.published_at.desc(), models.NewsArticle.id.desc()
+        ).offset(skip).limit(limit))
+        news = result.all()
+    else:
+        news, next_cursor = await paginate_rows_async(db_session, statement, limit, cursor)
+        if next_cursor:
+            headers[CURSOR_HEADER] = next_cursor
+    return response_cache.store(request, key, dump_news_rows(news), headers=headers)
+
+@app.get("/api/news/search", response_model=List[sch.NewsSearchResult], summary="Поиск новостей")
+def search_news(response: Response, q: str = Query(..., min_length=2), limit: int = Query(20, ge=1, le=100),
+                cursor: Optional[str] = None, db_session: Session = Depends(db.get_db)):
+    """Полнотекстовый поиск по заголовку и описанию.
+
+    Результаты упорядочены по релевантности (BM25, заголовок весомее описания),
+    в snippet совпадения выделены тегом <mark>. Курсор следующей страницы —
+    в заголовке X-Next-Cursor. Поиск есть только на SQLite (FTS5), на
+    PostgreSQL — 501.
+    """
+    if not search.search_supported(db_session):
+        raise HTTPException(status_code=501, detail="Search is not supported for this database")
+    items, next_cursor = search.search_news(db_session, q, limit, cursor)
+    if next_cursor:
+        response.headers[CURSOR_HEADER] = next_cursor
+    return items
+
+@app.get("/api/news/export", summary="Потоковая выгрузка новостей в NDJSON или CSV")
+async def export_news(request: Request, format: Literal["ndjson", "csv"] = export.NDJSON,
+                      date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                      category: Optional[str] = None, source: Optional[str] = None,
+                      updated_since: Optional[datetime] = None, include_inactive: bool = False):
+    """Все подходящие статьи одним потоком, с полем updated_at.
+
+    date_from/date_to фильтруют по дате публикации (date_to не включается).
+    Заголовок X-Export-Watermark — updated_since для следующей выгрузки
+    (отстает на EXPORT_WATERMARK_LAG, строки на границе приходят повторно).
+    include_inactive=true добавляет удаленные и перенесенные в архив статьи
+    (is_active=false); без него удаления не выгружаются.
+    С Accept-Encoding: gzip поток сжимается на лету.
+    """
+    statements = export.export_queries(date_from, date_to, category, source, updated_since, include_inactive)
+    return export.export_response(request, statements, format)
 
 @app.get("/api/news/{news_id}", response_model=sch.NewsArticle, summary="Получить новость по ID")
-def read_news_item(news_id: int, db_session: Session = Depends(db.get_db)):
-    """Получить конкретную новость по её ID"""
-    news = db_session.query(models.NewsArticle).filter(models.NewsArticle.id == news_id).first()
+async def read_news_item(news_id: int, request: Request, db_session: AsyncSession = Depends(db.get_async_db)):
+    """Получить конкретную новость по её ID (в том числе перенесенную в архив)"""
+    key, cached = response_cache.lookup(request, article_scope(news_id))
+    if cached is not None:
+        return cached
+    result = await db_session.execute(news_rows().where(models.NewsArticle.id == news_id))
+    news = result.first()
+    if news is None:
+        result = await db_session.execute(archive_rows(NEWS_FIELDS).where(models.NewsArchive.id == news_id))
+        news = result.first()
     if news is None:
         raise HTTPException(status_code=404, detail="News not found")
-    return news
+    return response_cache.store(request, key, dump_news_row(news))
+
+@app.get("/api/news/archive/{news_id}", response_model=sch.NewsArchiveItem, summary="Получить архивную новость по ID")
+async def read_archived_news_item(news_id: int, db_session: AsyncSession = Depends(db.get_async_db)):
+    """Новость, перенесенная в архив политикой хранения, с датой переноса"""
+    result = await db_session.execute(archive_rows().where(models.NewsArchive.id == news_id))
+    news = result.first()
+    if news is None:
+        raise HTTPException(status_code=404, detail="News not found in archive")
+    return Response(content=dump_news_row(news, ARCHIVE_FIELDS), media_type="application/json")
 
 @app.post("/api/news/", response_model=sch.NewsArticle, summary="Создать новость")
 def create_news(news: sch.NewsArticleCreate, db_session: Session = Depends(db.get_db), 
                 current_user: sch.User = Depends(auth.get_current_active_user)):
     """Создать новую новость (требуется аутентификация)"""
+    if db_session.query(models.NewsArticle.id).filter(
+        models.NewsArticle.url_key == models.normalize_url(news.url)
+    ).first():
+        raise HTTPException(status_code=400, detail="News with this URL already exists")
+    
     db_news = models.NewsArticle(
         title=news.title,
         summary=news.summary,  
@@ -79,10 +210,33 @@ def create_news(news: sch.NewsArticleCreate, db_session: Session = Depends(db.ge
         published_at=news.published_at or datetime.now()
     )
     db_session.add(db_news)
+    db_session.flush()
+    assignments = story_clusterer.assign([db_news])
+    db_news.cluster_id = assignments[0].cluster_id
     db_session.commit()
     db_session.refresh(db_news)
+    story_clusterer.add(assignments)
+    feed_ranker.on_articles_added([db_news])
+    response_cache.invalidate_articles([db_news])
     return db_news
 
+@app.post("/api/news/bulk", response_model=sch.NewsBulkResult,
+          responses={400: {"model": sch.NewsBulkResult}, 413: {"model": sch.NewsBulkResult}},
+          summary="Пакетное создание, изменение и удаление новостей")
+async def bulk_news(request: Request, atomic: bool = False,
+                    current_user: sch.User = Depends(auth.get_current_active_user)):
+    """Операции create/update/delete из NDJSON или JSON-массива с результатом по каждой.
+
+    atomic=true применяет все операции в одной транзакции: при любой ошибке
+    ничего не сохраняется и возвращается 400. Если в NDJSON операций больше
+    BULK_MAX_OPERATIONS, чтение прекращается и в ответе появляется truncated_at
+    (номер первой необработанной). Код 413 означает, что ничего не применено;
+    если часть операций сохранена, ответ — 200 с результатом по каждой, и
+    повторять нужно только операции начиная с truncated_at.
+    """
+    result = await bulk.run_bulk(request, atomic)
+    return Response(content=dumps(result), media_type="application/json", status_code=bulk.response_status(result))
+
 @app.put("/api/news/{news_id}", response_model=sch.NewsArticle, summary="Обновить новость")
 def update_news(news_id: int, news: sch.NewsArticleUpdate, db_session: Session = Depends(db.get_db),
                 current_user: sch.User = Depends(auth.get_current_active_user)):
@@ -92,11 +246,20 @@ def update_news(news_id: int, news: sch.NewsArticleUpdate, db_session: Session =
         raise HTTPException(status_code=404, detail="News not found")
     
     update_data = news.model_dump(exclude_unset=True)
+    if "url" in update_data and db_session.query(models.NewsArticle.id).filter(
+        models.NewsArticle.url_key == models.normalize_url(update_data["url"]),
+        models.NewsArticle.id != news_id
+    ).first():
+        raise HTTPException(status_code=400, detail="News with this URL already exists")
+    
+    old_category = db_news.category
     for field, value in update_data.items():
         setattr(db_news, field, value)
     
     db_session.commit()
     db_session.refresh(db_news)
+    feed_ranker.on_article_changed(db_news)
+    response_cache.invalidate_articles([db_news, {"id": news_id, "category": old_category}])
     return db_news
 
 @app.delete("/api/news/{news_id}", summary="Удалить новость")
@@ -108,24 +271,32 @@ def delete_news(news_id: int, db_session: Session = Depends(db.get_db),
         raise HTTPException(status_code=404, detail="News not found")
     
     news.is_active = False
+    new_head = story_clusterer.promote_head(db_session, news)
     db_session.commit()
+    story_clusterer.on_article_removed(news_id, new_head)
+    feed_ranker.on_article_removed(news_id)
+    if new_head is not None:
+        # У статей сюжета сменился cluster_id — они могут быть в любых категориях
+        response_cache.invalidate(ALL)
+    else:
+        response_cache.invalidate_articles([news])
     return {"message": "News deleted successfully"}
 
 @app.post("/auth/register", response_model=sch.User, summary="Регистрация пользователя")
-def register(user: sch.UserCreate, db_session: Session = Depends(db.get_db)):
+async def register(user: sch.UserCreate, db_session: AsyncSession = Depends(db.get_async_db)):
     """Регистрация нового пользователя в системе"""
-    if auth.get_user_by_email(db_session, user.email):
+    if await auth.get_user_by_email_async(db_session, user.email):
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    if auth.get_user_by_username(db_session, user.username):
+    if await auth.get_user_by_username_async(db_session, user.username):
         raise HTTPException(status_code=400, detail="Username already taken")
     
-    return auth.create_user(db_session, user)
+    return await auth.create_user_async(db_session, user)
 
 @app.post("/auth/login", response_model=sch.Token, summary="Аутентификация пользователя")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db_session: Session = Depends(db.get_db)):
-    """Аутентификация пользователя и получение JWT токена"""
-    user = auth.authenticate_user(db_session, form_data.username, form_data.password)
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db_session: AsyncSession = Depends(db.get_async_db)):
+    """Аутентификация пользователя и получение JWT токена (503 и Retry-After при перегрузке)"""
+    user = await auth.authenticate_user_async(db_session, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -163,90 +334,221 @@ def parse_news(db_session: Session = Depends(db.get_db),
         }
     ]
     
-    added_count = 0
-    for news_data in sample_news:
-        existing = db_session.query(models.NewsArticle).filter(models.NewsArticle.url == news_data["url"]).first()
-        if not existing:
-            db_news = models.NewsArticle(
-                title=news_data["title"],
-                summary=news_data["summary"], 
-                source=news_data["source"],
-                category=news_data["category"],
-                url=news_data["url"],
-                published_at=datetime.now()
-            )
-            db_session.add(db_news)
-            added_count += 1
-    
-    db_session.commit()
-    return {"message": "News parsed successfully", "count": added_count}
+    result = bulk_ingest(db_session, sample_news)
+    return {"message": "News parsed successfully", "count": result.inserted, "skipped": result.skipped}
 
 @app.post("/api/parse-real-news/", summary="Парсинг реальных новостей из RSS")
-def parse_real_news(db_session: Session = Depends(db.get_db),
+async def parse_real_news(db_session: Session = Depends(db.get_db),
                 current_user: sch.User = Depends(auth.get_current_active_user)):
     """Парсинг реальных новостей из RSS источников"""
     try:
         from parser import RealNewsParser
-        added_count = RealNewsParser.parse_real_rss_sources(db_session)
+        results = await RealNewsParser.fetch_rss_sources()
+        added_count = await run_in_threadpool(RealNewsParser.store_fetch_results, db_session, results)
         return {
             "message": "Реальные новости успешно спарсены", 
             "count": added_count,
-            "sources": ["Lenta.ru", "Ведомости", "Коммерсантъ", "ТАСС"]
+            "sources": [result.source["source"] for result in results]
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка парсинга: {str(e)}")
 
+@app.get("/api/feeds/stats", summary="Статистика загрузки RSS источников")
+def feeds_stats(current_user: sch.User = Depends(auth.get_current_active_user)):
+    """Счетчики условных запросов по источникам: попадания, промахи, сэкономленные байты"""
+    from feed_state import get_feed_state_store
+    return get_feed_state_store().stats()
+
+@app.get("/api/auth/cache-stats", summary="Статистика кеша пользователей")
+def auth_cache_stats(current_user: sch.User = Depends(auth.get_current_active_user)):
+    """Попадания, промахи и вытеснения в кешах пользователей и токенов; загрузка пула bcrypt"""
+    from user_cache import user_cache
+    return {**user_cache.stats(), "password_pool": auth.password_pool_stats(), "responses": response_cache.stats()}
+
+@app.get("/api/ingest/status", summary="Состояние планировщика загрузки")
+def ingest_status(request: Request, current_user: sch.User = Depends(auth.get_current_active_user)):
+    """Интервалы, время следующего опроса и последняя задержка по каждому источнику"""
+    scheduler = request.app.state.scheduler
+    if scheduler is None:
+        return {"enabled": False, "sources": [], "clusters": story_clusterer.stats()}
+    return {"enabled": True, "sources": scheduler.status(), "clusters": story_clusterer.stats()}
+
 @app.post("/api/update-categories/", summary="Обновление категорий новостей")
-def update_categories(db_session: Session = Depends(db.get_db),
+def update_categories(only_missing: bool = True,
                     current_user: sch.User = Depends(auth.get_current_active_user)):
-    """Автоматическое обновление категорий для существующих новостей"""
-    try:
-        from parser import RealNewsParser
-        updated_count = RealNewsParser.update_news_categories(db_session)
-        return {
-            "message": "Категории успешно обновлены",
-            "updated_count": updated_count
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Ошибка обновления категорий: {str(e)}")
+    """Запуск фоновой переклассификации новостей; прогресс доступен по job_id.
+
+    По умолчанию заполняются только пустые категории. С only_missing=false
+    категория заменяется, если классификатор нашел в тексте ключевые слова.
+    """
+    job = job_registry.start(RecategorizationJob(only_missing=only_missing))
+    return {
+        "message": "Обновление категорий запущено",
+        "job_id": job.progress.id,
+        "status": job.progress.status
+    }
+
+@app.get("/api/update-categories/{job_id}", summary="Прогресс обновления категорий")
+def update_categories_status(job_id: str, current_user: sch.User = Depends(auth.get_current_active_user)):
+    """Состояние задачи переклассификации"""
+    job = job_registry.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.progress.as_dict()
+
+@app.post("/api/retention/run", summary="Перенос устаревших новостей в архив")
+async def run_retention(current_user: sch.User = Depends(auth.get_current_active_user)):
+    """Немедленный запуск политик хранения (обычно выполняются раз в RETENTION_INTERVAL)"""
+    return await run_in_threadpool(retention_manager.run_once)
 
 @app.get("/api/news/category/{category}", response_model=List[sch.NewsArticle], summary="Новости по категории")
-def get_news_by_category(category: str, db_session: Session = Depends(db.get_db)):
-    """Получить новости по определенной категории"""
-    return db_session.query(models.NewsArticle).filter(
+async def get_news_by_category(category: str, request: Request, limit: int = Query(100, ge=1, le=500),
+                               cursor: Optional[str] = None, collapse_duplicates: bool = False,
+                               db_session: AsyncSession = Depends(db.get_async_db)):
+    """Получить новости по определенной категории (курсор следующей страницы — в X-Next-Cursor).
+
+    collapse_duplicates=true оставляет по одной (первой в этой категории) статье каждого сюжета.
+    """
+    key, cached = response_cache.lookup(request, category_scope(category))
+    if cached is not None:
+        return cached
+    statement = news_rows().where(
         models.NewsArticle.category == category,
         models.NewsArticle.is_active == True
-    ).all()
+    )
+    if collapse_duplicates:
+        statement = statement.where(collapsed(category))
+    news, next_cursor = await paginate_rows_async(db_session, statement, limit, cursor)
+    headers = {CURSOR_HEADER: next_cursor} if next_cursor else {}
+    return response_cache.store(request, key, dump_news_rows(news), headers=headers)
 
 @app.get("/api/personalized-news/", response_model=List[sch.NewsArticle], summary="Персонализированные новости")
-def get_personalized_news(db_session: Session = Depends(db.get_db),
+def get_personalized_news(skip: int = Query(0, ge=0), limit: int = Query(20, ge=1, le=100),
+                        db_session: Session = Depends(db.get_db),
                         current_user: sch.User = Depends(auth.get_current_active_user)):
-    """Получить персонализированную ленту новостей"""
-    return db_session.query(models.NewsArticle).filter(
-        models.NewsArticle.category == "технологии",
-        models.NewsArticle.is_active == True
-    ).limit(10).all()
+    """Персональная лента: категории и ключевые слова пользователя с учетом свежести"""
+    news = feed_ranker.get_feed(db_session, current_user.id, limit=limit, skip=skip)
+    return Response(content=dump_news_dicts(news), media_type="application/json")
+
+@app.get("/api/preferences/", response_model=List[sch.UserPreference], summary="Предпочтения пользователя")
+def read_preferences(db_session: Session = Depends(db.get_db),
+                    current_user: sch.User = Depends(auth.get_current_active_user)):
+    """Категории и ключевые слова, используемые для персональной ленты"""
+    return db_session.query(models.UserPreference).filter(
+        models.UserPreference.user_id == current_user.id
+    ).all()
+
+@app.post("/api/preferences/", response_model=sch.UserPreference, summary="Добавить предпочтение")
+def create_preference(preference: sch.UserPreferenceCreate, db_session: Session = Depends(db.get_db),
+                    current_user: sch.User = Depends(auth.get_current_active_user)):
+    """Добавить категорию и/или ключевое слово; лента пользователя будет пересчитана"""
+    if not preference.category and not preference.keyword:
+        raise HTTPException(status_code=400, detail="Category or keyword is required")
+    
+    db_preference = models.UserPreference(
+        user_id=current_user.id,
+        category=preference.category,
+        keyword=preference.keyword
+    )
+    db_session.add(db_preference)
+    db_session.commit()
+    db_session.refresh(db_preference)
+    feed_ranker.invalidate_user(current_user.id)
+    return db_preference
+
+@app.delete("/api/preferences/{preference_id}", summary="Удалить предпочтение")
+def delete_preference(preference_id: int, db_session: Session = Depends(db.get_db),
+                    current_user: sch.User = Depends(auth.get_current_active_user)):
+    """Удалить предпочтение пользователя по ID"""
+    preference = db_session.query(models.UserPreference).filter(
+        models.UserPreference.id == preference_id,
+        models.UserPreference.user_id == current_user.id
+    ).first()
+    if preference is None:
+        raise HTTPException(status_code=404, detail="Preference not found")
+    
+    db_session.delete(preference)
+    db_session.commit()
+    feed_ranker.invalidate_user(current_user.id)
+    return {"message": "Preference deleted successfully"}
+
+@app.get("/api/categories", response_model=List[sch.NewsCounter], summary="Категории новостей")
+async def read_categories(db_session: AsyncSession = Depends(db.get_async_db)):
+    """Категории активных новостей с числом статей (из таблицы счетчиков, без сканирования новостей)"""
+    return await stats.get_counts_async(db_session, stats.CATEGORY)
+
+@app.get("/api/sources", response_model=List[sch.NewsCounter], summary="Источники новостей")
+async def read_sources(db_session: AsyncSession = Depends(db.get_async_db)):
+    """Источники активных новостей с числом статей (из таблицы счетчиков)"""
+    return await stats.get_counts_async(db_session, stats.SOURCE)
+
+async def _readiness(db_session: AsyncSession) -> dict:
+    await db_session.execute(text("SELECT 1"))
+    return {
+        "status": "healthy",
+        "database": "connected",
+        "statistics": await stats.get_totals_async(db_session),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.get("/api/health/live", summary="Проверка живости API")
+async def liveness_check():
+    """Процесс отвечает на запросы; база данных не проверяется"""
+    return {"status": "alive", "timestamp": datetime.now().isoformat()}
+
+@app.get("/api/health/ready", summary="Проверка готовности API")
+async def readiness_check(db_session: AsyncSession = Depends(db.get_async_db)):
+    """Подключение к базе данных, счетчики новостей и состояние их сверки (503, если база недоступна)"""
+    try:
+        result = await _readiness(db_session)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Database error: {str(e)}")
+    result["statistics"]["categories"] = len(await stats.get_counts_async(db_session, stats.CATEGORY))
+    result["statistics"]["sources"] = len(await stats.get_counts_async(db_session, stats.SOURCE))
+    result["reconciler"] = stats.stats_reconciler.status()
+    result["retention"] = retention_manager.status()
+    return result
 
 @app.get("/api/health", summary="Проверка здоровья API")
-def health_check(db_session: Session = Depends(db.get_db)):
-    """Проверка статуса API и подключения к базе данных"""
+async def health_check(db_session: AsyncSession = Depends(db.get_async_db)):
+    """Проверка статуса API и подключения к базе данных (число новостей и пользователей — из счетчиков)"""
     try:
-        db_session.execute(text("SELECT 1"))
-        news_count = db_session.query(models.NewsArticle).filter(models.NewsArticle.is_active == True).count()
-        user_count = db_session.query(models.User).count()
-        
-        return {
-            "status": "healthy", 
-            "database": "connected",
-            "statistics": {
-                "news_count": news_count,
-                "user_count": user_count
-            },
-            "timestamp": datetime.now().isoformat()
-        }
+        return await _readiness(db_session)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
+@app.get("/api/profiles", summary="Профили запросов", dependencies=[Depends(profiling.require_profile_token)])
+def list_profiles():
+    """Последние профили: путь, длительность, число SQL-запросов и найденных N+1 (заголовок X-Profile с токеном)"""
+    return profiling.profile_store.list()
+
+def _get_profile(profile_id: int) -> profiling.RequestProfile:
+    profile = profiling.profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
+@app.get("/api/profiles/{profile_id}", summary="Профиль запроса", dependencies=[Depends(profiling.require_profile_token)])
+def read_profile(profile_id: int):
+    """SQL-запросы с длительностью, разбивка времени, повторяющиеся запросы и сводка профиля"""
+    return _get_profile(profile_id).as_dict(detail=True)
+
+@app.get("/api/profiles/{profile_id}/download", summary="Скачать профиль запроса",
+         dependencies=[Depends(profiling.require_profile_token)])
+def download_profile(profile_id: int):
+    """cprofile — файл pstats (.prof, snakeviz), sample — свернутые стеки (flamegraph.pl, speedscope)"""
+    profile = _get_profile(profile_id)
+    if profile.mode == "sample":
+        filename, media_type = f"profile-{profile.id}.folded", "text/plain"
+    else:
+        filename, media_type = f"profile-{profile.id}.prof", "application/octet-stream"
+    return Response(content=profile.data, media_type=media_type,
+                    headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@app.get("/metrics", summary="Метрики Prometheus", include_in_schema=False)
+async def metrics_endpoint():
+    """Задержки и статусы по маршрутам, SQL-запросы, этапы загрузки RSS и загрузка пулов (формат Prometheus)"""
+    return Response(content=metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
 
 if __name__ == "__main__":
     import uvicorn
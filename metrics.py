@@ -0,0 +1,372 @@
+"""Метрики в текстовом формате Prometheus (0.0.4) без внешних зависимостей.
+
+Собираются:
+- задержка и число HTTP-запросов по шаблону маршрута (MetricsMiddleware);
+- число и длительность SQL-запросов — всего и в расчете на HTTP-запрос
+  (события SQLAlchemy, instrument_engine);
+- длительность этапов загрузки RSS по источникам: fetch, parse, classify, insert;
+- при каждом чтении /metrics — занятость пулов соединений БД, пула потоков
+  (run_in_threadpool) и очереди bcrypt.
+
+Стоимость (benchmarks/bench_metrics.py, CPython 3.11, медленная одноядерная
+виртуальная машина): около 4 500 нс на HTTP-запрос в middleware и около
+9 500 нс на SQL-запрос, большая часть которых — диспетчеризация событий самой
+SQLAlchemy. Для GET /api/news/{id} это около 2,5% процессорного времени
+запроса (по профилю). METRICS_ENABLED=0 отключает сбор, /metrics при этом
+отдает пустой ответ.
+"""
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+# charset=utf-8 добавляет Starlette
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# Границы корзин гистограмм
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+STAGE_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Маршрут запросов, не дошедших до обработчика (404): путь в метку не попадает
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    """Семейство метрик с метками; дочерние значения создаются при первом labels()"""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            # Метрика без меток выводится сразу, с нулевым значением
+            self.labels()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._child())
+        return child
+
+    def _child(self):
+        raise NotImplementedError
+
+    def _label_text(self, values: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values, child) -> List[str]:
+        return [f"{self.name}{self._label_text(values)} {_format_value(child.value)}"]
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def _child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1):
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    """Текущее значение; обычно обновляется хуком Registry.on_collect перед выдачей"""
+
+    type = "gauge"
+
+    def _child(self):
+        return _Value()
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def _render_child(self, values, child) -> List[str]:
+        with child._lock:
+            counts, total = list(child.counts), child.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            le = 'le="' + _format_value(bound) + '"'
+            lines.append(f"{self.name}_bucket{self._label_text(values, le)} {cumulative}")
+        lines.append(f"{self.name}_sum{self._label_text(values)} {_format_value(total)}")
+        lines.append(f"{self.name}_count{self._label_text(values)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Набор метрик и хуков, обновляющих датчики перед каждой выдачей"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._hooks: List[Callable[[], None]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def on_collect(self, hook: Callable[[], None]):
+        self._hooks.append(hook)
+
+    def render(self) -> str:
+        if not METRICS_ENABLED:
+            return ""
+        for hook in self._hooks:
+            try:
+                hook()
+            except Exception:
+                logger.exception(f"Ошибка сбора метрик {hook!r}")
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUESTS = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route template, method and status", ("method", "route", "status")))
+HTTP_LATENCY = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route")))
+HTTP_DB_QUERIES = registry.register(Histogram(
+    "http_request_db_queries", "SQL statements executed per HTTP request", ("route",), QUERY_COUNT_BUCKETS))
+HTTP_DB_SECONDS = registry.register(Histogram(
+    "http_request_db_seconds", "Time spent in SQL statements per HTTP request", ("route",), LATENCY_BUCKETS))
+DB_QUERY_SECONDS = registry.register(Histogram(
+    "db_query_duration_seconds", "SQL statement duration by engine and statement kind",
+    ("engine", "operation"), QUERY_BUCKETS))
+DB_POOL = registry.register(Gauge(
+    "db_pool_connections", "Database pool connections by state (checked_out, idle, overflow, size)",
+    ("engine", "state")))
+THREADPOOL = registry.register(Gauge(
+    "threadpool_workers", "run_in_threadpool limiter: busy workers, capacity and waiting tasks", ("state",)))
+INGEST_STAGE_SECONDS = registry.register(Histogram(
+    "ingest_stage_duration_seconds", "RSS ingestion stage duration per source (fetch, parse, classify, insert)",
+    ("source", "stage"), STAGE_BUCKETS))
+INGEST_FETCHES = registry.register(Counter(
+    "ingest_fetches_total", "RSS fetch outcomes per source (ok, not_modified, error)", ("source", "result")))
+INGEST_ARTICLES = registry.register(Counter(
+    "ingest_articles_total", "Ingested RSS entries per source (inserted, skipped)", ("source", "result")))
+
+# [число запросов, секунды] SQL текущего HTTP-запроса. Изменяемый список общий
+# для копий контекста, поэтому запросы из run_in_threadpool и из гринлетов
+# асинхронного движка учитываются в том же HTTP-запросе
+_request_queries: ContextVar[Optional[list]] = ContextVar("request_queries", default=None)
+
+
+class MetricsMiddleware:
+    """ASGI middleware: задержка, статус и число SQL-запросов по шаблону маршрута.
+
+    Шаблон (/api/news/{news_id}) определяется по обработчику, который роутер
+    Starlette записывает в scope["endpoint"], поэтому число меток ограничено
+    числом маршрутов.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._routes: Dict[object, str] = {}
+        # (method, route) -> гистограммы запроса, чтобы не искать их по меткам каждый раз
+        self._children: Dict[Tuple[str, str], tuple] = {}
+
+    def _route(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        route = self._routes.get(endpoint)
+        if route is None:
+            route = next((route.path for route in scope["app"].routes if getattr(route, "endpoint", None) is endpoint),
+                         getattr(endpoint, "__name__", UNMATCHED_ROUTE))
+            self._routes[endpoint] = route
+        return route
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        queries = [0, 0.0]
+        token = _request_queries.set(queries)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_queries.reset(token)
+            key = (scope["method"], self._route(scope))
+            children = self._children.get(key)
+            if children is None:
+                children = self._children[key] = (
+                    HTTP_LATENCY.labels(*key), HTTP_DB_QUERIES.labels(key[1]), HTTP_DB_SECONDS.labels(key[1]))
+            HTTP_REQUESTS.labels(*key, status).inc()
+            children[0].observe(elapsed)
+            children[1].observe(queries[0])
+            children[2].observe(queries[1])
+
+
+def _operation(context) -> str:
+    if context.isinsert:
+        return "insert"
+    if context.isupdate:
+        return "update"
+    if context.isdelete:
+        return "delete"
+    return "select"
+
+
+_pools: Dict[str, object] = {}
+
+# Наблюдатели SQL-запросов (profiling.py): observer(statement, parameters, executemany, seconds)
+# вызывается после каждого запроса в потоке, где он выполнен
+_query_observers: List[Callable] = []
+
+
+def add_query_observer(observer: Callable):
+    _query_observers.append(observer)
+
+
+def instrument_engine(engine, label: str):
+    """Учет SQL-запросов движка (для асинхронного — его sync_engine) и его пула.
+
+    С METRICS_ENABLED=0 обработчики не ставятся, и наблюдатели запросов не вызываются.
+    """
+    _pools[label] = engine.pool
+    if not METRICS_ENABLED:
+        return
+    children = {operation: DB_QUERY_SECONDS.labels(label, operation)
+                for operation in ("select", "insert", "update", "delete")}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._metrics_started
+        children[_operation(context)].observe(elapsed)
+        queries = _request_queries.get()
+        if queries is not None:
+            queries[0] += 1
+            queries[1] += elapsed
+        for observer in _query_observers:
+            observer(statement, parameters, executemany, elapsed)
+
+
+def observe_stage(source: str, stage: str, seconds: float):
+    if METRICS_ENABLED:
+        INGEST_STAGE_SECONDS.labels(source, stage).observe(seconds)
+
+
+def _collect_pools():
+    for label, pool in _pools.items():
+        # NullPool и StaticPool (SQLite в памяти) размеров не сообщают
+        if not hasattr(pool, "checkedout"):
+            continue
+        DB_POOL.labels(label, "checked_out").set(pool.checkedout())
+        DB_POOL.labels(label, "idle").set(pool.checkedin())
+        DB_POOL.labels(label, "overflow").set(max(0, pool.overflow()))
+        DB_POOL.labels(label, "size").set(pool.size())
+
+
+def _collect_threadpool():
+    from anyio import to_thread
+    # Лимитер пула потоков привязан к циклу событий: вне его (скрипты) пропускается
+    try:
+        limiter = to_thread.current_default_thread_limiter()
+    except Exception:
+        return
+    statistics = limiter.statistics()
+    THREADPOOL.labels("busy").set(statistics.borrowed_tokens)
+    THREADPOOL.labels("capacity").set(statistics.total_tokens)
+    THREADPOOL.labels("waiting").set(statistics.tasks_waiting)
+
+
+registry.on_collect(_collect_pools)
+registry.on_collect(_collect_threadpool)
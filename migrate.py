@@ -0,0 +1,112 @@
+"""Версионированные миграции схемы (Alembic).
+
+    python migrate.py upgrade        # до последней версии
+    python migrate.py current        # текущая и последняя версии
+"""
+import argparse
+import logging
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Optional
+
+from alembic import command, op
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+
+import database
+from log_config import configure_logging
+
+logger = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parent
+
+# Применять недостающие миграции при старте приложения. Если выключено,
+# приложение не стартует на устаревшей схеме (миграции выполняются заранее:
+# alembic upgrade head), что удобнее для больших баз
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "1") == "1"
+
+
+def alembic_config(connection=None) -> Config:
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "migrations"))
+    if connection is not None:
+        config.attributes["connection"] = connection
+    return config
+
+
+def head_revision() -> str:
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def current_revision(engine=database.engine) -> Optional[str]:
+    with engine.connect() as connection:
+        return MigrationContext.configure(connection).get_current_revision()
+
+
+def upgrade(engine=database.engine, revision: str = "head"):
+    # Соединение без внешней транзакции: каждая миграция фиксируется отдельно,
+    # а autocommit_block может выполнять порции данных в своих транзакциях
+    with engine.connect() as connection:
+        command.upgrade(alembic_config(connection), revision)
+        connection.commit()
+
+
+def check_schema(engine=database.engine, auto_migrate: bool = DB_AUTO_MIGRATE):
+    """Проверка версии схемы при старте (одно чтение alembic_version)"""
+    current, head = current_revision(engine), head_revision()
+    if current == head:
+        return
+    if not auto_migrate:
+        raise RuntimeError(
+            f"Схема базы данных устарела ({current or 'без версии'}, нужна {head}): выполните alembic upgrade head"
+        )
+    logger.info(f"Миграция схемы {current or 'без версии'} -> {head}")
+    upgrade(engine)
+
+
+# ---------------------------------------------------------
+#       Помощники для миграций на больших таблицах
+# ---------------------------------------------------------
+
+@contextmanager
+def batch_transaction(connection):
+    """Короткая транзакция внутри autocommit_block (одна порция данных).
+
+    В SQLite блокировка записи берется сразу (BEGIN IMMEDIATE), чтобы ждать
+    ее по busy_timeout, а не получить ошибку при повышении блокировки.
+    """
+    connection.exec_driver_sql("BEGIN IMMEDIATE" if connection.dialect.name == "sqlite" else "BEGIN")
+    try:
+        yield
+    except Exception:
+        connection.exec_driver_sql("ROLLBACK")
+        raise
+    connection.exec_driver_sql("COMMIT")
+
+
+def create_index_online(name: str, table: str, columns: List[str], unique: bool = False):
+    """Создание индекса без долгой блокировки чтения.
+
+    PostgreSQL строит индекс через CREATE INDEX CONCURRENTLY (не блокирует ни
+    чтение, ни запись). В SQLite в режиме WAL построение индекса блокирует
+    только запись, читатели продолжают работать со своим снимком.
+    """
+    with op.get_context().autocommit_block():
+        op.create_index(name, table, columns, unique=unique, if_not_exists=True, postgresql_concurrently=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("action", choices=["upgrade", "current"])
+    args = parser.parse_args()
+    configure_logging()
+
+    if args.action == "upgrade":
+        upgrade()
+    print(f"current: {current_revision()}, head: {head_revision()}")
+
+
+if __name__ == "__main__":
+    main()
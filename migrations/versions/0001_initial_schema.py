@@ -0,0 +1,67 @@
+"""Исходная схема: пользователи, новости, предпочтения
+
+Таблицы создаются, только если их еще нет: базы, созданные раньше через
+create_all, переходят на миграции без ручного stamp.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 09:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "users" not in tables:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("email", sa.String, nullable=False),
+            sa.Column("username", sa.String, nullable=False),
+            sa.Column("hashed_password", sa.String, nullable=False),
+            sa.Column("is_active", sa.Boolean),
+            sa.Column("created_at", sa.DateTime),
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_email", "users", ["email"], unique=True)
+        op.create_index("ix_users_username", "users", ["username"], unique=True)
+
+    if "news_articles" not in tables:
+        op.create_table(
+            "news_articles",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("title", sa.String, nullable=False),
+            sa.Column("summary", sa.Text),
+            sa.Column("url", sa.String, nullable=False),
+            sa.Column("source", sa.String, nullable=False),
+            sa.Column("category", sa.String),
+            sa.Column("published_at", sa.DateTime),
+            sa.Column("is_active", sa.Boolean),
+            sa.Column("created_at", sa.DateTime),
+        )
+        op.create_index("ix_news_articles_id", "news_articles", ["id"])
+
+    if "user_preferences" not in tables:
+        op.create_table(
+            "user_preferences",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("category", sa.String),
+            sa.Column("keyword", sa.String),
+            sa.Column("created_at", sa.DateTime),
+        )
+        op.create_index("ix_user_preferences_id", "user_preferences", ["id"])
+
+
+def downgrade():
+    op.drop_table("user_preferences")
+    op.drop_table("news_articles")
+    op.drop_table("users")
@@ -0,0 +1,97 @@
+"""url_key: нормализованный URL, удаление дубликатов, уникальный индекс
+
+Колонка заполняется порциями по первичному ключу, каждая порция — своя
+короткая транзакция, поэтому загрузка новостей не останавливается на время
+миграции. Из статей с одинаковым нормализованным URL остается самая ранняя
+(наименьший id), остальные удаляются; downgrade их не восстанавливает.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 09:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrate import batch_transaction, create_index_online
+from models import normalize_url
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+news = sa.table(
+    "news_articles",
+    sa.column("id", sa.Integer),
+    sa.column("url", sa.String),
+    sa.column("url_key", sa.String),
+)
+
+
+def backfill_url_keys(connection, batch_size: int = BATCH_SIZE) -> int:
+    """Заполнение url_key у строк без ключа; возвращает число удаленных дубликатов"""
+    set_url_key = (
+        sa.update(news)
+        .where(news.c.id == sa.bindparam("b_id"))
+        .values(url_key=sa.bindparam("b_url_key"))
+    )
+    deleted = 0
+    last_id = 0
+    while True:
+        with batch_transaction(connection):
+            rows = connection.execute(
+                sa.select(news.c.id, news.c.url)
+                .where(news.c.id > last_id, news.c.url_key.is_(None))
+                .order_by(news.c.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+
+            first_ids, duplicates = {}, []
+            for article_id, url in rows:
+                url_key = normalize_url(url)
+                if url_key in first_ids:
+                    duplicates.append(article_id)
+                else:
+                    first_ids[url_key] = article_id
+            existing = set(connection.execute(
+                sa.select(news.c.url_key).where(news.c.url_key.in_(list(first_ids)))
+            ).scalars())
+            duplicates += [article_id for url_key, article_id in first_ids.items() if url_key in existing]
+            params = [
+                {"b_id": article_id, "b_url_key": url_key}
+                for url_key, article_id in first_ids.items() if url_key not in existing
+            ]
+            if params:
+                connection.execute(set_url_key, params)
+            if duplicates:
+                connection.execute(sa.delete(news).where(news.c.id.in_(duplicates)))
+            deleted += len(duplicates)
+            last_id = rows[-1][0]
+    return deleted
+
+
+def upgrade():
+    connection = op.get_bind()
+    inspector = sa.inspect(connection)
+    if "url_key" not in {column["name"] for column in inspector.get_columns("news_articles")}:
+        op.add_column("news_articles", sa.Column("url_key", sa.String))
+
+    with op.get_context().autocommit_block():
+        deleted = backfill_url_keys(connection)
+        # Счетчики пересчитываются при следующем старте (таблица пуста)
+        if deleted and "stat_counters" in inspector.get_table_names():
+            with batch_transaction(connection):
+                connection.execute(sa.text("DELETE FROM stat_counters"))
+
+    create_index_online("ix_news_articles_url_key", "news_articles", ["url_key"], unique=True)
+
+
+def downgrade():
+    op.drop_index("ix_news_articles_url_key", table_name="news_articles")
+    with op.batch_alter_table("news_articles") as batch_op:
+        batch_op.drop_column("url_key")
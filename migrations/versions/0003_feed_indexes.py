@@ -0,0 +1,30 @@
+"""Индексы лент: активные новости по дате, по категории; предпочтения по пользователю
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 09:00:00
+"""
+from alembic import op
+
+from migrate import create_index_online
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # WHERE is_active ORDER BY published_at DESC, id DESC (ленты, курсорная пагинация)
+    create_index_online("ix_news_articles_active_published", "news_articles", ["is_active", "published_at", "id"])
+    create_index_online(
+        "ix_news_articles_category_active_published", "news_articles", ["category", "is_active", "published_at"]
+    )
+    create_index_online("ix_user_preferences_user_id", "user_preferences", ["user_id"])
+
+
+def downgrade():
+    op.drop_index("ix_user_preferences_user_id", table_name="user_preferences")
+    op.drop_index("ix_news_articles_category_active_published", table_name="news_articles")
+    op.drop_index("ix_news_articles_active_published", table_name="news_articles")
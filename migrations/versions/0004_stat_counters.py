@@ -0,0 +1,29 @@
+"""Таблица счетчиков (заполняется сверкой при старте приложения)
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 09:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if "stat_counters" in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        "stat_counters",
+        sa.Column("kind", sa.String, primary_key=True),
+        sa.Column("key", sa.String, primary_key=True),
+        sa.Column("count", sa.Integer, nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table("stat_counters")
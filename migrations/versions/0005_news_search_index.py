@@ -0,0 +1,75 @@
+"""Полнотекстовый индекс FTS5 по заголовку и описанию (только SQLite)
+
+Индекс заполняется один раз при создании, дальше его поддерживают триггеры.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 09:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+FTS_SCHEMA = [
+    # Внешний контент: в индексе только токены, тексты читаются из news_articles
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS news_fts USING fts5(
+        title, summary,
+        content='news_articles', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    # Индексируются только активные новости; мягкое удаление убирает строку из индекса.
+    # Поэтому команду 'rebuild' использовать нельзя — она проиндексирует и неактивные строки.
+    """
+    CREATE TRIGGER IF NOT EXISTS news_fts_ai AFTER INSERT ON news_articles
+    WHEN new.is_active
+    BEGIN
+        INSERT INTO news_fts(rowid, title, summary) VALUES (new.id, new.title, new.summary);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS news_fts_ad AFTER DELETE ON news_articles
+    WHEN old.is_active
+    BEGIN
+        INSERT INTO news_fts(news_fts, rowid, title, summary) VALUES ('delete', old.id, old.title, old.summary);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS news_fts_au AFTER UPDATE OF title, summary, is_active ON news_articles
+    BEGIN
+        INSERT INTO news_fts(news_fts, rowid, title, summary)
+            SELECT 'delete', old.id, old.title, old.summary WHERE old.is_active;
+        INSERT INTO news_fts(rowid, title, summary)
+            SELECT new.id, new.title, new.summary WHERE new.is_active;
+    END
+    """,
+]
+
+
+def upgrade():
+    connection = op.get_bind()
+    if connection.dialect.name != "sqlite":
+        return
+    created = "news_fts" not in sa.inspect(connection).get_table_names()
+    for statement in FTS_SCHEMA:
+        op.execute(statement)
+    if created:
+        op.execute(
+            "INSERT INTO news_fts(rowid, title, summary) "
+            "SELECT id, title, summary FROM news_articles WHERE is_active"
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for trigger in ("news_fts_ai", "news_fts_ad", "news_fts_au"):
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS news_fts")
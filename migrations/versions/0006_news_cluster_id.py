@@ -0,0 +1,35 @@
+"""cluster_id: сюжет статьи (id первой статьи о том же событии)
+
+Существующие статьи остаются без сюжета: колонка не заполняется, каждая
+такая статья считается отдельным сюжетом.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 12:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrate import create_index_online
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("news_articles")}
+    if "cluster_id" not in columns:
+        op.add_column("news_articles", sa.Column("cluster_id", sa.Integer))
+    create_index_online("ix_news_articles_cluster_id", "news_articles", ["cluster_id"])
+
+
+def downgrade():
+    op.drop_index("ix_news_articles_cluster_id", table_name="news_articles")
+    if op.get_bind().dialect.name == "sqlite":
+        # Без пересоздания таблицы (batch): оно удалило бы триггеры news_fts
+        op.execute("ALTER TABLE news_articles DROP COLUMN cluster_id")
+    else:
+        op.drop_column("news_articles", "cluster_id")
@@ -0,0 +1,39 @@
+"""Архив статей, вынесенных из news_articles политикой хранения
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 14:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if "news_archive" in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        "news_archive",
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=False),
+        sa.Column("title", sa.String, nullable=False),
+        sa.Column("summary", sa.Text),
+        sa.Column("url", sa.String, nullable=False),
+        sa.Column("url_key", sa.String),
+        sa.Column("source", sa.String, nullable=False),
+        sa.Column("category", sa.String),
+        sa.Column("published_at", sa.DateTime),
+        sa.Column("is_active", sa.Boolean),
+        sa.Column("created_at", sa.DateTime),
+        sa.Column("cluster_id", sa.Integer),
+        sa.Column("archived_at", sa.DateTime, nullable=False),
+    )
+    op.create_index("ix_news_archive_url_key", "news_archive", ["url_key"])
+
+
+def downgrade():
+    op.drop_table("news_archive")
@@ -0,0 +1,70 @@
+"""updated_at: время последнего изменения статьи для инкрементальной выгрузки
+
+Существующим статьям проставляется created_at (порциями по первичному ключу,
+каждая порция — своя короткая транзакция). В архиве колонка остается пустой
+для уже перенесенных статей.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 16:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrate import batch_transaction, create_index_online
+
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+news = sa.table(
+    "news_articles",
+    sa.column("id", sa.Integer),
+    sa.column("published_at", sa.DateTime),
+    sa.column("created_at", sa.DateTime),
+    sa.column("updated_at", sa.DateTime),
+)
+
+
+def backfill_updated_at(connection, batch_size: int = BATCH_SIZE):
+    last_id = 0
+    while True:
+        with batch_transaction(connection):
+            ids = connection.execute(
+                sa.select(news.c.id).where(news.c.id > last_id).order_by(news.c.id).limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                break
+            connection.execute(
+                sa.update(news)
+                .where(news.c.id.between(ids[0], ids[-1]), news.c.updated_at.is_(None))
+                .values(updated_at=sa.func.coalesce(news.c.created_at, news.c.published_at))
+            )
+            last_id = ids[-1]
+
+
+def _add_column(table: str):
+    if "updated_at" not in {column["name"] for column in sa.inspect(op.get_bind()).get_columns(table)}:
+        op.add_column(table, sa.Column("updated_at", sa.DateTime))
+
+
+def upgrade():
+    _add_column("news_articles")
+    _add_column("news_archive")
+    with op.get_context().autocommit_block():
+        backfill_updated_at(op.get_bind())
+    create_index_online("ix_news_articles_updated", "news_articles", ["updated_at", "id"])
+
+
+def downgrade():
+    op.drop_index("ix_news_articles_updated", table_name="news_articles")
+    for table in ("news_articles", "news_archive"):
+        if op.get_bind().dialect.name == "sqlite":
+            # Без пересоздания таблицы (batch): оно удалило бы триггеры news_fts
+            op.execute(f"ALTER TABLE {table} DROP COLUMN updated_at")
+        else:
+            op.drop_column(table, "updated_at")
@@ -0,0 +1,23 @@
+"""Индекс news_archive(archived_at, id): перенесенные в архив статьи в инкрементальной выгрузке
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17 18:00:00
+"""
+from alembic import op
+
+from migrate import create_index_online
+
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    create_index_online("ix_news_archive_archived_at", "news_archive", ["archived_at", "id"])
+
+
+def downgrade():
+    op.drop_index("ix_news_archive_archived_at", table_name="news_archive")
@@ -1,8 +1,33 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Index
+from sqlalchemy.orm import relationship, validates
 from datetime import datetime
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 from database import Base
 
+TRACKING_PARAMS = ("utm_", "yclid", "gclid", "fbclid")
+
+
+def normalize_url(url: str) -> str:
+    """Нормализованный URL для поиска дубликатов.
+
+    Схема и хост приводятся к нижнему регистру, отбрасываются фрагмент,
+    стандартный порт, завершающий слэш и трекинговые параметры запроса.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    if (scheme, netloc.rpartition(":")[2]) in (("http", "80"), ("https", "443")):
+        netloc = netloc.rpartition(":")[0]
+    if netloc.startswith("www."):
+        netloc = netloc[4:]
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith(TRACKING_PARAMS)
+    ))
+    return urlunsplit(("https" if scheme == "http" else scheme, netloc, path, query, ""))
+
+
 class User(Base):
     __tablename__ = "users"
     
@@ -15,22 +40,70 @@ class User(Base):
 
 class NewsArticle(Base):
     __tablename__ = "news_articles"
+    __table_args__ = (
+        # Ленты и курсорная пагинация: WHERE is_active ORDER BY published_at DESC, id DESC
+        Index("ix_news_articles_active_published", "is_active", "published_at", "id"),
+        Index("ix_news_articles_category_active_published", "category", "is_active", "published_at"),
+        # Инкрементальная выгрузка: WHERE updated_at >= ? ORDER BY updated_at, id
+        Index("ix_news_articles_updated", "updated_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
     summary = Column(Text)  
     url = Column(String, nullable=False)
+    url_key = Column(String, unique=True, index=True)
     source = Column(String, nullable=False)
     category = Column(String)
     published_at = Column(DateTime, default=datetime.utcnow)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Обновляется при любом UPDATE (в том числе пакетном через Core)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Сюжет — id первой статьи о том же событии (см. clustering.py)
+    cluster_id = Column(Integer, index=True)
+    
+    @validates("url")
+    def _update_url_key(self, key, url):
+        self.url_key = normalize_url(url)
+        return url
+
+class NewsArchive(Base):
+    """Статьи, вынесенные из news_articles политикой хранения (retention.py)"""
+    __tablename__ = "news_archive"
+    __table_args__ = (
+        # Удаления для инкрементальной выгрузки: WHERE archived_at >= ?
+        Index("ix_news_archive_archived_at", "archived_at", "id"),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    title = Column(String, nullable=False)
+    summary = Column(Text)
+    url = Column(String, nullable=False)
+    # Не уникален: после переноса та же ссылка может снова появиться в ленте
+    url_key = Column(String, index=True)
+    source = Column(String, nullable=False)
+    category = Column(String)
+    published_at = Column(DateTime)
+    is_active = Column(Boolean)
+    created_at = Column(DateTime)
+    cluster_id = Column(Integer)
+    updated_at = Column(DateTime)
+    archived_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+class StatCounter(Base):
+    """Поддерживаемые счетчики: активные новости по категориям и источникам, итоги"""
+    __tablename__ = "stat_counters"
+    
+    kind = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
 
 class UserPreference(Base):
     __tablename__ = "user_preferences"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     category = Column(String)
     keyword = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,178 @@
+"""HTML-страницы: готовые байты вместо рендеринга шаблона на каждый запрос.
+
+Статические шаблоны (главная, вход, регистрация, создание новости) не зависят
+от данных: они рендерятся один раз при старте и хранятся вместе со сжатыми
+вариантами (gzip, brotli — если установлен пакет brotli). Ответ выбирается по
+Accept-Encoding, у каждого варианта свой сильный ETag, If-None-Match дает 304.
+
+Страница новостей собирается из оболочки news.html, отрендеренной один раз, и
+фрагмента news_list.html с первой страницей статей. Фрагмент рендерится (и
+страница сжимается) один раз на версию данных: версии областей ALL и LIST
+берутся из кеша ответов, поэтому запись новостей сбрасывает и этот кеш.
+"""
+import asyncio
+import gzip
+import hashlib
+import logging
+import os
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.templating import Jinja2Templates
+from markupsafe import Markup
+from sqlalchemy import select
+
+from cache import ALL, LIST, response_cache
+from database import AsyncSessionLocal
+from models import NewsArticle
+from pagination import paginate_news_async
+from user_cache import TTLCache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = os.getenv("TEMPLATES_DIR", "templates")
+STATIC_TEMPLATES = ("index.html", "login.html", "register.html", "create_news.html")
+NEWS_PAGE_SIZE = 20
+NEWS_PAGE_CACHE_SIZE = int(os.getenv("NEWS_PAGE_CACHE_SIZE", "256"))
+# Статические страницы сжимаются один раз — можно максимально, страницы
+# новостей — на каждую версию данных
+STATIC_GZIP_LEVEL = 9
+DYNAMIC_GZIP_LEVEL = 6
+# Меньшие тела не сжимаются: заголовки и кадр gzip съедают выигрыш
+MIN_COMPRESS_SIZE = 1024
+
+# Место фрагмента в отрендеренной оболочке news.html
+NEWS_SLOT = "<!--news-container-->"
+
+templates = Jinja2Templates(directory=TEMPLATES_DIR)
+
+
+def accepted_encodings(header: str) -> Dict[str, float]:
+    accepted = {}
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.lower()] = quality
+    return accepted
+
+
+class RenderedPage:
+    """Тело страницы и его сжатые варианты со своими ETag"""
+
+    MEDIA_TYPE = "text/html"
+
+    def __init__(self, body: bytes, gzip_level: int = STATIC_GZIP_LEVEL):
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        self.variants: Dict[str, Tuple[bytes, str]] = {"identity": (body, f'"{digest}"')}
+        if len(body) >= MIN_COMPRESS_SIZE:
+            self.variants["gzip"] = (gzip.compress(body, gzip_level, mtime=0), f'"{digest}-gz"')
+            if brotli is not None:
+                self.variants["br"] = (brotli.compress(body, quality=11 if gzip_level == STATIC_GZIP_LEVEL else 5),
+                                       f'"{digest}-br"')
+
+    def _encoding(self, request: Request) -> str:
+        header = request.headers.get("accept-encoding")
+        if not header or len(self.variants) == 1:
+            return "identity"
+        accepted = accepted_encodings(header)
+        for encoding in ("br", "gzip"):
+            if encoding in self.variants and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+                return encoding
+        return "identity"
+
+    def respond(self, request: Request) -> Response:
+        encoding = self._encoding(request)
+        body, etag = self.variants[encoding]
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if len(self.variants) > 1:
+            headers["Vary"] = "Accept-Encoding"
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or etag in
+                              (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))):
+            return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type=self.MEDIA_TYPE, headers=headers)
+
+
+class PageRenderer:
+    """Статические страницы и страница новостей из закешированного фрагмента"""
+
+    def __init__(self, templates: Jinja2Templates = templates, session_factory=AsyncSessionLocal,
+                 cache_size: int = NEWS_PAGE_CACHE_SIZE):
+        self.templates = templates
+        self.session_factory = session_factory
+        self._static: Dict[str, RenderedPage] = {}
+        self._news_shell: Optional[Tuple[bytes, bytes]] = None
+        # "версии|курсор" -> страница; устаревшие версии больше не читаются и вытесняются LRU
+        self._news_pages = TTLCache(cache_size, None)
+        self._pending: Dict[str, asyncio.Future] = {}
+        self.renders = 0
+
+    def warm(self):
+        """Рендеринг статических страниц и оболочки новостей (при старте приложения)"""
+        for name in STATIC_TEMPLATES:
+            self.static_page(name)
+        self._shell()
+        logger.info("Страницы отрендерены", extra={"pages": len(self._static), "brotli": brotli is not None})
+
+    def static_page(self, name: str) -> RenderedPage:
+        page = self._static.get(name)
+        if page is None:
+            page = self._static[name] = RenderedPage(self.templates.get_template(name).render().encode())
+        return page
+
+    def _shell(self) -> Tuple[bytes, bytes]:
+        if self._news_shell is None:
+            html = self.templates.get_template("news.html").render(news_container=Markup(NEWS_SLOT))
+            prefix, suffix = html.split(NEWS_SLOT)
+            self._news_shell = (prefix.encode(), suffix.encode())
+        return self._news_shell
+
+    async def _render_news(self, key: Optional[str], cursor: Optional[str]) -> RenderedPage:
+        async with self.session_factory() as db_session:
+            news, next_cursor = await paginate_news_async(
+                db_session, select(NewsArticle).where(NewsArticle.is_active == True),
+                limit=NEWS_PAGE_SIZE, cursor=cursor,
+            )
+        fragment = self.templates.get_template("news_list.html").render(news=news, next_cursor=next_cursor)
+        prefix, suffix = self._shell()
+        page = RenderedPage(prefix + fragment.encode() + suffix, gzip_level=DYNAMIC_GZIP_LEVEL)
+        self.renders += 1
+        if key is not None:
+            self._news_pages.put(key, page)
+        return page
+
+    async def news_page(self, request: Request, cursor: Optional[str] = None) -> Response:
+        versions = response_cache.backend.get_versions([ALL, LIST])
+        # Версии недоступны (Redis) — страница строится без кеша
+        key = None if any(version < 0 for version in versions) else f"{'.'.join(map(str, versions))}|{cursor or ''}"
+        page = self._news_pages.get(key) if key is not None else None
+        if page is None and key is None:
+            page = await self._render_news(None, cursor)
+        elif page is None:
+            # Один рендеринг на версию: запросы, пришедшие после сброса одновременно, ждут его
+            task = self._pending.get(key)
+            if task is None:
+                task = self._pending[key] = asyncio.ensure_future(self._render_news(key, cursor))
+                task.add_done_callback(lambda _: self._pending.pop(key, None))
+            page = await asyncio.shield(task)
+        return page.respond(request)
+
+    def stats(self) -> dict:
+        return {"static_pages": len(self._static), "news_renders": self.renders, **self._news_pages.stats()}
+
+
+page_renderer = PageRenderer()
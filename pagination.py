@@ -0,0 +1,85 @@
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import NewsArticle
+
+CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_token(values: list) -> str:
+    """Непрозрачный курсор из списка JSON-совместимых значений"""
+    raw = json.dumps(values, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_token(cursor: str) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def encode_cursor(published_at: datetime, article_id: int) -> str:
+    """Курсор для позиции (published_at, id)"""
+    return encode_token([published_at.isoformat(), article_id])
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        published_at, article_id = decode_token(cursor)
+        return datetime.fromisoformat(published_at), int(article_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _page_query(query, limit: int, cursor: Optional[str]):
+    """Условие курсора, порядок и лимит для select()"""
+    if cursor:
+        published_at, article_id = decode_cursor(cursor)
+        query = query.filter(
+            tuple_(NewsArticle.published_at, NewsArticle.id) < tuple_(published_at, article_id)
+        )
+    return query.order_by(
+        NewsArticle.published_at.desc(), NewsArticle.id.desc()
+    ).limit(limit + 1)
+
+
+def _split_page(items: List[NewsArticle], limit: int) -> Tuple[List[NewsArticle], Optional[str]]:
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(last.published_at, last.id)
+    return items, next_cursor
+
+
+async def paginate_news_async(db: AsyncSession, statement: Select, limit: int,
+                              cursor: Optional[str] = None) -> Tuple[List[NewsArticle], Optional[str]]:
+    """Курсорная пагинация select(NewsArticle) в порядке (published_at DESC, id DESC).
+
+    Следующая страница начинается строго после последней строки предыдущей,
+    поэтому стоимость запроса не зависит от глубины страницы и использует
+    составные индексы по (…, published_at, id).
+    """
+    result = await db.execute(_page_query(statement, limit, cursor))
+    return _split_page(list(result.scalars()), limit)
+
+
+async def paginate_rows_async(db: AsyncSession, statement: Select, limit: int,
+                              cursor: Optional[str] = None) -> Tuple[list, Optional[str]]:
+    """То же для select() отдельных столбцов: строки Row вместо ORM-объектов.
+
+    Среди столбцов должны быть published_at и id — по ним строится курсор.
+    """
+    result = await db.execute(_page_query(statement, limit, cursor))
+    return _split_page(result.all(), limit)
@@ -1,13 +1,16 @@
-import aiohttp
 import asyncio
+import time
+from collections import Counter
 from sqlalchemy.orm import Session
 from datetime import datetime
+from typing import List
 import logging
-from bs4 import BeautifulSoup
-import random
-from models import NewsArticle
-import requests
-import feedparser
+import metrics
+from ingestion import bulk_ingest
+from datagen import generate_articles
+from classifier import default_classifier
+from fetcher import AsyncFeedFetcher, FetchResult
+from feed_state import FeedStateStore, get_feed_state_store
 
 logger = logging.getLogger(__name__)
 
@@ -29,163 +32,117 @@ class NewsParser:
     
     @staticmethod
     def generate_sample_news(db: Session, count: int = 10):
-        """Генерация тестовых новостей"""
-        sample_titles = [
-            "Важное политическое событие состоялось сегодня",
-            "Новые технологии меняют мир",
-            "Спортивные достижения поражают воображение",
-            "Культурные мероприятия привлекают тысячи зрителей",
-            "Научное открытие может изменить будущее",
-            "Экономические показатели демонстрируют рост",
-            "Международные отношения развиваются",
-            "Инновации в медицине спасают жизни",
-            "Образовательные реформы и их последствия",
-            "Экологические инициативы набирают популярность"
-        ]
-        
-        sample_summaries = [
-            "Это важное событие повлияет на будущее развитие региона.",
-            "Технологический прорыв открывает новые возможности для бизнеса.",
-            "Спортсмены установили новый рекорд в сложных условиях.",
-            "Культурное событие собрало участников со всего мира.",
-            "Ученые сделали открытие, которое может решить глобальные проблемы.",
-            "Экономический рост свидетельствует о восстановлении после кризиса.",
-            "Дипломатические усилия приносят свои плоды.",
-            "Медицинские исследования открывают новые методы лечения.",
-            "Реформы в образовании направлены на улучшение качества обучения.",
-            "Экологические проекты получают поддержку на международном уровне."
-        ]
-        
-        for i in range(count):
-            category = random.choice(NewsParser.CATEGORIES)
-            source = random.choice(NewsParser.SOURCES)
-            
-            existing = db.query(NewsArticle).filter(
-                NewsArticle.title == sample_titles[i]
-            ).first()
-            
-            if not existing:
-                article = NewsArticle(
-                    title=sample_titles[i],
-                    summary=sample_summaries[i],
-                    url=f"https://example.com/news/{i}",
-                    source=source,
-                    category=category,
-                    published_at=datetime.now()
-                )
-                db.add(article)
-        
-        db.commit()
-        logger.info(f"Generated {count} sample news articles")
+        """Генерация тестовых новостей (любое количество, URL не повторяются между вызовами)"""
+        result = bulk_ingest(db, generate_articles(count, days=1))
+        logger.info(f"Generated {result.inserted} sample news articles ({result.skipped} skipped)")
     
     @staticmethod
     def get_personalized_news(db: Session, user_id: int, limit: int = 20):
         """Получение персонализированных новостей на основе предпочтений пользователя"""
-        from models import UserPreference
-        
-        preferences = db.query(UserPreference).filter(UserPreference.user_id == user_id).all()
+        from ranking import feed_ranker
         
-        query = db.query(NewsArticle).filter(NewsArticle.is_active == True)
-        
-        if preferences:
-            categories = [pref.category for pref in preferences if pref.category]
-            if categories:
-                query = query.filter(NewsArticle.category.in_(categories))
-        
-        return query.order_by(NewsArticle.published_at.desc()).limit(limit).all()
+        return feed_ranker.get_feed(db, user_id, limit=limit)
     
     @staticmethod
     def get_news_categories(db: Session):
-        """Получение списка всех категорий"""
-        categories = db.query(NewsArticle.category).distinct().filter(
-            NewsArticle.category.isnot(None),
-            NewsArticle.is_active == True
-        ).all()
-        return [row[0] for row in categories if row[0]]
+        """Получение списка всех категорий (из таблицы счетчиков)"""
+        import stats
+        return [row["name"] for row in stats.get_counts(db, stats.CATEGORY)]
     
     @staticmethod
     def get_news_sources(db: Session):
-        """Получение списка всех источников"""
-        sources = db.query(NewsArticle.source).distinct().filter(NewsArticle.is_active == True).all()
-        return [row[0] for row in sources if row[0]]
+        """Получение списка всех источников (из таблицы счетчиков)"""
+        import stats
+        return [row["name"] for row in stats.get_counts(db, stats.SOURCE)]
 
 
 class RealNewsParser:
     """Реальный парсер новостей из RSS источников"""
     
+    RSS_SOURCES = [
+        {"url": "https://lenta.ru/rss/news", "source": "Lenta.ru", "category": "общее"},
+        {"url": "https://www.vedomosti.ru/rss/news", "source": "Ведомости", "category": "экономика"},
+        {"url": "https://www.kommersant.ru/RSS/news.xml", "source": "Коммерсантъ", "category": "политика"},
+        {"url": "https://tass.ru/rss/v2.xml", "source": "ТАСС", "category": "общее"},
+    ]
+    
     @staticmethod
-    def parse_real_rss_sources(db: Session):
-        """Парсинг реальных RSS лент"""
-        rss_sources = [
-            {"url": "https://lenta.ru/rss/news", "source": "Lenta.ru", "category": "общее"},
-            {"url": "https://www.vedomosti.ru/rss/news", "source": "Ведомости", "category": "экономика"},
-            {"url": "https://www.kommersant.ru/RSS/news.xml", "source": "Коммерсантъ", "category": "политика"},
-            {"url": "https://tass.ru/rss/v2.xml", "source": "ТАСС", "category": "общее"},
-        ]
+    async def fetch_rss_sources(sources: List[dict] = None,
+                                state_store: FeedStateStore = None) -> List[FetchResult]:
+        """Конкурентная условная загрузка и разбор RSS лент"""
+        state_store = state_store or get_feed_state_store()
+        async with AsyncFeedFetcher(state_store=state_store) as fetcher:
+            return await fetcher.fetch_all(sources or RealNewsParser.RSS_SOURCES)
+    
+    @staticmethod
+    def store_fetch_results(db: Session, results: List[FetchResult],
+                            state_store: FeedStateStore = None):
+        """Сохранение загруженных записей в базу и состояния лент на диск"""
+        candidates = []
+        loaded = {}
+        for result in results:
+            source = result.source
+            if result.error:
+                logger.error("Ошибка загрузки источника", extra={"source": source["source"], "error": result.error})
+                continue
+            if result.not_modified:
+                logger.info("Источник не изменился", extra={"source": source["source"]})
+                continue
+            
+            logger.info("Источник загружен", extra={
+                "source": source["source"], "entries": len(result.entries), "elapsed": round(result.elapsed, 3),
+            })
+            started = time.perf_counter()
+            for entry in result.entries:
+                summary_text = entry["summary"]
+                category, score = default_classifier.classify(f"{entry['title']} {summary_text or ''}")
+                candidates.append({
+                    "title": entry["title"][:200],
+                    "summary": summary_text[:500],
+                    "url": entry["link"],
+                    "source": source["source"],
+                    # Без ключевых слов категорию задает источник, а не классификатор по умолчанию
+                    "category": category if score > 0 else source["category"],
+                    "published_at": datetime.now(),
+                })
+            metrics.observe_stage(source["source"], "classify", time.perf_counter() - started)
+            loaded[source["source"]] = len(result.entries)
         
-        added_count = 0
-        for source in rss_sources:
-            try:
-                print(f"🔍 Парсинг источника: {source['source']}")
-                feed = feedparser.parse(source["url"])
-                
-                for entry in feed.entries[:5]:  
-                    if not db.query(NewsArticle).filter(NewsArticle.url == entry.link).first():
-                        
-                        summary_text = entry.summary if hasattr(entry, 'summary') else (entry.description if hasattr(entry, 'description') else entry.title)
-                        category = RealNewsParser.detect_category(entry.title, summary_text)
-                        
-                        article = NewsArticle(
-                            title=entry.title[:200], 
-                            summary=summary_text[:500],
-                            url=entry.link,
-                            source=source["source"],
-                            category=category or source["category"],
-                            published_at=datetime.now()
-                        )
-                        db.add(article)
-                        added_count += 1
-                        print(f"✅ Добавлена новость: {entry.title[:50]}...")
-                        
-            except Exception as e:
-                print(f"❌ Ошибка парсинга {source['source']}: {e}")
+        started = time.perf_counter()
+        ingest_result = bulk_ingest(db, candidates)
+        # Вставка общая для всех источников пакета; планировщик передает по одному
+        metrics.observe_stage(next(iter(loaded)) if len(loaded) == 1 else "all", "insert", time.perf_counter() - started)
+        added_count = ingest_result.inserted
+        inserted_by_source = Counter(row["source"] for row in ingest_result.inserted_rows)
+        for name, entries in loaded.items():
+            metrics.INGEST_ARTICLES.labels(name, "inserted").inc(inserted_by_source[name])
+            metrics.INGEST_ARTICLES.labels(name, "skipped").inc(entries - inserted_by_source[name])
+        state_store = state_store or get_feed_state_store()
+        for result in results:
+            state_store.record(result)
+        state_store.save()
         
-        db.commit()
-        print(f"🎉 Парсинг завершен. Добавлено {added_count} новостей")
+        logger.info("Парсинг завершен", extra={"inserted": added_count, "skipped": ingest_result.skipped})
         return added_count
     
+    @staticmethod
+    def parse_real_rss_sources(db: Session):
+        """Парсинг реальных RSS лент (синхронная обертка для скриптов)"""
+        results = asyncio.run(RealNewsParser.fetch_rss_sources())
+        return RealNewsParser.store_fetch_results(db, results)
+    
     @staticmethod
     def detect_category(title: str, summary: str) -> str:
         """Определение категории на основе содержимого"""
-        text = (title + " " + summary).lower()
-        
-        category_keywords = {
-            "технологии": ["ии", "искусственный интеллект", "программирование", "гаджет", "смартфон", "it", "цифровой", "технологи", "компьютер"],
-            "политика": ["путин", "правительство", "выборы", "парламент", "министр", "санкции", "международный", "политик", "государство"],
-            "экономика": ["рубль", "доллар", "биржа", "инфляция", "бизнес", "компания", "рынок", "экономика", "финанс", "банк", "инвестиц"],
-            "спорт": ["футбол", "хоккей", "чемпионат", "сборная", "матч", "игрок", "спорт", "соревнован", "олимпийск"],
-            "наука": ["исследование", "ученые", "открытие", "космос", "медицина", "наука", "изобретение", "лаборатор"],
-            "культура": ["кино", "фильм", "музыка", "концерт", "выставка", "театр", "культура", "искусство", "артист"]
-        }
-        
-        for category, keywords in category_keywords.items():
-            if any(keyword in text for keyword in keywords):
-                return category
-        
-        return "общее"
+        category, _ = default_classifier.classify(f"{title} {summary or ''}")
+        return category
 
     @staticmethod
-    def update_news_categories(db: Session):
-        """Обновление категорий для существующих новостей"""
-        articles = db.query(NewsArticle).filter(NewsArticle.category == None).all()
-        
-        updated_count = 0
-        for article in articles:
-            new_category = RealNewsParser.detect_category(article.title, article.summary)
-            if new_category:
-                article.category = new_category
-                updated_count += 1
-        
-        db.commit()
-        print(f"🔄 Обновлено категорий: {updated_count}")
-        return updated_count
\ No newline at end of file
+    def update_news_categories(db: Session, only_missing: bool = True):
+        """Обновление категорий для существующих новостей (синхронно, порциями)"""
+        from jobs import RecategorizationJob
+        progress = RecategorizationJob(only_missing=only_missing).run(db)
+        if progress.status == "failed":
+            raise RuntimeError(progress.error)
+        logger.info("Категории обновлены", extra={"updated": progress.updated})
+        return progress.updated
@@ -0,0 +1,391 @@
+"""Профилирование отдельных HTTP-запросов, медленные SQL-запросы и поиск N+1.
+
+Запрос профилируется, если у него заголовок X-Profile со значением PROFILE_TOKEN
+(без токена заголовок игнорируется) или он попал в выборку PROFILE_SAMPLE_RATE.
+Режим — PROFILE_MODE или заголовок X-Profile-Mode:
+
+- cprofile — детерминированный профиль потока цикла событий (в него попадают и
+  шаги параллельных запросов; синхронные обработчики в пуле потоков не видны);
+- sample — снимки стеков всех потоков раз в PROFILE_SAMPLE_INTERVAL секунд,
+  включая пул потоков; результат — свернутые стеки для flamegraph.pl/speedscope.
+
+Одновременно профилируется один запрос, остальные выполняются как обычно.
+Вместе с профилем сохраняются все SQL-запросы с длительностью, разбивка времени
+(SQL, bcrypt, шаблоны, сериализация) и повторяющиеся запросы — признак N+1.
+Номер профиля возвращается в заголовке X-Profile-Id; последние PROFILE_KEEP
+профилей доступны через /api/profiles с тем же заголовком X-Profile (без
+PROFILE_TOKEN — недоступны). Значения параметров SQL не сохраняются (в них
+бывают email и хеши паролей), только их типы.
+
+Независимо от профилирования запросы дольше SLOW_QUERY_MS пишутся в лог с
+планом (EXPLAIN QUERY PLAN для SQLite, EXPLAIN для PostgreSQL); план
+одного и того же запроса строится не чаще раза в SLOW_QUERY_EXPLAIN_INTERVAL
+секунд, в отдельном потоке. SQL-запросы видны через обработчики metrics.py,
+поэтому при METRICS_ENABLED=0 не собираются.
+"""
+import cProfile
+import hmac
+import io
+import itertools
+import logging
+import marshal
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from fastapi import Header, HTTPException
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_MODE = os.getenv("PROFILE_MODE", "cprofile")
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+# Один и тот же SQL (с любыми параметрами) столько раз за запрос — вероятный N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+SLOW_QUERY_EXPLAIN_INTERVAL = float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL", "600"))
+
+PROFILE_HEADER = b"x-profile"
+MODE_HEADER = b"x-profile-mode"
+MODES = ("cprofile", "sample")
+
+# Категории времени по файлам кода: шаблоны и сериализация оцениваются по профилю,
+# SQL и bcrypt измеряются напрямую (wall time)
+PROFILE_CATEGORIES = {
+    "templates": ("jinja2/",),
+    "serialization": ("pydantic/", "pydantic_core/", "fastapi/encoders.py", "/serialization.py", "orjson"),
+}
+# Кадры ожидания: поток с таким кадром на вершине стека простаивает
+IDLE_FILES = ("threading.py", "queue.py", "selectors.py")
+
+# Профиль текущего запроса: его видят и запросы из пула потоков (копия контекста)
+_current: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+_active = threading.Lock()
+
+
+@dataclass
+class RequestProfile:
+    id: int
+    method: str
+    path: str
+    mode: str
+    started_at: datetime = field(default_factory=datetime.now)
+    status: Optional[int] = None
+    duration: float = 0.0
+    # (statement, типы параметров, отпечаток значений, seconds); отпечаток —
+    # hash() со случайной солью процесса, только для подсчета различных значений
+    queries: List[tuple] = field(default_factory=list)
+    timings: Dict[str, float] = field(default_factory=dict)
+    data: bytes = b""
+    summary: str = ""
+
+    def n_plus_one(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> List[dict]:
+        """Повторяющиеся запросы: число выполнений, различных параметров и общее время"""
+        groups: Dict[str, list] = {}
+        for statement, _, fingerprint, seconds in self.queries:
+            groups.setdefault(statement, []).append((fingerprint, seconds))
+        return sorted(
+            ({
+                "statement": statement,
+                "count": len(calls),
+                "distinct_parameters": len({fingerprint for fingerprint, _ in calls}),
+                "seconds": round(sum(seconds for _, seconds in calls), 6),
+            } for statement, calls in groups.items() if len(calls) >= threshold),
+            key=lambda pattern: -pattern["count"],
+        )
+
+    def as_dict(self, detail: bool = False) -> dict:
+        result = {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "mode": self.mode,
+            "status": self.status,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(self.duration * 1000, 3),
+            "queries": len(self.queries),
+            "sql_ms": round(sum(query[-1] for query in self.queries) * 1000, 3),
+            "n_plus_one": len(self.n_plus_one()),
+        }
+        if detail:
+            result.update(
+                timings_ms={name: round(seconds * 1000, 3) for name, seconds in self.timings.items()},
+                n_plus_one=self.n_plus_one(),
+                sql=[{"statement": statement, "parameter_types": types, "ms": round(seconds * 1000, 3)}
+                     for statement, types, _, seconds in self.queries],
+                summary=self.summary,
+            )
+        return result
+
+
+class ProfileStore:
+    """Последние профили в памяти"""
+
+    def __init__(self, keep: int = PROFILE_KEEP):
+        self._profiles: deque = deque(maxlen=keep)
+        self._ids = itertools.count(1)
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    def add(self, profile: RequestProfile):
+        self._profiles.append(profile)
+
+    def get(self, profile_id: int) -> Optional[RequestProfile]:
+        return next((profile for profile in self._profiles if profile.id == profile_id), None)
+
+    def list(self) -> List[dict]:
+        return [profile.as_dict() for profile in reversed(self._profiles)]
+
+
+def add_time(category: str, seconds: float):
+    """Учет времени категории (например, ожидания bcrypt) в профиле текущего запроса"""
+    profile = _current.get()
+    if profile is not None:
+        profile.timings[category] = profile.timings.get(category, 0.0) + seconds
+
+
+def _category(filename: str) -> Optional[str]:
+    for category, patterns in PROFILE_CATEGORIES.items():
+        if any(pattern in filename for pattern in patterns):
+            return category
+    return None
+
+
+class StackSampler:
+    """Снимки стеков всех потоков (кроме своего и простаивающих) в отдельном потоке"""
+
+    def __init__(self, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own or frame.f_code.co_filename.endswith(IDLE_FILES):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    path = code.co_filename.replace(os.sep, "/")
+                    stack.append(f"{code.co_name} ({'/'.join(path.rsplit('/', 2)[-2:])}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def timings(self) -> Dict[str, float]:
+        """Оценка времени категорий по числу снимков, в которых встречается их код"""
+        result: Dict[str, float] = {}
+        for stack, count in self.stacks.items():
+            categories = {_category(frame) for frame in stack.split(";")} - {None}
+            for category in categories:
+                result[category] = result.get(category, 0.0) + count * self.interval
+        return result
+
+    def collapsed(self) -> bytes:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()).encode()
+
+    def summary(self, limit: int = 30) -> str:
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        return "\n".join(f"{count * 100 / total:5.1f}% {count:6} {frame}" for frame, count in leaves.most_common(limit))
+
+
+def profile_timings(stats: pstats.Stats) -> Dict[str, float]:
+    """Время категорий по cProfile: вызовы кода категории из кода вне ее (без двойного счета)"""
+    result: Dict[str, float] = {}
+    for (filename, _, _), (_, _, _, _, callers) in stats.stats.items():
+        category = _category(filename)
+        if category is None:
+            continue
+        for caller, (_, _, _, cumulative) in callers.items():
+            if _category(caller[0]) != category:
+                result[category] = result.get(category, 0.0) + cumulative
+    return result
+
+
+class ProfilingMiddleware:
+    """ASGI middleware: профиль запроса по заголовку X-Profile или выборке"""
+
+    def __init__(self, app, store: ProfileStore = None, token: str = PROFILE_TOKEN,
+                 sample_rate: float = PROFILE_SAMPLE_RATE, mode: str = PROFILE_MODE):
+        self.app = app
+        self.store = store or profile_store
+        self.token = token.encode()
+        self.sample_rate = sample_rate
+        self.mode = mode
+
+    def _requested_mode(self, scope) -> Optional[str]:
+        requested = mode = None
+        if self.token:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER:
+                    requested = hmac.compare_digest(value, self.token)
+                elif name == MODE_HEADER:
+                    mode = value.decode("latin-1")
+        if requested or (requested is None and self.sample_rate and random.random() < self.sample_rate):
+            return mode if mode in MODES else self.mode
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (self.token or self.sample_rate):
+            await self.app(scope, receive, send)
+            return
+        mode = self._requested_mode(scope)
+        if mode is None or scope["path"].startswith("/api/profiles") or not _active.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(id=self.store.next_id(), method=scope["method"], path=scope["path"], mode=mode)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", str(profile.id).encode())]
+            await send(message)
+
+        token = _current.set(profile)
+        try:
+            if mode == "sample":
+                sampler = StackSampler()
+                sampler.start()
+            else:
+                profiler = cProfile.Profile()
+                profiler.enable()
+            started = time.perf_counter()
+            try:
+                await self.app(scope, receive, send_with_id)
+            finally:
+                profile.duration = time.perf_counter() - started
+                if mode == "sample":
+                    sampler.stop()
+                    profile.timings.update(sampler.timings())
+                    profile.data = sampler.collapsed()
+                    profile.summary = sampler.summary()
+                else:
+                    profiler.disable()
+                    stream = io.StringIO()
+                    stats = pstats.Stats(profiler, stream=stream)
+                    profile.timings.update(profile_timings(stats))
+                    profile.data = marshal.dumps(stats.stats)
+                    stats.sort_stats("cumulative").print_stats(30)
+                    profile.summary = stream.getvalue()
+        finally:
+            _current.reset(token)
+            _active.release()
+            profile.timings["sql"] = sum(query[-1] for query in profile.queries)
+            profile.timings["total"] = profile.duration
+            self.store.add(profile)
+            patterns = profile.n_plus_one()
+            logger.info("Профиль запроса", extra={
+                "profile_id": profile.id, "path": profile.path, "mode": mode,
+                "duration_ms": round(profile.duration * 1000, 3), "queries": len(profile.queries),
+            })
+            for pattern in patterns:
+                logger.warning("Повторяющийся SQL-запрос (N+1)", extra={
+                    "profile_id": profile.id, "path": profile.path, **pattern,
+                })
+
+
+def explain(engine, statement: str, parameters) -> List[str]:
+    """План запроса; параметры — в формате DBAPI, как в событиях SQLAlchemy"""
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    with engine.connect() as connection:
+        return [str(row[-1]) for row in connection.exec_driver_sql(prefix + statement, parameters)]
+
+
+class SlowQueryLog:
+    """Запись в лог SQL-запросов дольше порога, с планом выполнения"""
+
+    EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+    MAX_TRACKED = 1000
+
+    def __init__(self, threshold_ms: float = SLOW_QUERY_MS, interval: float = SLOW_QUERY_EXPLAIN_INTERVAL,
+                 engine=None):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval
+        self.engine = engine
+        self._explained: Dict[str, float] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def report(self, statement: str, parameters, executemany: bool, seconds: float):
+        entry = {"duration_ms": round(seconds * 1000, 3), "statement": statement[:2000]}
+        now = time.monotonic()
+        last = self._explained.get(statement)
+        if not statement.lstrip()[:6].upper().startswith(self.EXPLAINABLE) or (
+                last is not None and now - last < self.interval):
+            logger.warning("Медленный SQL-запрос", extra=entry)
+            return
+        if len(self._explained) >= self.MAX_TRACKED:
+            self._explained.clear()
+        self._explained[statement] = now
+        if executemany:
+            parameters = parameters[0] if parameters else ()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="explain")
+        # План строится на отдельном соединении, чтобы не задерживать сам запрос
+        self._executor.submit(self._explain, entry, statement, parameters)
+
+    def _explain(self, entry: dict, statement: str, parameters):
+        if self.engine is None:
+            from database import engine
+            self.engine = engine
+        try:
+            entry["plan"] = explain(self.engine, statement, parameters)
+        except Exception as e:
+            entry["plan_error"] = str(e)
+        logger.warning("Медленный SQL-запрос", extra=entry)
+
+
+def parameter_types(parameters, executemany: bool = False) -> str:
+    """Типы параметров без значений: "(int, str)", для executemany — "50 x (int, str)" """
+    rows = parameters if executemany else [parameters]
+    first = rows[0] if rows else ()
+    if isinstance(first, dict):
+        shape = "{" + ", ".join(f"{name}: {type(value).__name__}" for name, value in first.items()) + "}"
+    else:
+        shape = "(" + ", ".join(type(value).__name__ for value in first or ()) + ")"
+    return f"{len(rows)} x {shape}" if executemany else shape
+
+
+def require_profile_token(x_profile: Optional[str] = Header(None)):
+    """Зависимость эндпоинтов /api/profiles: профили доступны только с PROFILE_TOKEN"""
+    if not PROFILE_TOKEN or x_profile is None or not hmac.compare_digest(x_profile.encode(), PROFILE_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Profiling token required")
+
+
+def _observe_query(statement: str, parameters, executemany: bool, seconds: float):
+    profile = _current.get()
+    if profile is not None:
+        profile.queries.append((statement, parameter_types(parameters, executemany), hash(repr(parameters)), seconds))
+    if seconds >= slow_query_log.threshold:
+        slow_query_log.report(statement, parameters, executemany, seconds)
+
+
+profile_store = ProfileStore()
+slow_query_log = SlowQueryLog()
+metrics.add_query_observer(_observe_query)
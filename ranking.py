@@ -0,0 +1,241 @@
+import bisect
+import logging
+import math
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from ingestion import add_listener
+from models import NewsArticle, UserPreference
+from search import build_match_query, search_supported, stem
+
+logger = logging.getLogger(__name__)
+
+ARTICLE_FIELDS = (
+    "id", "title", "summary", "source", "category", "url", "published_at", "is_active", "created_at", "cluster_id",
+)
+
+
+def article_to_dict(article) -> dict:
+    """Снимок статьи для кеша ленты (ORM-объект или словарь)"""
+    if isinstance(article, dict):
+        return {name: article.get(name) for name in ARTICLE_FIELDS}
+    return {name: getattr(article, name) for name in ARTICLE_FIELDS}
+
+
+@dataclass
+class UserProfile:
+    """Предпочтения пользователя в виде, удобном для оценки статей"""
+    categories: frozenset = frozenset()
+    keywords: Tuple[str, ...] = ()
+    _keyword_pattern: Optional[re.Pattern] = field(default=None, repr=False)
+
+    def __post_init__(self):
+        stems = sorted({stem(keyword.lower().replace("ё", "е")) for keyword in self.keywords if keyword}, key=len, reverse=True)
+        if stems:
+            self._keyword_pattern = re.compile(r"(?<!\w)(?:" + "|".join(map(re.escape, stems)) + ")")
+
+    @property
+    def empty(self) -> bool:
+        return not self.categories and not self.keywords
+
+    def _keyword_hits(self, value: Optional[str]) -> int:
+        if not value or self._keyword_pattern is None:
+            return 0
+        return len(set(self._keyword_pattern.findall(value.lower().replace("ё", "е"))))
+
+    def relevance(self, article: dict) -> float:
+        """Релевантность без учета свежести"""
+        score = FeedRanker.BASE_RELEVANCE
+        if article["category"] in self.categories:
+            score += FeedRanker.CATEGORY_WEIGHT
+        score += FeedRanker.TITLE_KEYWORD_WEIGHT * self._keyword_hits(article["title"])
+        score += FeedRanker.SUMMARY_KEYWORD_WEIGHT * self._keyword_hits(article["summary"])
+        return score
+
+
+@dataclass
+class UserFeed:
+    """Предрассчитанная лента: отсортированные ключи и снимки статей.
+
+    depleted — из ленты удалялись статьи, и на их места могли претендовать
+    кандидаты, не попавшие в нее при расчете.
+    """
+    profile: UserProfile
+    entries: List[Tuple[float, int]] = field(default_factory=list)
+    articles: Dict[int, dict] = field(default_factory=dict)
+    built_at: datetime = field(default_factory=datetime.now)
+    depleted: bool = False
+
+
+class FeedRanker:
+    """Персональные ленты с учетом категорий, ключевых слов и свежести.
+
+    Оценка статьи — relevance * exp(-λ * возраст). Множитель свежести одинаков
+    для всех статей в момент запроса, поэтому порядок задается не зависящим от
+    времени ключом log(relevance) + λ * published_at. Благодаря этому ленты
+    можно рассчитать заранее и дополнять новыми статьями без пересчета.
+
+    Кандидаты берутся из индексов свежести по категориям пользователя, из
+    полнотекстового индекса по его ключевым словам и из общей ленты — без
+    полного просмотра таблицы.
+    """
+
+    BASE_RELEVANCE = 0.1
+    CATEGORY_WEIGHT = 1.0
+    TITLE_KEYWORD_WEIGHT = 1.0
+    SUMMARY_KEYWORD_WEIGHT = 0.5
+    HALF_LIFE_HOURS = 12.0
+    FEED_SIZE = 200
+    CANDIDATES_PER_SOURCE = 200
+    MAX_USERS = 10000
+
+    def __init__(self, feed_size: int = FEED_SIZE, max_users: int = MAX_USERS):
+        self.feed_size = feed_size
+        self.max_users = max_users
+        self.decay_rate = math.log(2) / (self.HALF_LIFE_HOURS * 3600)
+        self._feeds: "OrderedDict[int, UserFeed]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    # ------------------------------------------------------------------
+    #                     Оценка и кандидаты
+    # ------------------------------------------------------------------
+
+    def rank_key(self, profile: UserProfile, article: dict) -> float:
+        published_at = article["published_at"] or article["created_at"] or datetime.now()
+        return math.log(profile.relevance(article)) + self.decay_rate * published_at.timestamp()
+
+    @staticmethod
+    def load_profile(db: Session, user_id: int) -> UserProfile:
+        preferences = db.query(UserPreference.category, UserPreference.keyword).filter(
+            UserPreference.user_id == user_id
+        ).all()
+        return UserProfile(
+            categories=frozenset(category for category, _ in preferences if category),
+            keywords=tuple(keyword for _, keyword in preferences if keyword),
+        )
+
+    def _candidates(self, db: Session, profile: UserProfile) -> Iterable[dict]:
+        limit = self.CANDIDATES_PER_SOURCE
+        columns = select(*(getattr(NewsArticle, name) for name in ARTICLE_FIELDS))
+        active = columns.where(NewsArticle.is_active == True)
+        recent = (NewsArticle.published_at.desc(), NewsArticle.id.desc())
+
+        queries = [active.order_by(*recent).limit(limit)]
+        queries += [
+            active.where(NewsArticle.category == category).order_by(*recent).limit(limit)
+            for category in profile.categories
+        ]
+        if profile.keywords and search_supported(db):
+            match = " OR ".join(filter(None, (build_match_query(keyword) for keyword in profile.keywords)))
+            if match:
+                ids = [row[0] for row in db.execute(
+                    text("SELECT rowid FROM news_fts WHERE news_fts MATCH :match ORDER BY rowid DESC LIMIT :limit"),
+                    {"match": match, "limit": limit},
+                )]
+                if ids:
+                    # В FTS индексе только активные статьи; без условия is_active
+                    # SQLite выбирает строки по первичному ключу
+                    queries.append(columns.where(NewsArticle.id.in_(ids)))
+
+        candidates = {}
+        for query in queries:
+            for row in db.execute(query).all():
+                if row[0] not in candidates:
+                    candidates[row[0]] = dict(zip(ARTICLE_FIELDS, row))
+        return candidates.values()
+
+    # ------------------------------------------------------------------
+    #                     Кеш лент
+    # ------------------------------------------------------------------
+
+    def _insert(self, feed: UserFeed, article: dict):
+        entry = (-self.rank_key(feed.profile, article), article["id"])
+        if len(feed.entries) >= self.feed_size and entry >= feed.entries[-1]:
+            return
+        bisect.insort(feed.entries, entry)
+        feed.articles[article["id"]] = article
+        if len(feed.entries) > self.feed_size:
+            _, dropped_id = feed.entries.pop()
+            feed.articles.pop(dropped_id, None)
+
+    def build(self, db: Session, user_id: int) -> UserFeed:
+        profile = self.load_profile(db, user_id)
+        feed = UserFeed(profile=profile)
+        for article in self._candidates(db, profile):
+            self._insert(feed, article)
+        with self._lock:
+            self._feeds[user_id] = feed
+            self._feeds.move_to_end(user_id)
+            while len(self._feeds) > self.max_users:
+                self._feeds.popitem(last=False)
+        return feed
+
+    def get_feed(self, db: Session, user_id: int, limit: int = 20, skip: int = 0) -> List[dict]:
+        """Страница ленты пользователя.
+
+        Лента строится при первом обращении и перестраивается, если после
+        удаления статей в ней не хватает записей для запрошенной страницы.
+        """
+        with self._lock:
+            feed = self._feeds.get(user_id)
+            if feed is not None and not (feed.depleted and len(feed.entries) < skip + limit):
+                self._feeds.move_to_end(user_id)
+                return [feed.articles[article_id] for _, article_id in feed.entries[skip:skip + limit]]
+        feed = self.build(db, user_id)
+        return [feed.articles[article_id] for _, article_id in feed.entries[skip:skip + limit]]
+
+    def warm(self, db: Session, limit: int = MAX_USERS):
+        """Предварительный расчет лент пользователей с предпочтениями"""
+        user_ids = [row[0] for row in db.query(UserPreference.user_id).distinct().limit(limit)]
+        for user_id in user_ids:
+            self.build(db, user_id)
+        logger.info(f"Рассчитаны ленты {len(user_ids)} пользователей")
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            self._feeds.pop(user_id, None)
+
+    def clear(self):
+        """Сброс всех лент, например после массовой смены категорий"""
+        with self._lock:
+            self._feeds.clear()
+
+    def on_articles_added(self, articles: List[dict]):
+        """Добавление новых статей во все рассчитанные ленты"""
+        snapshots = [snapshot for snapshot in map(article_to_dict, articles) if snapshot["is_active"] is not False]
+        with self._lock:
+            for feed in self._feeds.values():
+                for article in snapshots:
+                    self._insert(feed, article)
+
+    def on_article_removed(self, article_id: int):
+        """Удаление статьи из лент; освободившиеся места заполнятся при следующем запросе"""
+        self.on_articles_removed([article_id])
+
+    def on_articles_removed(self, article_ids: Iterable[int]):
+        removed = set(article_ids)
+        with self._lock:
+            for feed in self._feeds.values():
+                found = removed.intersection(feed.articles)
+                if found:
+                    for article_id in found:
+                        del feed.articles[article_id]
+                    feed.entries = [entry for entry in feed.entries if entry[1] not in found]
+                    feed.depleted = True
+
+    def on_article_changed(self, article):
+        snapshot = article_to_dict(article)
+        self.on_article_removed(snapshot["id"])
+        if snapshot["is_active"]:
+            self.on_articles_added([snapshot])
+
+
+feed_ranker = FeedRanker()
+add_listener(feed_ranker.on_articles_added)
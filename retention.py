@@ -0,0 +1,248 @@
+"""Хранение новостей: перенос устаревших статей в архив и уплотнение базы.
+
+Политики:
+  * мягко удаленные статьи, удаленные больше RETENTION_INACTIVE_DAYS назад
+    (время удаления — updated_at);
+  * активные статьи с published_at старше RETENTION_DAYS;
+  * активные статьи сверх RETENTION_MAX_ROWS — начиная с самых старых.
+
+По умолчанию включена только первая: две другие убирают из выдачи живые
+статьи и включаются явно, когда срок хранения определен.
+
+Статьи переносятся в news_archive порциями по RETENTION_BATCH_SIZE, каждая
+порция — отдельная короткая транзакция (DELETE ... RETURNING, вставка в
+архив, счетчики). Таблица news_articles поэтому остается ограниченной по
+размеру, а архивная статья по-прежнему доступна по id.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+import stats
+from cache import ALL, response_cache
+from clustering import story_clusterer
+from database import SessionLocal, engine
+from models import NewsArchive, NewsArticle
+from ranking import feed_ranker
+
+logger = logging.getLogger(__name__)
+
+# Срок хранения в днях (0 — политика выключена)
+RETENTION_DAYS = float(os.getenv("RETENTION_DAYS", "0"))
+RETENTION_INACTIVE_DAYS = float(os.getenv("RETENTION_INACTIVE_DAYS", "7"))
+# Максимум активных статей в news_articles (0 — без ограничения)
+RETENTION_MAX_ROWS = int(os.getenv("RETENTION_MAX_ROWS", "0"))
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "1000"))
+# Период запуска, секунды (0 — только вручную через POST /api/retention/run)
+RETENTION_INTERVAL = float(os.getenv("RETENTION_INTERVAL", "3600"))
+# Страниц за один PRAGMA incremental_vacuum (между порциями пишут другие соединения)
+RETENTION_VACUUM_PAGES = int(os.getenv("RETENTION_VACUUM_PAGES", "2000"))
+
+INACTIVE = "inactive"
+AGED = "aged"
+OVERFLOW = "overflow"
+
+TABLE = NewsArticle.__table__
+
+
+def _as_utc(value: datetime) -> datetime:
+    # updated_at хранится в UTC без часового пояса, published_at — как в ленте
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def archive_batch(db: Session, conditions: list, limit: int) -> Tuple[list, Dict[int, int]]:
+    """Перенос до limit самых старых статей, подходящих под условия.
+
+    Возвращает перенесенные строки и новые первые статьи сюжетов
+    ({старый id сюжета: новый}). Изменения фиксируются здесь же.
+    """
+    # Последняя по id статья не переносится: SQLite выдает новой строке
+    # max(id) + 1, и id удаленной последней строки достался бы новой статье
+    newest = select(func.max(TABLE.c.id)).scalar_subquery()
+    ids = (
+        select(TABLE.c.id)
+        .where(*conditions, TABLE.c.id < newest)
+        .order_by(TABLE.c.published_at, TABLE.c.id)
+        .limit(limit)
+    )
+    rows = db.execute(delete(TABLE).where(TABLE.c.id.in_(ids)).returning(*TABLE.c)).all()
+    if not rows:
+        db.rollback()
+        return rows, {}
+    db.execute(insert(NewsArchive), [row._asdict() for row in rows])
+    deltas = stats.Deltas()
+    for row in rows:
+        if row.is_active:
+            stats.count_article(deltas, row.category, row.source, -1)
+    stats.apply_deltas(db.connection(), deltas)
+    new_heads = story_clusterer.promote_heads(db, [row.id for row in rows if row.cluster_id == row.id])
+    db.commit()
+    return rows, new_heads
+
+
+def compact(bind=engine, pages: int = RETENTION_VACUUM_PAGES) -> int:
+    """Возврат освободившегося места и обновление статистики планировщика.
+
+    SQLite: PRAGMA incremental_vacuum порциями по pages страниц (для баз с
+    auto_vacuum=INCREMENTAL, иначе свободные страницы переиспользуются новыми
+    строками) и PRAGMA optimize, который выполняет ANALYZE только там, где он
+    нужен. PostgreSQL: VACUUM (ANALYZE). Возвращает число освобожденных страниц.
+    """
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        if connection.dialect.name == "postgresql":
+            for table in (NewsArticle.__tablename__, NewsArchive.__tablename__):
+                connection.exec_driver_sql(f"VACUUM (ANALYZE) {table}")
+            return 0
+        if connection.dialect.name != "sqlite":
+            return 0
+        freed = 0
+        if connection.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 2:
+            free = connection.exec_driver_sql("PRAGMA freelist_count").scalar()
+            while free:
+                # Каждый шаг выполнения освобождает одну страницу, а execute() модуля
+                # sqlite3 делает только первый шаг; executescript выполняет команду целиком
+                connection.connection.driver_connection.executescript(f"PRAGMA incremental_vacuum({pages})")
+                remaining = connection.exec_driver_sql("PRAGMA freelist_count").scalar()
+                if remaining >= free:
+                    break
+                freed += free - remaining
+                free = remaining
+        connection.exec_driver_sql("PRAGMA optimize")
+        return freed
+
+
+class RetentionManager:
+    """Периодический перенос статей в архив по политикам хранения.
+
+    После каждой порции перенесенные статьи убираются из лент и индекса
+    сюжетов; кеш ответов сбрасывается один раз за запуск, если из выдачи
+    ушли активные статьи.
+    """
+
+    def __init__(self, session_factory=SessionLocal, interval: float = RETENTION_INTERVAL,
+                 days: float = RETENTION_DAYS, inactive_days: float = RETENTION_INACTIVE_DAYS,
+                 max_rows: int = RETENTION_MAX_ROWS, batch_size: int = RETENTION_BATCH_SIZE, bind=engine):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.days = days
+        self.inactive_days = inactive_days
+        self.max_rows = max_rows
+        self.batch_size = batch_size
+        self.bind = bind
+        self.runs = 0
+        self.last_run_at: Optional[datetime] = None
+        self.last_duration: Optional[float] = None
+        self.last_archived: Optional[dict] = None
+        self.last_freed_pages: Optional[int] = None
+        self.last_error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+
+    def _drain(self, db: Session, conditions: list, limit: Optional[int] = None) -> Tuple[int, int, bool]:
+        """Перенос порциями; (перенесено, из них активных, менялись ли сюжеты)"""
+        moved = active = 0
+        clusters_changed = False
+        while limit is None or moved < limit:
+            size = self.batch_size if limit is None else min(self.batch_size, limit - moved)
+            rows, new_heads = archive_batch(db, conditions, size)
+            if rows:
+                article_ids = [row.id for row in rows]
+                feed_ranker.on_articles_removed(article_ids)
+                story_clusterer.on_articles_removed(article_ids, new_heads)
+            moved += len(rows)
+            active += sum(1 for row in rows if row.is_active)
+            clusters_changed = clusters_changed or bool(new_heads)
+            if len(rows) < size:
+                break
+        return moved, active, clusters_changed
+
+    def _apply(self, now: datetime) -> Tuple[Counter, bool]:
+        archived = Counter()
+        changed = False
+        is_active = TABLE.c.is_active
+        with self.session_factory() as db:
+            policies: List[Tuple[str, list]] = []
+            if self.inactive_days > 0:
+                # Возраст считается от удаления: старая статья, удаленная сегодня,
+                # остается в таблице еще inactive_days
+                cutoff = _as_utc(now) - timedelta(days=self.inactive_days)
+                policies.append((INACTIVE, [is_active == False, TABLE.c.updated_at < cutoff]))
+            if self.days > 0:
+                policies.append((AGED, [is_active == True, TABLE.c.published_at < now - timedelta(days=self.days)]))
+            for name, conditions in policies:
+                moved, active, clusters_changed = self._drain(db, conditions)
+                archived[name] += moved
+                changed = changed or active > 0 or clusters_changed
+            if self.max_rows > 0:
+                excess = stats.get_totals(db)["news_count"] - self.max_rows
+                if excess > 0:
+                    moved, _, _ = self._drain(db, [is_active == True], limit=excess)
+                    archived[OVERFLOW] += moved
+                    changed = changed or moved > 0
+        return archived, changed
+
+    def run_once(self, now: Optional[datetime] = None) -> dict:
+        """Один проход всех политик; now — момент, от которого отсчитывается возраст"""
+        with self._lock:
+            started = time.perf_counter()
+            try:
+                archived, changed = self._apply(now or datetime.now())
+                if changed:
+                    response_cache.invalidate(ALL)
+                freed = compact(self.bind) if sum(archived.values()) else 0
+            except Exception as e:
+                self.last_error = str(e)
+                raise
+            self.runs += 1
+            self.last_run_at = datetime.now()
+            self.last_duration = time.perf_counter() - started
+            self.last_archived = {name: archived[name] for name in (INACTIVE, AGED, OVERFLOW)}
+            self.last_freed_pages = freed
+            self.last_error = None
+        if sum(archived.values()):
+            logger.info(f"Перенесено в архив: {self.last_archived}, освобождено страниц: {freed}")
+        return self.status()
+
+    async def start(self):
+        if self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await run_in_threadpool(self.run_once)
+            except Exception:
+                logger.exception("Ошибка переноса статей в архив")
+
+    def status(self) -> dict:
+        return {
+            "interval": self.interval,
+            "days": self.days,
+            "inactive_days": self.inactive_days,
+            "max_rows": self.max_rows,
+            "runs": self.runs,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            "last_duration": round(self.last_duration, 3) if self.last_duration is not None else None,
+            "last_archived": self.last_archived,
+            "last_freed_pages": self.last_freed_pages,
+            "last_error": self.last_error,
+        }
+
+
+retention_manager = RetentionManager()
@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from database import SessionLocal
+from feed_state import get_feed_state_store
+from fetcher import AsyncFeedFetcher
+
+logger = logging.getLogger(__name__)
+
+# Опрос внешних лент при старте приложения включается явно (в развертывании):
+# иначе его запускали бы тесты и скрипты, импортирующие main
+INGEST_SCHEDULER_ENABLED = os.getenv("INGEST_SCHEDULER_ENABLED", "0") == "1"
+
+
+@dataclass
+class SourceSchedule:
+    """Расписание опроса одного источника"""
+    source: dict
+    interval: float
+    next_run: float = 0.0
+    next_run_at: Optional[datetime] = None
+    last_run_at: Optional[datetime] = None
+    last_latency: Optional[float] = None
+    last_new_items: Optional[int] = None
+    last_error: Optional[str] = None
+    runs: int = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "source": self.source["source"],
+            "url": self.source["url"],
+            "interval": round(self.interval, 1),
+            "next_run_at": self.next_run_at.isoformat() if self.next_run_at else None,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            "last_latency": round(self.last_latency, 3) if self.last_latency is not None else None,
+            "last_new_items": self.last_new_items,
+            "last_error": self.last_error,
+            "runs": self.runs,
+        }
+
+
+class IngestionScheduler:
+    """Фоновый опрос RSS источников с адаптивным интервалом.
+
+    Каждый источник опрашивается в своей задаче. Если лента приносит много
+    новых записей, интервал сокращается, если ничего нового — растет.
+    К интервалу добавляется случайный разброс, чтобы источники не
+    опрашивались синхронно; общее число одновременных загрузок ограничено.
+    """
+
+    DEFAULT_INTERVAL = 300.0
+    MIN_INTERVAL = 60.0
+    MAX_INTERVAL = 3600.0
+    BACKOFF_FACTOR = 1.5
+    SPEEDUP_FACTOR = 0.5
+    JITTER = 0.1
+    MAX_CONCURRENCY = 4
+    # Лента считается «активной», если за опрос принесла хотя бы столько новых записей
+    BUSY_ITEMS = max(1, AsyncFeedFetcher.ENTRIES_LIMIT // 2)
+
+    def __init__(self, sources: List[dict], session_factory=SessionLocal,
+                 interval: float = DEFAULT_INTERVAL, max_concurrency: int = MAX_CONCURRENCY):
+        self.session_factory = session_factory
+        self.schedules = [SourceSchedule(source=source, interval=interval) for source in sources]
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._fetcher: Optional[AsyncFeedFetcher] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        self._fetcher = AsyncFeedFetcher(state_store=get_feed_state_store())
+        await self._fetcher.__aenter__()
+        for schedule in self.schedules:
+            # Первый опрос разносится по времени, чтобы не стартовать все источники разом
+            self._plan(schedule, random.uniform(0, self.JITTER * schedule.interval))
+            self._tasks.append(asyncio.create_task(self._run(schedule)))
+        logger.info(f"Планировщик запущен для {len(self.schedules)} источников")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        if self._fetcher is not None:
+            await self._fetcher.__aexit__(None, None, None)
+            self._fetcher = None
+
+    def status(self) -> List[dict]:
+        return [schedule.as_dict() for schedule in self.schedules]
+
+    def _plan(self, schedule: SourceSchedule, delay: float):
+        schedule.next_run = time.monotonic() + delay
+        schedule.next_run_at = datetime.now() + timedelta(seconds=delay)
+
+    def _adapt(self, schedule: SourceSchedule, new_items: int):
+        """Пересчет интервала по числу новых записей (ошибка считается пустым опросом)"""
+        if new_items >= self.BUSY_ITEMS:
+            schedule.interval *= self.SPEEDUP_FACTOR
+        elif new_items == 0:
+            schedule.interval *= self.BACKOFF_FACTOR
+        schedule.interval = min(self.MAX_INTERVAL, max(self.MIN_INTERVAL, schedule.interval))
+
+    def _store(self, result) -> int:
+        from parser import RealNewsParser
+        db = self.session_factory()
+        try:
+            return RealNewsParser.store_fetch_results(db, [result])
+        finally:
+            db.close()
+
+    async def _poll(self, schedule: SourceSchedule):
+        async with self._semaphore:
+            started = time.perf_counter()
+            result = await self._fetcher.fetch_and_parse(schedule.source)
+            new_items = await run_in_threadpool(self._store, result)
+            schedule.last_latency = time.perf_counter() - started
+        schedule.last_run_at = datetime.now()
+        schedule.last_error = result.error
+        schedule.runs += 1
+        if result.error is None:
+            schedule.last_new_items = new_items
+        self._adapt(schedule, new_items)
+
+    async def _run(self, schedule: SourceSchedule):
+        while True:
+            await asyncio.sleep(max(0.0, schedule.next_run - time.monotonic()))
+            try:
+                await self._poll(schedule)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                schedule.last_error = str(e)
+                logger.exception(f"Ошибка опроса {schedule.source['source']}")
+            jitter = random.uniform(-self.JITTER, self.JITTER) * schedule.interval
+            self._plan(schedule, schedule.interval + jitter)
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional, List
+from typing import Annotated, Literal, Optional, List, Union
 
 class UserBase(BaseModel):
     email: str
@@ -44,6 +44,60 @@ class NewsArticle(NewsArticleBase):
     id: int
     is_active: bool
     created_at: datetime
+    cluster_id: Optional[int] = None
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class NewsBulkCreate(BaseModel):
+    op: Literal["create"]
+    data: NewsArticleCreate
+
+class NewsBulkUpdate(BaseModel):
+    op: Literal["update"]
+    id: int
+    data: NewsArticleUpdate
+
+class NewsBulkDelete(BaseModel):
+    op: Literal["delete"]
+    id: int
+
+NewsBulkOperation = Annotated[Union[NewsBulkCreate, NewsBulkUpdate, NewsBulkDelete], Field(discriminator="op")]
+
+class NewsBulkItemResult(BaseModel):
+    index: int
+    op: Optional[str] = None
+    id: Optional[int] = None
+    status: str  # created, updated, deleted, failed, rolled_back
+    error: Optional[str] = None
+
+class NewsBulkResult(BaseModel):
+    atomic: bool
+    committed: bool
+    applied: int
+    failed: int
+    # Номер первой необработанной операции, если их больше BULK_MAX_OPERATIONS
+    truncated_at: Optional[int] = None
+    results: List[NewsBulkItemResult]
+
+class NewsArchiveItem(NewsArticle):
+    archived_at: datetime
+
+class NewsSearchResult(NewsArticle):
+    snippet: str
+    score: float
+
+class NewsCounter(BaseModel):
+    name: str
+    count: int
+
+class UserPreferenceCreate(BaseModel):
+    category: Optional[str] = None
+    keyword: Optional[str] = None
+
+class UserPreference(UserPreferenceCreate):
+    id: int
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
@@ -0,0 +1,103 @@
+import logging
+import re
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import Boolean, DateTime, Float, text
+from sqlalchemy.orm import Session
+
+from pagination import decode_token, encode_token
+
+logger = logging.getLogger(__name__)
+
+# Окончания, отбрасываемые при упрощенном стемминге запроса (от длинных к коротким)
+RUSSIAN_ENDINGS = sorted({
+    "иями", "ями", "ами", "ией", "ого", "его", "ому", "ему", "ыми", "ими", "ость", "ости",
+    "ах", "ях", "ов", "ев", "ей", "ой", "ий", "ый", "ая", "яя", "ое", "ее", "ые", "ие",
+    "ом", "ем", "ам", "ям", "их", "ых", "ью", "ия", "ья", "ье", "ии",
+    "а", "я", "о", "е", "ы", "и", "у", "ю", "ь", "й",
+}, key=len, reverse=True)
+MIN_STEM_LENGTH = 4
+
+SNIPPET_TOKENS = 16
+TITLE_WEIGHT = 10.0
+SUMMARY_WEIGHT = 1.0
+
+
+def search_supported(db: Session) -> bool:
+    """Поиск построен на FTS5 и есть только в SQLite.
+
+    В PostgreSQL таблица news_fts не создается (миграция 0005 пропускает
+    другие диалекты), и GET /api/news/search отвечает 501.
+    """
+    return db.get_bind().dialect.name == "sqlite"
+
+
+def stem(word: str) -> str:
+    """Упрощенный стемминг: отбрасывание типичного окончания"""
+    for ending in RUSSIAN_ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM_LENGTH:
+            return word[:-len(ending)]
+    return word
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """Запрос FTS5: все слова обязательны, каждое ищется по основе как префикс"""
+    words = re.findall(r"\w+", query.lower().replace("ё", "е"))
+    if not words:
+        return None
+    return " ".join(f'"{stem(word)}"*' for word in words)
+
+
+SEARCH_SQL = """
+    SELECT * FROM (
+        SELECT a.id, a.title, a.summary, a.source, a.category, a.url, a.published_at,
+               a.is_active, a.created_at, a.cluster_id,
+               snippet(news_fts, -1, '<mark>', '</mark>', '…', :snippet_tokens) AS snippet,
+               bm25(news_fts, :title_weight, :summary_weight) AS score
+        FROM news_fts
+        JOIN news_articles AS a ON a.id = news_fts.rowid
+        WHERE news_fts MATCH :match
+    )
+    {cursor_filter}
+    ORDER BY score, id
+    LIMIT :limit
+"""
+
+
+def search_news(db: Session, query: str, limit: int, cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+    """Поиск по заголовку и описанию с ранжированием BM25.
+
+    Возвращает найденные строки (с фрагментом текста, где совпадения выделены
+    <mark>) и курсор следующей страницы по (score, id).
+    """
+    match = build_match_query(query)
+    if match is None:
+        return [], None
+
+    params = {
+        "match": match,
+        "limit": limit + 1,
+        "snippet_tokens": SNIPPET_TOKENS,
+        "title_weight": TITLE_WEIGHT,
+        "summary_weight": SUMMARY_WEIGHT,
+    }
+    cursor_filter = ""
+    if cursor:
+        try:
+            score, article_id = decode_token(cursor)
+            params.update(cursor_score=float(score), cursor_id=int(article_id))
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        cursor_filter = "WHERE (score, id) > (:cursor_score, :cursor_id)"
+
+    statement = text(SEARCH_SQL.format(cursor_filter=cursor_filter)).columns(
+        published_at=DateTime, created_at=DateTime, is_active=Boolean, score=Float
+    )
+    rows = db.execute(statement, params).mappings().all()
+    items = [dict(row) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_token([last["score"], last["id"]])
+    return items, next_cursor
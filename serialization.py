@@ -0,0 +1,66 @@
+import json
+from datetime import datetime
+from typing import Iterable, Sequence
+
+from sqlalchemy import Select, select
+
+import schemas as sch
+from models import NewsArchive, NewsArticle
+
+try:
+    import orjson
+except ImportError:  # orjson необязателен: без него используется json
+    orjson = None
+
+# Поля ответа в порядке schemas.NewsArticle: JSON совпадает побайтно с тем,
+# что FastAPI строит через response_model
+NEWS_FIELDS = tuple(sch.NewsArticle.model_fields)
+NEWS_COLUMNS = tuple(getattr(NewsArticle, name) for name in NEWS_FIELDS)
+ARCHIVE_FIELDS = tuple(sch.NewsArchiveItem.model_fields)
+
+
+def news_rows() -> Select:
+    """select() только нужных столбцов вместо ORM-объектов"""
+    return select(*NEWS_COLUMNS)
+
+
+def archive_rows(fields: Sequence[str] = ARCHIVE_FIELDS) -> Select:
+    """select() столбцов архива; с fields=NEWS_FIELDS строки совпадают с news_rows()"""
+    return select(*(getattr(NewsArchive, name) for name in fields))
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value) -> bytes:
+    """JSON в байтах: orjson, а без него — json с теми же настройками, что у FastAPI"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def loads(data: bytes):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def dump_news_rows(rows: Iterable[Sequence]) -> bytes:
+    """Список строк (в порядке NEWS_FIELDS) в JSON без создания Pydantic-моделей.
+
+    Схема ответа по-прежнему объявляется через response_model, поэтому OpenAPI
+    не меняется; данные из БД доверенные и повторно не валидируются.
+    """
+    fields = NEWS_FIELDS
+    return dumps([dict(zip(fields, row)) for row in rows])
+
+
+def dump_news_row(row: Sequence, fields: Sequence[str] = NEWS_FIELDS) -> bytes:
+    return dumps(dict(zip(fields, row)))
+
+
+def dump_news_dicts(items: Iterable[dict]) -> bytes:
+    """Список словарей со всеми полями NEWS_FIELDS (например, из кеша лент)"""
+    fields = NEWS_FIELDS
+    return dumps([{name: item[name] for name in fields} for item in items])
@@ -0,0 +1,260 @@
+import asyncio
+import logging
+import os
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, event, func, inspect, insert, literal, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from database import SessionLocal, insert_on_conflict
+from models import NewsArticle, StatCounter, User
+
+logger = logging.getLogger(__name__)
+
+# Период сверки счетчиков с таблицами, секунды (0 — только при пустой таблице на старте)
+STATS_RECONCILE_INTERVAL = float(os.getenv("STATS_RECONCILE_INTERVAL", "3600"))
+
+# Виды счетчиков: активные новости по категории и по источнику, итоги
+CATEGORY = "category"
+SOURCE = "source"
+TOTAL = "total"
+NEWS = "news"
+USERS = "users"
+
+Deltas = Counter
+
+
+def count_article(deltas: Deltas, category: Optional[str], source: Optional[str], sign: int = 1):
+    """Вклад одной активной статьи в счетчики"""
+    deltas[(TOTAL, NEWS)] += sign
+    if category:
+        deltas[(CATEGORY, category)] += sign
+    if source:
+        deltas[(SOURCE, source)] += sign
+
+
+def article_deltas(rows: Iterable[dict], sign: int = 1) -> Deltas:
+    """Изменения счетчиков для вставленных строк (словари с category, source, is_active)"""
+    deltas = Deltas()
+    for row in rows:
+        if row.get("is_active", True):
+            count_article(deltas, row.get("category"), row.get("source"), sign)
+    return deltas
+
+
+def _upsert(connection: Connection):
+    """INSERT ... ON CONFLICT (kind, key) DO UPDATE SET count = count + excluded.count"""
+    stmt = insert_on_conflict(connection, StatCounter)
+    return stmt.on_conflict_do_update(
+        index_elements=["kind", "key"],
+        set_={"count": StatCounter.count + stmt.excluded["count"]},
+    )
+
+
+def apply_deltas(connection: Connection, deltas: Deltas):
+    """Применение изменений в текущей транзакции (фиксируются вместе с данными)"""
+    params = [{"kind": kind, "key": key, "count": delta} for (kind, key), delta in deltas.items() if delta]
+    if params:
+        connection.execute(_upsert(connection), params)
+
+
+# ---------------------------------------------------------
+#           ORM: учет изменений при каждом flush
+# ---------------------------------------------------------
+
+def _article_state(article: NewsArticle, before: bool) -> Tuple[bool, Optional[str], Optional[str]]:
+    """(is_active, category, source) статьи до (before=True) или после изменения"""
+    state = inspect(article)
+    values = []
+    for name in ("is_active", "category", "source"):
+        history = state.attrs[name].history
+        values.append(history.deleted[0] if before and history.deleted else getattr(article, name))
+    return bool(values[0]), values[1], values[2]
+
+
+@event.listens_for(Session, "after_flush")
+def _count_flushed(session, flush_context):
+    """Счетчики для изменений через ORM обновляются в той же транзакции.
+
+    Пакетные INSERT/UPDATE в обход ORM (bulk_ingest, переклассификация)
+    применяют изменения сами через apply_deltas.
+    """
+    deltas = Deltas()
+    for obj in session.new:
+        if isinstance(obj, NewsArticle):
+            is_active, category, source = _article_state(obj, before=False)
+            if is_active:
+                count_article(deltas, category, source)
+        elif isinstance(obj, User):
+            deltas[(TOTAL, USERS)] += 1
+    for obj in session.dirty:
+        if isinstance(obj, NewsArticle):
+            old, new = _article_state(obj, before=True), _article_state(obj, before=False)
+            if old != new:
+                if old[0]:
+                    count_article(deltas, old[1], old[2], -1)
+                if new[0]:
+                    count_article(deltas, new[1], new[2])
+    for obj in session.deleted:
+        if isinstance(obj, NewsArticle):
+            is_active, category, source = _article_state(obj, before=True)
+            if is_active:
+                count_article(deltas, category, source, -1)
+        elif isinstance(obj, User):
+            deltas[(TOTAL, USERS)] -= 1
+    apply_deltas(session.connection(), deltas)
+
+
+# ---------------------------------------------------------
+#                        ЧТЕНИЕ
+# ---------------------------------------------------------
+
+def _counts_query(kind: str):
+    return (
+        select(StatCounter.key, StatCounter.count)
+        .where(StatCounter.kind == kind, StatCounter.count > 0)
+        .order_by(StatCounter.count.desc(), StatCounter.key)
+    )
+
+
+def _totals(rows) -> dict:
+    values = {key: count for key, count in rows}
+    return {"news_count": values.get(NEWS, 0), "user_count": values.get(USERS, 0)}
+
+
+def get_counts(db: Session, kind: str) -> List[dict]:
+    """Категории или источники активных новостей с числом статей"""
+    return [{"name": key, "count": count} for key, count in db.execute(_counts_query(kind))]
+
+
+async def get_counts_async(db: AsyncSession, kind: str) -> List[dict]:
+    result = await db.execute(_counts_query(kind))
+    return [{"name": key, "count": count} for key, count in result]
+
+
+def get_totals(db: Session) -> dict:
+    return _totals(db.execute(select(StatCounter.key, StatCounter.count).where(StatCounter.kind == TOTAL)))
+
+
+async def get_totals_async(db: AsyncSession) -> dict:
+    result = await db.execute(select(StatCounter.key, StatCounter.count).where(StatCounter.kind == TOTAL))
+    return _totals(result)
+
+
+# ---------------------------------------------------------
+#                        СВЕРКА
+# ---------------------------------------------------------
+
+def reconcile(db: Session) -> int:
+    """Пересчет всех счетчиков по таблицам в одной транзакции.
+
+    Сначала удаляются старые значения (DELETE ... RETURNING), поэтому запись
+    в базу заблокирована до конца пересчета и счетчики не расходятся с
+    данными. Возвращает число исправленных значений.
+    """
+    before = {
+        (kind, key): count
+        for kind, key, count in db.execute(
+            delete(StatCounter).returning(StatCounter.kind, StatCounter.key, StatCounter.count)
+        )
+    }
+    active = NewsArticle.is_active == True
+    columns = ["kind", "key", "count"]
+    for kind, column in ((CATEGORY, NewsArticle.category), (SOURCE, NewsArticle.source)):
+        db.execute(insert(StatCounter).from_select(
+            columns,
+            select(literal(kind), column, func.count()).where(active, column.isnot(None)).group_by(column),
+        ))
+    db.execute(insert(StatCounter).from_select(
+        columns, select(literal(TOTAL), literal(NEWS), func.count()).select_from(NewsArticle).where(active)
+    ))
+    db.execute(insert(StatCounter).from_select(
+        columns, select(literal(TOTAL), literal(USERS), func.count()).select_from(User)
+    ))
+    after = {(kind, key): count for kind, key, count in db.execute(select(StatCounter.kind, StatCounter.key, StatCounter.count))}
+    db.commit()
+    return sum(1 for name in before.keys() | after.keys() if before.get(name, 0) != after.get(name, 0))
+
+
+class StatsReconciler:
+    """Периодическая сверка счетчиков с таблицами.
+
+    Счетчики обновляются транзакционно вместе с данными, сверка исправляет
+    расхождения после записи в обход приложения (ручные UPDATE, старые
+    версии). При первом запуске на существующей базе таблица заполняется сразу.
+    """
+
+    def __init__(self, session_factory=SessionLocal, interval: float = STATS_RECONCILE_INTERVAL):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.runs = 0
+        self.last_run_at: Optional[datetime] = None
+        self.last_duration: Optional[float] = None
+        self.last_corrected: Optional[int] = None
+        self.last_error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def run_once(self, report_drift: bool = True) -> int:
+        started = time.perf_counter()
+        db = self.session_factory()
+        try:
+            corrected = reconcile(db)
+        except Exception as e:
+            db.rollback()
+            self.last_error = str(e)
+            raise
+        finally:
+            db.close()
+        self.runs += 1
+        self.last_run_at = datetime.now()
+        self.last_duration = time.perf_counter() - started
+        self.last_corrected = corrected
+        self.last_error = None
+        if corrected and report_drift:
+            logger.warning(f"Сверка счетчиков исправила {corrected} значений")
+        return corrected
+
+    def bootstrap(self):
+        """Заполнение счетчиков, если таблица пуста (новая или обновленная база)"""
+        with self.session_factory() as db:
+            empty = db.execute(select(StatCounter.kind).limit(1)).first() is None
+        if empty:
+            self.run_once(report_drift=False)
+
+    async def start(self):
+        await run_in_threadpool(self.bootstrap)
+        if self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await run_in_threadpool(self.run_once)
+            except Exception:
+                logger.exception("Ошибка сверки счетчиков")
+
+    def status(self) -> dict:
+        return {
+            "interval": self.interval,
+            "runs": self.runs,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            "last_duration": round(self.last_duration, 3) if self.last_duration is not None else None,
+            "last_corrected": self.last_corrected,
+            "last_error": self.last_error,
+        }
+
+
+stats_reconciler = StatsReconciler()
@@ -0,0 +1,100 @@
+"""Общие фикстуры: одни и те же тесты хранилища выполняются на SQLite и PostgreSQL.
+
+SQLite — временный файл. PostgreSQL берется из DATABASE_URL (postgresql://...);
+если он не задан, не указывает на PostgreSQL или сервер недоступен, тесты на
+PostgreSQL пропускаются. Схема в этой базе пересоздается, поэтому имя базы
+должно содержать "test":
+
+    DATABASE_URL=postgresql://postgres@localhost:5432/news_test python -m pytest
+
+Модули приложения импортируются с SQLite в памяти: их собственные движки в
+тестах не используются, каждый тест получает движок своего бэкенда.
+"""
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import text
+
+POSTGRES_URL = os.getenv("DATABASE_URL", "")
+if not POSTGRES_URL.startswith(("postgresql", "postgres:")):
+    POSTGRES_URL = ""
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import database  # noqa: E402
+import migrate  # noqa: E402
+from clustering import story_clusterer  # noqa: E402
+
+BACKENDS = ("sqlite", "postgresql")
+
+
+def _postgres_engine():
+    if not POSTGRES_URL:
+        pytest.skip("PostgreSQL не настроен: DATABASE_URL=postgresql://.../news_test")
+    url = database.normalize_url(POSTGRES_URL)
+    if "test" not in (url.database or ""):
+        pytest.skip(f"Схема пересоздается, имя базы должно содержать 'test': {url.database}")
+    try:
+        engine = database.make_engine(url)
+        with engine.begin() as connection:
+            connection.execute(text("DROP SCHEMA public CASCADE"))
+            connection.execute(text("CREATE SCHEMA public"))
+    except Exception as e:
+        pytest.skip(f"PostgreSQL недоступен: {e}")
+    return engine
+
+
+@pytest.fixture(scope="session", params=BACKENDS)
+def engine(request, tmp_path_factory):
+    """Движок с примененными миграциями, один на бэкенд"""
+    if request.param == "postgresql":
+        engine = _postgres_engine()
+    else:
+        engine = database.make_engine(f"sqlite:///{tmp_path_factory.mktemp('db') / 'test.db'}")
+    migrate.upgrade(engine)
+    yield engine
+    engine.dispose()
+
+
+def _clear(engine):
+    tables = [table.name for table in reversed(database.Base.metadata.sorted_tables)]
+    with engine.begin() as connection:
+        if engine.dialect.name == "postgresql":
+            connection.execute(text(f"TRUNCATE {', '.join(tables)} RESTART IDENTITY CASCADE"))
+        else:
+            for table in tables:
+                connection.execute(text(f"DELETE FROM {table}"))
+
+
+@pytest.fixture
+def db(engine):
+    """Сессия на пустой базе; после теста все таблицы очищаются"""
+    story_clusterer.index.clear()
+    session = database.SessionLocal(bind=engine)
+    yield session
+    session.close()
+    _clear(engine)
+    story_clusterer.index.clear()
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def async_engine(engine, db):
+    """Асинхронный движок к той же базе (aiosqlite или asyncpg)"""
+    async_engine = database.make_async_engine(database.async_url(engine.url.render_as_string(hide_password=False)))
+    yield async_engine
+    await async_engine.dispose()
+
+
+@pytest.fixture
+async def async_db(async_engine):
+    async with database.AsyncSessionLocal(bind=async_engine) as session:
+        yield session
@@ -0,0 +1,52 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+
+import auth
+from models import User
+
+
+@pytest.fixture
+def password_pool(monkeypatch):
+    # Потоки вместо процессов: bcrypt отпускает GIL, а тестам не нужен запуск воркеров
+    executor = ThreadPoolExecutor(2)
+    monkeypatch.setattr(auth, "_password_executor", executor)
+    yield executor
+    executor.shutdown()
+
+
+@pytest.mark.anyio
+async def test_saturated_pool_rejects_with_retry_after(password_pool, monkeypatch):
+    monkeypatch.setattr(auth, "PASSWORD_QUEUE_LIMIT", 1)
+    release = threading.Event()
+    running = asyncio.create_task(auth.run_password_task(release.wait, 5))
+    while auth.password_pool_stats()["in_flight"] == 0:
+        await asyncio.sleep(0)
+
+    with pytest.raises(HTTPException) as rejected:
+        await auth.verify_password_async("secret", auth.hash_password("secret", 4))
+    assert rejected.value.status_code == 503
+    assert rejected.value.headers == {"Retry-After": str(auth.PASSWORD_RETRY_AFTER)}
+
+    release.set()
+    assert await running
+    assert auth.password_pool_stats()["in_flight"] == 0
+
+
+@pytest.mark.anyio
+async def test_login_rehashes_outdated_cost_factor(db, async_db, password_pool):
+    outdated = auth.hash_password("secret", rounds=4)
+    db.add(User(email="alice@example.com", username="alice", hashed_password=outdated))
+    db.commit()
+
+    assert await auth.authenticate_user_async(async_db, "alice@example.com", "wrong") is False
+    user = await auth.authenticate_user_async(async_db, "alice", "secret")
+    assert user and user.hashed_password != outdated
+    assert not auth.password_needs_rehash(user.hashed_password)
+
+    db.expire_all()
+    stored = db.query(User).one().hashed_password
+    assert stored == user.hashed_password and auth.verify_password("secret", stored)
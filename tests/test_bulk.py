@@ -0,0 +1,54 @@
+import pytest
+from starlette.requests import Request
+
+import bulk
+import database
+from models import NewsArticle
+from serialization import dumps
+
+
+def ndjson_request(operations: list) -> Request:
+    body = b"\n".join(dumps(operation) for operation in operations)
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    scope = {"type": "http", "method": "POST", "path": "/api/news/bulk", "query_string": b"",
+             "headers": [(b"content-type", b"application/x-ndjson")]}
+    return Request(scope, receive)
+
+
+def create(n: int) -> dict:
+    return {"op": "create", "data": {
+        "title": f"Статья {n}", "summary": "Текст", "source": "ТАСС", "category": "спорт",
+        "url": f"https://example.com/bulk/{n}", "published_at": "2026-01-01T12:00:00",
+    }}
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("atomic", [False, True])
+async def test_ndjson_over_limit_returns_partial_results(db, engine, monkeypatch, atomic):
+    monkeypatch.setattr(bulk, "BULK_MAX_OPERATIONS", 3)
+    applier = bulk.BulkApplier(session_factory=lambda: database.SessionLocal(bind=engine), atomic=atomic, chunk_size=2)
+    result = await bulk.run_bulk(ndjson_request([create(n) for n in range(5)]), atomic, applier)
+
+    assert result["truncated_at"] == 3
+    assert [item["index"] for item in result["results"]] == [0, 1, 2]
+    stored = db.query(NewsArticle).count()
+    if atomic:
+        assert not result["committed"] and stored == 0
+        assert {item["status"] for item in result["results"]} == {bulk.ROLLED_BACK}
+        assert bulk.response_status(result) == 413
+    else:
+        # Порции до лимита зафиксированы: успешный ответ, чтобы клиент не повторял их
+        assert result["committed"] and result["applied"] == stored == 3
+        assert bulk.response_status(result) == 200
+
+
+@pytest.mark.anyio
+async def test_ndjson_over_limit_with_nothing_applied_is_413(db, engine, monkeypatch):
+    monkeypatch.setattr(bulk, "BULK_MAX_OPERATIONS", 2)
+    applier = bulk.BulkApplier(session_factory=lambda: database.SessionLocal(bind=engine))
+    result = await bulk.run_bulk(ndjson_request([{"op": "delete", "id": 1000 + n} for n in range(3)]), False, applier)
+    assert (result["truncated_at"], result["applied"], result["failed"]) == (2, 0, 2)
+    assert bulk.response_status(result) == 413
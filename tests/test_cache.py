@@ -0,0 +1,57 @@
+from starlette.requests import Request
+
+from cache import (ALL, LIST, CachedResponse, MemoryBackend, ResponseCache, article_scope, category_scope)
+
+
+def get(path: str, query: str = "", etag: str = None) -> Request:
+    headers = [(b"if-none-match", etag.encode())] if etag else []
+    return Request({"type": "http", "method": "GET", "path": path, "query_string": query.encode(), "headers": headers})
+
+
+def cached(cache: ResponseCache, request: Request, *scopes: str, body: bytes = b"[]"):
+    """Ответ из кеша или, при промахе, сохраненный заново; (попадание, ответ)"""
+    key, response = cache.lookup(request, *scopes)
+    if response is not None:
+        return True, response
+    return False, cache.store(request, key, body)
+
+
+def test_hit_and_etag_revalidation():
+    cache = ResponseCache(MemoryBackend())
+    hit, first = cached(cache, get("/api/news/", "limit=10&skip=0"), LIST)
+    assert not hit and first.status_code == 200
+    etag = first.headers["etag"]
+
+    # Порядок параметров не важен
+    hit, again = cached(cache, get("/api/news/", "skip=0&limit=10"), LIST)
+    assert hit and again.body == b"[]" and again.headers["etag"] == etag
+    hit, revalidated = cached(cache, get("/api/news/", "limit=10&skip=0", etag=etag), LIST)
+    assert hit and revalidated.status_code == 304 and revalidated.body == b""
+    assert cache.stats()["not_modified"] == 1
+
+
+def test_invalidation_is_limited_to_scopes():
+    cache = ResponseCache(MemoryBackend())
+    sport, politics = get("/api/news/category/спорт"), get("/api/news/category/политика")
+    article = get("/api/news/7")
+    cached(cache, sport, LIST, category_scope("спорт"))
+    cached(cache, politics, LIST, category_scope("политика"))
+    cached(cache, article, article_scope(7))
+
+    cache.invalidate(category_scope("спорт"))
+    assert not cached(cache, sport, LIST, category_scope("спорт"))[0]
+    assert cached(cache, politics, LIST, category_scope("политика"))[0]
+
+    # Новая статья в «политике»: списки устаревают, чужие статьи — нет
+    cache.invalidate_articles([{"id": 8, "category": "политика"}])
+    assert not cached(cache, politics, LIST, category_scope("политика"))[0]
+    assert cached(cache, article, article_scope(7))[0]
+
+    cache.invalidate(ALL)
+    assert not cached(cache, article, article_scope(7))[0]
+
+
+def test_serialized_entry_round_trip():
+    entry = CachedResponse(body=b'{"id": 1}\n', media_type="application/json", headers={"X-Next-Cursor": "abc"})
+    restored = CachedResponse.loads(entry.dumps())
+    assert restored == entry
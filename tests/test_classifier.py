@@ -0,0 +1,39 @@
+from classifier import DEFAULT_CATEGORY, KeywordClassifier, default_classifier
+from feed_state import FeedStateStore
+from fetcher import FetchResult
+from models import NewsArticle
+from parser import RealNewsParser
+
+
+def test_weights_are_summed_per_category():
+    category, score = default_classifier.classify("Сборная выиграла матч чемпионата по футболу")
+    assert category == "спорт"
+    assert score == 1.0 + 1.0 + 1.5 + 1.5
+
+
+def test_keywords_match_whole_words_only():
+    # «ии» и «it» — отдельные слова, а не части «линии» и «italy»
+    assert default_classifier.classify("Новые линии метро в Italy") == (DEFAULT_CATEGORY, 0.0)
+    assert default_classifier.classify("ИИ пишет код")[0] == "технологии"
+    assert default_classifier.classify("Ёлка и «Искусственный  интеллект»")[0] == "технологии"
+
+
+def test_prefix_grouping_keeps_every_keyword():
+    # Ключевые слова с общими первыми буквами попадают в одну ветку выражения
+    classifier = KeywordClassifier({"a": {r"кот\w*": 1.0, r"кошк\w*": 2.0, r"ко": 0.5}, "b": {r"собак\w*": 1.0}})
+    assert classifier.scores("кот и кошка, ко") == [3.5, 0.0]
+    assert classifier.scores("собаки") == [0.0, 1.0]
+    assert classifier.classify("ничего") == (DEFAULT_CATEGORY, 0.0)
+
+
+def test_feed_entries_without_keywords_get_source_category(db, tmp_path):
+    source = {"url": "https://example.com/rss", "source": "Спорт-Экспресс", "category": "спорт"}
+    result = FetchResult(source=source, status=200, body=b"", content_hash="x", entries=[
+        {"title": "Интервью с тренером", "link": "https://example.com/1", "summary": "Разговор о сезоне"},
+        {"title": "Выставка в Эрмитаже", "link": "https://example.com/2", "summary": "Открылась экспозиция"},
+    ])
+    assert RealNewsParser.store_fetch_results(db, [result], FeedStateStore(str(tmp_path / "state.json"))) == 2
+    assert dict(db.query(NewsArticle.url, NewsArticle.category)) == {
+        "https://example.com/1": "спорт",
+        "https://example.com/2": "культура",
+    }
@@ -0,0 +1,35 @@
+import pytest
+from sqlalchemy import text
+
+import database
+
+
+def test_postgres_url_is_normalized():
+    assert database.normalize_url("postgres://u:p@host/news").drivername == "postgresql"
+
+
+def test_unsupported_backend_is_a_configuration_error():
+    with pytest.raises(ValueError, match="mysql"):
+        database.make_engine("mysql://u:p@host/news")
+    with pytest.raises(ValueError, match="mysql"):
+        database.make_async_engine("mysql+aiomysql://u:p@host/news")
+
+
+def test_async_url_drivers():
+    assert database.async_url("sqlite:///./news.db").drivername == "sqlite+aiosqlite"
+    assert database.async_url("postgresql://u:p@host/news").drivername == "postgresql+asyncpg"
+
+
+def test_pool_options_skip_memory_sqlite():
+    assert database._pool_options(database.normalize_url("sqlite://")) == {}
+    options = database._pool_options(database.normalize_url("postgresql://u:p@host/news"))
+    assert options["pool_size"] == database.DB_POOL_SIZE
+
+
+def test_sqlite_pragmas_applied_on_connect(tmp_path):
+    engine = database.make_engine(f"sqlite:///{tmp_path / 'pragmas.db'}")
+    with engine.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert connection.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert connection.execute(text("PRAGMA busy_timeout")).scalar() == database.SQLITE_PRAGMAS["busy_timeout"]
+    engine.dispose()
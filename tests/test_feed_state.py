@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+from feed_state import FeedStateStore
+from fetcher import FetchResult
+
+
+def fetched(url: str, etag: str) -> FetchResult:
+    return FetchResult(source={"url": url, "source": "ТАСС"}, status=200, body=b"<rss/>",
+                       headers={"ETag": etag}, content_hash="hash")
+
+
+def test_state_survives_restart(tmp_path):
+    path = str(tmp_path / "state.json")
+    store = FeedStateStore(path)
+    store.record(fetched("https://example.com/rss", '"v1"'))
+    store.save()
+
+    restored = FeedStateStore(path)
+    assert restored.request_headers("https://example.com/rss") == {"If-None-Match": '"v1"'}
+    assert restored.is_unchanged("https://example.com/rss", "hash")
+
+
+def test_failed_save_keeps_previous_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "state.json")
+    store = FeedStateStore(path)
+    store.record(fetched("https://example.com/rss", '"v1"'))
+    store.save()
+    with open(path, encoding="utf-8") as f:
+        saved = f.read()
+
+    def fail(src, dst):
+        raise OSError("disk full")
+
+    store.record(fetched("https://example.com/rss", '"v2"'))
+    monkeypatch.setattr(os, "replace", fail)
+    with pytest.raises(OSError):
+        store.save()
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == saved
+    assert os.listdir(tmp_path) == ["state.json"]
+
+
+def test_unreadable_state_starts_empty(tmp_path):
+    path = tmp_path / "state.json"
+    path.write_text("{не json", encoding="utf-8")
+    assert FeedStateStore(str(path)).request_headers("https://example.com/rss") == {}
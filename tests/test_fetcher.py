@@ -0,0 +1,115 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from feed_state import FeedStateStore
+from fetcher import AsyncFeedFetcher
+
+
+def rss(*titles: str) -> bytes:
+    items = "".join(f"<item><title>{title}</title><link>https://example.com/{n}</link>"
+                    f"<description>Текст {n}</description></item>" for n, title in enumerate(titles))
+    return f'<?xml version="1.0" encoding="utf-8"?><rss version="2.0"><channel>{items}</channel></rss>'.encode()
+
+
+def source(server: TestServer, path: str) -> dict:
+    return {"url": str(server.make_url(path)), "source": path.strip("/"), "category": "общее"}
+
+
+def fetcher(**options) -> AsyncFeedFetcher:
+    # Разбор в потоке: пул процессов в тестах не нужен
+    return AsyncFeedFetcher(executor=ThreadPoolExecutor(1), retries=1, backoff=0, **options)
+
+
+@pytest.mark.anyio
+async def test_fetch_all_runs_sources_concurrently_within_host_limit():
+    in_flight, peak = 0, 0
+
+    async def feed(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.05)
+        in_flight -= 1
+        return web.Response(body=rss("Первая", "Вторая", "Третья"), content_type="application/rss+xml")
+
+    app = web.Application()
+    app.router.add_get("/feed/{n}", feed)
+    async with TestServer(app) as server:
+        async with fetcher(per_host_limit=2, entries_limit=2) as client:
+            results = await client.fetch_all([source(server, f"/feed/{n}") for n in range(4)])
+    assert peak == 2
+    assert [result.source["source"] for result in results] == [f"feed/{n}" for n in range(4)]
+    assert all(result.error is None and len(result.entries) == 2 for result in results)
+    assert results[0].entries[0] == {"title": "Первая", "link": "https://example.com/0", "summary": "Текст 0"}
+
+
+@pytest.mark.anyio
+async def test_failing_source_does_not_break_others():
+    calls = {"flaky": 0, "missing": 0}
+
+    async def flaky(request):
+        calls["flaky"] += 1
+        return web.Response(status=503)
+
+    async def missing(request):
+        calls["missing"] += 1
+        return web.Response(status=404)
+
+    async def ok(request):
+        return web.Response(body=rss("Новость"))
+
+    app = web.Application()
+    app.router.add_get("/flaky", flaky)
+    app.router.add_get("/missing", missing)
+    app.router.add_get("/ok", ok)
+    async with TestServer(app) as server:
+        async with fetcher() as client:
+            flaky_result, missing_result, ok_result = await client.fetch_all(
+                [source(server, "/flaky"), source(server, "/missing"), source(server, "/ok")])
+    # 5xx повторяется, 404 — нет
+    assert (flaky_result.error, flaky_result.attempts, calls["flaky"]) == ("HTTP 503", 2, 2)
+    assert (missing_result.error, missing_result.attempts, calls["missing"]) == ("HTTP 404", 1, 1)
+    assert ok_result.error is None and [entry["title"] for entry in ok_result.entries] == ["Новость"]
+
+
+@pytest.mark.anyio
+async def test_conditional_get_and_unchanged_body_are_not_modified(tmp_path):
+    body = rss("Новость")
+    seen_headers = []
+
+    async def with_etag(request):
+        seen_headers.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304)
+        return web.Response(body=body, headers={"ETag": '"v1"', "Last-Modified": "Wed, 01 Jan 2026 00:00:00 GMT"})
+
+    async def without_etag(request):
+        return web.Response(body=body)
+
+    app = web.Application()
+    app.router.add_get("/etag", with_etag)
+    app.router.add_get("/plain", without_etag)
+    store = FeedStateStore(str(tmp_path / "state.json"))
+    async with TestServer(app) as server:
+        sources = [source(server, "/etag"), source(server, "/plain")]
+        async with fetcher(state_store=store) as client:
+            first = await client.fetch_all(sources)
+            for result in first:
+                store.record(result)
+            second = await client.fetch_all(sources)
+            for result in second:
+                store.record(result)
+
+    assert [result.not_modified for result in first] == [False, False]
+    assert seen_headers == [None, '"v1"']
+    etag, plain = second
+    # 304 без тела; без ETag тело совпало по хешу и не разбиралось
+    assert (etag.status, etag.not_modified, etag.entries) == (304, True, [])
+    assert (plain.status, plain.not_modified, plain.entries) == (200, True, [])
+    stats = store.stats()
+    assert stats[sources[0]["url"]]["bytes_saved"] == len(body)
+    assert stats[sources[1]["url"]]["hits"] == 1 and stats[sources[1]["url"]]["bytes_saved"] == 0
@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+
+import stats
+from jobs import RecategorizationJob
+from models import NewsArticle
+
+
+def add_articles(db, items):
+    for n, (title, category) in enumerate(items):
+        db.add(NewsArticle(title=title, summary="", source="ТАСС", category=category, url=f"https://example.com/job/{n}",
+                           published_at=datetime(2026, 1, 1) - timedelta(minutes=n)))
+    db.commit()
+
+
+def categories(db) -> dict:
+    db.expire_all()
+    return dict(db.query(NewsArticle.title, NewsArticle.category))
+
+
+def test_recategorize_all_keeps_unrecognized_categories(db, tmp_path):
+    add_articles(db, [
+        ("Премьера сезона", "развлечения"),
+        ("Сборная выиграла матч чемпионата", "общее"),
+        ("Новость без ключевых слов", None),
+    ])
+    progress = RecategorizationJob(only_missing=False, checkpoint_path=str(tmp_path / "checkpoint.json")).run(db)
+    assert (progress.status, progress.updated) == ("done", 2)
+    assert categories(db) == {
+        "Премьера сезона": "развлечения",
+        "Сборная выиграла матч чемпионата": "спорт",
+        "Новость без ключевых слов": "общее",
+    }
+    assert {row["name"] for row in stats.get_counts(db, stats.CATEGORY)} == {"развлечения", "спорт", "общее"}
+
+
+def test_interrupted_job_resumes_from_checkpoint(db, tmp_path):
+    add_articles(db, [(f"Футбольный матч {n}", None) for n in range(5)])
+    path = tmp_path / "checkpoint.json"
+    interrupted = RecategorizationJob(chunk_size=2, checkpoint_path=str(path))
+    assert interrupted._process_chunk(db)
+    assert path.exists()
+
+    # Контрольная точка другого режима не подходит: задача начинается заново
+    other_mode = RecategorizationJob(only_missing=False, checkpoint_path=str(path))
+    other_mode._load_checkpoint()
+    assert not other_mode.progress.resumed and other_mode.progress.last_id == 0
+
+    progress = RecategorizationJob(chunk_size=2, checkpoint_path=str(path)).run(db)
+    assert progress.resumed and progress.status == "done"
+    assert (progress.processed, progress.updated) == (5, 5)
+    assert not path.exists()
+    assert set(categories(db).values()) == {"спорт"}
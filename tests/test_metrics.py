@@ -0,0 +1,44 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+import database
+import metrics
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = metrics.Registry()
+    histogram = registry.register(metrics.Histogram("test_seconds", "Test", ("source",), buckets=(0.1, 1.0)))
+    for value in (0.05, 0.5, 5.0):
+        histogram.labels('РИА "Новости"').observe(value)
+    lines = registry.render().splitlines()
+    assert 'test_seconds_bucket{source="РИА \\"Новости\\"",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{source="РИА \\"Новости\\"",le="1"} 2' in lines
+    assert 'test_seconds_bucket{source="РИА \\"Новости\\"",le="+Inf"} 3' in lines
+    assert 'test_seconds_count{source="РИА \\"Новости\\""} 3' in lines
+
+
+def test_middleware_counts_queries_per_request_by_route_template():
+    engine = database.make_engine("sqlite://")
+    metrics.instrument_engine(engine, "test")
+    app = FastAPI()
+    app.add_middleware(metrics.MetricsMiddleware)
+
+    @app.get("/metrics-test/{item_id}")
+    def item(item_id: int):
+        # Синхронный обработчик выполняется в пуле потоков: запросы все равно
+        # учитываются в текущем HTTP-запросе
+        with engine.connect() as connection:
+            for _ in range(item_id):
+                connection.execute(text("SELECT 1"))
+        return {}
+
+    with TestClient(app) as client:
+        assert client.get("/metrics-test/2").status_code == 200
+        assert client.get("/metrics-test/3").status_code == 200
+        assert client.get("/metrics-missing").status_code == 404
+    lines = metrics.registry.render().splitlines()
+    assert 'http_requests_total{method="GET",route="/metrics-test/{item_id}",status="200"} 2' in lines
+    assert 'http_request_db_queries_sum{route="/metrics-test/{item_id}"} 5' in lines
+    assert f'http_requests_total{{method="GET",route="{metrics.UNMATCHED_ROUTE}",status="404"}} 1' in lines
+    engine.dispose()
@@ -0,0 +1,64 @@
+import asyncio
+import gzip
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from fastapi.templating import Jinja2Templates
+from starlette.requests import Request
+
+import pages
+from cache import LIST, response_cache
+from database import AsyncSessionLocal
+from ingestion import bulk_ingest
+
+TEMPLATES = Jinja2Templates(directory=str(Path(__file__).resolve().parent.parent / "templates"))
+
+
+def get(**headers: str) -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/", "query_string": b"",
+                    "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]})
+
+
+def test_variant_chosen_by_accept_encoding_with_own_etag():
+    body = ("<p>Новость</p>" * 200).encode()
+    page = pages.RenderedPage(body)
+    compressed = page.respond(get(accept_encoding="gzip, deflate"))
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["vary"] == "Accept-Encoding"
+    assert gzip.decompress(compressed.body) == body
+
+    plain = page.respond(get(accept_encoding="gzip;q=0, br;q=0"))
+    assert "content-encoding" not in plain.headers and plain.body == body
+    assert plain.headers["etag"] != compressed.headers["etag"]
+
+    # ETag сжатого варианта не подходит для несжатого ответа
+    assert page.respond(get(accept_encoding="gzip", if_none_match=compressed.headers["etag"])).status_code == 304
+    assert page.respond(get(if_none_match="W/" + plain.headers["etag"])).status_code == 304
+    assert page.respond(get(if_none_match=compressed.headers["etag"])).status_code == 200
+
+
+def test_small_pages_are_not_compressed():
+    response = pages.RenderedPage(b"<p>ok</p>").respond(get(accept_encoding="gzip"))
+    assert "content-encoding" not in response.headers and "vary" not in response.headers
+
+
+@pytest.mark.anyio
+async def test_news_page_rendered_once_per_data_version(db, async_engine):
+    bulk_ingest(db, [{
+        "title": f"Новость {n}", "summary": "Текст", "url": f"https://example.com/page/{n}", "source": "ТАСС",
+        "category": "спорт", "published_at": datetime(2026, 1, 1) - timedelta(minutes=n),
+    } for n in range(3)])
+    renderer = pages.PageRenderer(templates=TEMPLATES, session_factory=lambda: AsyncSessionLocal(bind=async_engine))
+
+    # Одновременные запросы ждут один рендеринг
+    responses = await asyncio.gather(*(renderer.news_page(get()) for _ in range(5)))
+    assert renderer.renders == 1
+    assert len({response.headers["etag"] for response in responses}) == 1
+    assert "Новость 0" in responses[0].body.decode()
+
+    await renderer.news_page(get())
+    assert renderer.renders == 1
+    response_cache.invalidate(LIST)
+    await renderer.news_page(get())
+    assert renderer.renders == 2
@@ -0,0 +1,63 @@
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+import database
+import metrics
+import profiling
+
+
+@pytest.fixture(scope="module")
+def client():
+    engine = database.make_engine("sqlite://")
+    metrics.instrument_engine(engine, "profiling-test")
+    store = profiling.ProfileStore()
+    app = FastAPI()
+    app.add_middleware(profiling.ProfilingMiddleware, store=store, token="secret")
+
+    @app.get("/users")
+    def users():
+        # Один и тот же запрос с разными параметрами — N+1
+        with engine.connect() as connection:
+            for n in range(profiling.N_PLUS_ONE_THRESHOLD + 1):
+                connection.execute(text("SELECT :email"), {"email": f"user{n}@example.com"})
+        return []
+
+    with TestClient(app) as client:
+        client.store = store
+        yield client
+    engine.dispose()
+
+
+def test_profile_requires_token(client):
+    profiles = len(client.store.list())
+    assert "x-profile-id" not in client.get("/users").headers
+    assert "x-profile-id" not in client.get("/users", headers={"X-Profile": "guess"}).headers
+    assert len(client.store.list()) == profiles
+
+
+def test_profile_counts_queries_without_parameter_values(client):
+    response = client.get("/users", headers={"X-Profile": "secret"})
+    profile = client.store.get(int(response.headers["x-profile-id"]))
+    count = profiling.N_PLUS_ONE_THRESHOLD + 1
+    assert profile.as_dict()["queries"] == count
+
+    detail = profile.as_dict(detail=True)
+    assert detail["n_plus_one"] == [{"statement": "SELECT ?", "count": count, "distinct_parameters": count,
+                                     "seconds": detail["n_plus_one"][0]["seconds"]}]
+    assert {query["parameter_types"] for query in detail["sql"]} == {"(str)"}
+    assert "example.com" not in repr(detail)
+
+
+def test_profiles_endpoints_need_configured_token(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "")
+    with pytest.raises(HTTPException) as denied:
+        profiling.require_profile_token("")
+    assert denied.value.status_code == 403
+
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "secret")
+    for header in (None, "guess"):
+        with pytest.raises(HTTPException):
+            profiling.require_profile_token(header)
+    profiling.require_profile_token("secret")
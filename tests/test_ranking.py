@@ -0,0 +1,23 @@
+from datetime import datetime, timedelta
+
+from ingestion import bulk_ingest
+from models import NewsArticle
+from ranking import FeedRanker
+
+
+def test_feed_refilled_after_removals(db):
+    bulk_ingest(db, [{
+        "title": f"Новость {n}", "summary": "Текст", "url": f"https://example.com/feed/{n}", "source": "ТАСС",
+        "category": "спорт", "published_at": datetime(2026, 1, 1, 12, 0) - timedelta(minutes=n),
+    } for n in range(6)])
+    ranker = FeedRanker(feed_size=3)
+    ids = [article["id"] for article in ranker.get_feed(db, user_id=1, limit=3)]
+    assert len(ids) == 3
+
+    # Как после архивации: статьи уходят из базы и из рассчитанных лент
+    db.query(NewsArticle).filter(NewsArticle.id.in_(ids[:2])).update({"is_active": False})
+    db.commit()
+    ranker.on_articles_removed(ids[:2])
+
+    page = [article["id"] for article in ranker.get_feed(db, user_id=1, limit=2, skip=1)]
+    assert len(page) == 2 and not set(page) & set(ids[:2])
@@ -0,0 +1,27 @@
+from datetime import datetime, timedelta
+
+import database
+from ingestion import bulk_ingest
+from models import NewsArchive, NewsArticle
+from retention import INACTIVE, RetentionManager
+
+
+def test_defaults_archive_only_deleted_articles_after_grace_period(db, engine):
+    # Статьи годичной давности; вторую удаляют сегодня
+    bulk_ingest(db, [{
+        "title": f"Новость {n}", "summary": "Текст", "url": f"https://example.com/old/{n}", "source": "ТАСС",
+        "category": "спорт", "published_at": datetime.now() - timedelta(days=365, minutes=n),
+    } for n in range(3)])
+    deleted = db.query(NewsArticle).order_by(NewsArticle.id).first()
+    deleted.is_active = False
+    deleted_id = deleted.id
+    db.commit()
+
+    manager = RetentionManager(session_factory=lambda: database.SessionLocal(bind=engine), interval=0, bind=engine)
+    assert manager.run_once()["last_archived"] == {"inactive": 0, "aged": 0, "overflow": 0}
+
+    status = manager.run_once(now=datetime.now() + timedelta(days=manager.inactive_days, hours=1))
+    assert status["last_archived"][INACTIVE] == 1
+    db.expire_all()
+    assert db.get(NewsArchive, deleted_id) is not None
+    assert db.query(NewsArticle).filter(NewsArticle.is_active == True).count() == 2
@@ -0,0 +1,27 @@
+from scheduler import IngestionScheduler, SourceSchedule
+
+
+def make_schedule(interval: float) -> SourceSchedule:
+    return SourceSchedule(source={"source": "ТАСС", "url": "https://example.com/rss"}, interval=interval)
+
+
+def test_interval_shrinks_for_busy_feeds_and_grows_for_quiet_ones():
+    scheduler = IngestionScheduler([])
+    busy, quiet, steady = make_schedule(300), make_schedule(300), make_schedule(300)
+    scheduler._adapt(busy, IngestionScheduler.BUSY_ITEMS)
+    scheduler._adapt(quiet, 0)
+    scheduler._adapt(steady, 1)
+    assert busy.interval == 300 * IngestionScheduler.SPEEDUP_FACTOR
+    assert quiet.interval == 300 * IngestionScheduler.BACKOFF_FACTOR
+    assert steady.interval == 300
+
+
+def test_interval_is_clamped():
+    scheduler = IngestionScheduler([])
+    schedule = make_schedule(IngestionScheduler.DEFAULT_INTERVAL)
+    for _ in range(20):
+        scheduler._adapt(schedule, IngestionScheduler.BUSY_ITEMS)
+    assert schedule.interval == IngestionScheduler.MIN_INTERVAL
+    for _ in range(20):
+        scheduler._adapt(schedule, 0)
+    assert schedule.interval == IngestionScheduler.MAX_INTERVAL
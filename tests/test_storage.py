@@ -0,0 +1,192 @@
+"""Слой хранения на обоих бэкендах: миграции, вставка с дедупликацией, счетчики,
+пагинация, архив и выгрузка."""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+import export
+from clustering import collapsed
+import migrate
+import search
+import stats
+from ingestion import bulk_ingest
+from models import NewsArchive, NewsArticle
+from pagination import paginate_news_async
+from retention import TABLE, archive_batch
+
+BASE_TIME = datetime(2026, 1, 1, 12, 0)
+
+
+def article(n: int, **fields) -> dict:
+    return {
+        "title": f"Новость номер {n} о событии {n * 7919}",
+        "summary": f"Подробности события {n}",
+        "url": f"https://example.com/news/{n}",
+        "source": "ТАСС",
+        "category": "политика" if n % 2 else "спорт",
+        "published_at": BASE_TIME - timedelta(minutes=n),
+        **fields,
+    }
+
+
+def test_schema_at_head(engine):
+    assert migrate.current_revision(engine) == migrate.head_revision()
+
+
+def test_bulk_ingest_deduplicates_normalized_urls(db):
+    candidates = [
+        article(1),
+        article(2, url="https://www.example.com/news/1/?utm_source=rss"),
+        article(3),
+    ]
+    result = bulk_ingest(db, candidates)
+    assert (result.inserted, result.skipped) == (2, 1)
+
+    again = bulk_ingest(db, [article(1), article(3), article(4)])
+    assert (again.inserted, again.skipped) == (1, 2)
+    assert db.query(NewsArticle).count() == 3
+    assert stats.get_totals(db)["news_count"] == 3
+    assert stats.get_counts(db, stats.CATEGORY) == [{"name": "политика", "count": 2}, {"name": "спорт", "count": 1}]
+
+
+def test_orm_changes_update_counters(db):
+    news = NewsArticle(**article(1))
+    db.add(news)
+    db.commit()
+    assert stats.get_counts(db, stats.SOURCE) == [{"name": "ТАСС", "count": 1}]
+
+    # Как в обработчиках API: статья загружается заново, старые значения известны
+    news = db.query(NewsArticle).filter(NewsArticle.id == news.id).one()
+    news.category = "спорт"
+    db.commit()
+    assert stats.get_counts(db, stats.CATEGORY) == [{"name": "спорт", "count": 1}]
+
+    news = db.query(NewsArticle).filter(NewsArticle.id == news.id).one()
+    news.is_active = False
+    db.commit()
+    assert stats.get_counts(db, stats.CATEGORY) == []
+    assert stats.get_totals(db)["news_count"] == 0
+
+
+def test_normalized_url_is_unique(db):
+    db.add(NewsArticle(**article(1)))
+    db.commit()
+    db.add(NewsArticle(**article(2, url="http://example.com/news/1#comments")))
+    with pytest.raises(IntegrityError):
+        db.commit()
+    db.rollback()
+
+
+def test_updated_at_changes_on_update(db):
+    news = NewsArticle(**article(1))
+    db.add(news)
+    db.commit()
+    created = news.updated_at
+    assert created is not None
+
+    news.title = "Новый заголовок"
+    db.commit()
+    assert news.updated_at > created
+
+
+@pytest.mark.anyio
+async def test_cursor_pagination_covers_all_rows(db, async_db):
+    # Одинаковое время публикации у пар статей: порядок определяет id
+    bulk_ingest(db, [article(n, published_at=BASE_TIME - timedelta(minutes=n // 2)) for n in range(25)])
+    statement = select(NewsArticle).where(NewsArticle.is_active == True)
+    seen, cursor = [], None
+    while True:
+        page, cursor = await paginate_news_async(async_db, statement, limit=10, cursor=cursor)
+        seen += [(news.published_at, news.id) for news in page]
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen)) == 25
+    assert seen == sorted(seen, reverse=True)
+
+
+def test_collapsed_category_keeps_story_when_head_elsewhere(db):
+    # Сюжет 1: первая статья в «политике», две следующие — в «спорте»
+    for article_id, category, cluster_id in ((1, "политика", 1), (2, "спорт", 1), (3, "спорт", 1), (4, "спорт", None)):
+        db.add(NewsArticle(id=article_id, cluster_id=cluster_id, **article(article_id, category=category)))
+    db.commit()
+
+    def ids(*conditions):
+        return db.scalars(select(NewsArticle.id).where(NewsArticle.is_active == True, *conditions)
+                          .order_by(NewsArticle.id)).all()
+
+    assert ids(collapsed()) == [1, 4]
+    assert ids(NewsArticle.category == "спорт", collapsed("спорт")) == [2, 4]
+
+
+def test_search(db, engine):
+    bulk_ingest(db, [article(1, title="Сборная выиграла чемпионат"), article(2)])
+    if engine.dialect.name != "sqlite":
+        # Полнотекстовый поиск есть только в SQLite (FTS5), API отвечает 501
+        assert not search.search_supported(db)
+        return
+    assert search.search_supported(db)
+    items, _ = search.search_news(db, "чемпионата", limit=10)
+    assert [item["url"] for item in items] == ["https://example.com/news/1"]
+    assert "<mark>" in items[0]["snippet"]
+
+
+def test_archive_batch_moves_inactive_rows(db):
+    bulk_ingest(db, [article(n) for n in range(1, 4)])
+    first = db.scalars(select(NewsArticle).order_by(NewsArticle.id)).first()
+    first.is_active = False
+    first_id = first.id
+    db.commit()
+
+    rows, _ = archive_batch(db, [TABLE.c.is_active == False], limit=10)
+    assert [row.id for row in rows] == [first_id]
+    archived = db.get(NewsArchive, first_id)
+    assert archived is not None and archived.updated_at is not None
+    assert db.query(NewsArticle).count() == 2
+
+    # Перенесенная в архив статья не загружается повторно
+    assert bulk_ingest(db, [article(1)]).skipped == 1
+
+
+async def collect_export(async_engine, statements, batch_size: int = 1000) -> list:
+    return [rows async for rows in export.stream_batches(
+        statements, session_factory=lambda: export.AsyncSessionLocal(bind=async_engine), batch_size=batch_size,
+    )]
+
+
+@pytest.mark.anyio
+async def test_export_streams_rows_in_batches(db, async_engine):
+    bulk_ingest(db, [article(n) for n in range(1, 6)])
+    batches = await collect_export(async_engine, export.export_queries(category="политика"), batch_size=2)
+    assert [len(rows) for rows in batches] == [2, 1]
+    lines = export.encode_ndjson([row for rows in batches for row in rows]).splitlines()
+    assert len(lines) == 3 and b'"updated_at"' in lines[0]
+
+
+@pytest.mark.anyio
+async def test_export_watermark_covers_late_commits(db, async_engine):
+    now = datetime.utcnow()
+    mark = export.watermark(now)
+    # Строка записана (flush) до выгрузки, а зафиксирована после нее: ее
+    # updated_at меньше времени выгрузки, но не меньше водяного знака
+    db.add(NewsArticle(**article(1), updated_at=now - timedelta(seconds=1)))
+    db.add(NewsArticle(**article(2), updated_at=mark - timedelta(seconds=1)))
+    db.commit()
+    batches = await collect_export(async_engine, export.export_queries(updated_since=mark))
+    assert [row.url for rows in batches for row in rows] == ["https://example.com/news/1"]
+
+
+@pytest.mark.anyio
+async def test_export_includes_archived_as_deleted(db, async_engine):
+    since = datetime.utcnow() - timedelta(seconds=1)
+    bulk_ingest(db, [article(n) for n in range(1, 4)])
+    first_id = db.scalars(select(NewsArticle.id).order_by(NewsArticle.id)).first()
+    archive_batch(db, [NewsArticle.id == first_id], limit=10)
+
+    rows = [row for rows in await collect_export(async_engine, export.export_queries(updated_since=since)) for row in rows]
+    assert first_id not in [row.id for row in rows]
+    rows = [row for rows in await collect_export(
+        async_engine, export.export_queries(updated_since=since, include_inactive=True)) for row in rows]
+    assert [(row.id, row.is_active) for row in rows][-1] == (first_id, False)
+    assert len(rows) == 3
@@ -0,0 +1,89 @@
+import pytest
+
+import auth
+import user_cache as user_cache_module
+from models import User
+from user_cache import TTLCache, user_cache
+
+
+class Clock:
+    """Подменяет time в user_cache: monotonic() и time() двигаются вместе"""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(user_cache_module, "time", clock)
+    return clock
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = TTLCache(max_size=10, ttl=60)
+    cache.put("alice", 1)
+    clock.now += 59
+    assert cache.get("alice") == 1
+    clock.now += 2
+    assert cache.get("alice") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = TTLCache(max_size=2, ttl=None)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+    assert cache.evictions == 1
+
+
+def test_entry_does_not_outlive_token(clock):
+    cache = TTLCache(max_size=10, ttl=60)
+    cache.put("alice", 1, expires_at=clock.now + 5)
+    cache.put("expired", 2, expires_at=clock.now - 1)
+    clock.now += 6
+    assert cache.get("alice") is None
+    assert cache.stats()["size"] == 0
+
+
+@pytest.fixture
+def user(db):
+    user_cache.clear()
+    user = User(email="alice@example.com", username="alice", hashed_password="x")
+    db.add(user)
+    db.commit()
+    yield user
+    user_cache.clear()
+
+
+@pytest.mark.anyio
+async def test_orm_update_invalidates_cached_user(db, async_db, user):
+    token = auth.create_access_token({"sub": "alice"})
+    assert (await auth.get_current_user(token, async_db)).is_active
+    assert user_cache.get_user("alice") is not None
+
+    user.is_active = False
+    db.commit()
+    assert user_cache.get_user("alice") is None
+    assert not (await auth.get_current_user(token, async_db)).is_active
+
+
+def test_rename_and_delete_invalidate_cached_user(db, user):
+    user_cache.put_user("alice", object())
+    user.username = "alice2"
+    db.commit()
+    assert user_cache.get_user("alice") is None
+
+    user_cache.put_user("alice2", object())
+    db.delete(user)
+    db.commit()
+    assert user_cache.get_user("alice2") is None
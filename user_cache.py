@@ -0,0 +1,144 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+from sqlalchemy import event, inspect
+
+import models
+
+USER_CACHE_ENABLED = os.getenv("USER_CACHE_ENABLED", "1") == "1"
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+
+
+class TTLCache:
+    """LRU-кеш с ограничением размера и сроком жизни каждой записи (ttl=None — без ограничения)"""
+
+    def __init__(self, max_size: int, ttl: Optional[float]):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[0] <= time.monotonic():
+                if item is not None:
+                    del self._items[key]
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key: Hashable, value: Any, expires_at: Optional[float] = None):
+        """Сохранение значения; expires_at — время UNIX, после которого запись недействительна"""
+        ttl = self.ttl if self.ttl is not None else float("inf")
+        if expires_at is not None:
+            ttl = min(ttl, expires_at - time.time())
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._items[key] = (time.monotonic() + ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            if self._items.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._items),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+class UserPrincipalCache:
+    """Кеш аутентифицированных пользователей текущего процесса.
+
+    principals: имя пользователя (sub токена) -> снимок schemas.User; запись
+    живет не дольше USER_CACHE_TTL и срока действия токена, которым она была
+    получена. tokens: проверенный токен -> (sub, exp) до истечения токена, чтобы
+    не проверять подпись повторно.
+
+    Записи пользователя сбрасываются при изменении или удалении строки users
+    через ORM (события SQLAlchemy). Массовые UPDATE в обход ORM и изменения из
+    других процессов видны не позже чем через USER_CACHE_TTL.
+    """
+
+    def __init__(self, max_size: int = USER_CACHE_SIZE, ttl: float = USER_CACHE_TTL,
+                 enabled: bool = USER_CACHE_ENABLED):
+        self.enabled = enabled
+        self.principals = TTLCache(max_size, ttl)
+        self.tokens = TTLCache(max_size, None)
+
+    def get_token(self, token: str) -> Optional[Tuple[str, float]]:
+        return self.tokens.get(token) if self.enabled else None
+
+    def put_token(self, token: str, subject: str, expires_at: float):
+        if self.enabled:
+            self.tokens.put(token, (subject, expires_at), expires_at)
+
+    def get_user(self, username: str):
+        return self.principals.get(username) if self.enabled else None
+
+    def put_user(self, username: str, user, expires_at: Optional[float] = None):
+        if self.enabled:
+            self.principals.put(username, user, expires_at)
+
+    def invalidate_user(self, username: str):
+        self.principals.invalidate(username)
+
+    def clear(self):
+        self.principals.clear()
+        self.tokens.clear()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "principals": self.principals.stats(),
+            "tokens": self.tokens.stats(),
+        }
+
+
+user_cache = UserPrincipalCache()
+
+
+@event.listens_for(models.User.username, "set", active_history=True)
+def _invalidate_renamed_user(target, value, oldvalue, initiator):
+    """Сброс записи под прежним именем. active_history загружает прежнее значение
+    и у истекшего после commit объекта, иначе история изменения была бы пустой"""
+    if isinstance(oldvalue, str) and oldvalue != value:
+        user_cache.invalidate_user(oldvalue)
+
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_changed_user(mapper, connection, target):
+    """Сброс кеша при изменении пользователя, в том числе при смене username"""
+    history = inspect(target).attrs.username.history
+    for username in {target.username, *history.deleted}:
+        if username:
+            user_cache.invalidate_user(username)